@@ -1,80 +1,256 @@
-from flask import Flask, render_template, request, jsonify, session as flask_session
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from flask import Flask, Response, render_template, request, jsonify, session as flask_session
 import base64
+import hashlib
+import hmac
+import http.client
 import time
 import os
-import io
-from PIL import Image
+import socket
+import atexit
+import contextlib
+import threading
+import functools
+from concurrent.futures import TimeoutError as FutureTimeout, CancelledError
+
+from damancom.driver_pool import DriverPool
+from damancom.waits import WaitLog, wait_for, page_has_controls, elements_present, any_of
+from damancom.locators import resolve, fill_first, click_first
+from damancom.frames import FrameEncoder, FrameDiffer
+from damancom.screencast import Screencast, mjpeg_stream, MJPEG_BOUNDARY
+from damancom.browser_worker import BrowserWorker
+from damancom.reaper import SessionReaper, BudgetFull
+from damancom import procs
+from damancom.metrics import Registry, StepTimer, CONTENT_TYPE, ENCODE_BUCKETS, BYTES_BUCKETS
+from damancom.session_store import from_env as session_store_from_env
+from damancom.blocking import attach as attach_blocking, record_first_input, profile_stats
+from damancom.bulk_input import fill_otp, input_stats
+from damancom.outcome import (
+    detect as detect_outcome, failure_signals, mark_stale, describe as describe_outcome,
+)
+from damancom.session_registry import from_env as session_registry_from_env
+from damancom.placement import Placement
+from damancom.cadence import RefreshCadence, BOOST_SECONDS
+from damancom.encode_pool import EncodePool, FrameDropped
+from damancom import timeline
+from damancom import otp_mailbox
+
+# Sessions of every worker process: which one owns each browser (DAMANCOM_SESSION_REGISTRY)
+session_registry = session_registry_from_env()
+# `python app.py` runs under the Werkzeug reloader: its first process only watches the
+# files and (re)starts a second one that serves, so background services start in that one
+RELOADER_WATCHER = __name__ == '__main__' and not os.environ.get('WERKZEUG_RUN_MAIN')
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+# workers sharing a registry must sign the session cookie with the same key
+app.secret_key = os.environ.get('DAMANCOM_SECRET_KEY') or session_registry.secret()
 
 URL = "https://www.damancom.ma/fr/authentification"
+# storage wiped when a pooled driver is recycled for the next user
+SITE_ORIGINS = ("https://www.damancom.ma", "https://damancom.ma")
 IMPLICIT_WAIT = 8
 EXPLICIT_WAIT = 20
+COMMAND_TIMEOUT = 90        # longest a request waits for its login step
+SCREENSHOT_TIMEOUT = 5      # a poll gives up (and keeps the last frame) after this
+
+# Pre-warmed driver pool (override with environment variables)
+# 'all' serves the viewer and hosts browsers; 'frontend' only serves and places every
+# session on a browser node (browser_node.py runs app.py as 'node')
+ROLE = os.environ.get('DAMANCOM_ROLE', 'all')
+if ROLE not in ('all', 'frontend', 'node'):
+    raise ValueError(f"Unknown DAMANCOM_ROLE: {ROLE}")
+if ROLE != 'all' and not session_registry.shared:
+    raise RuntimeError(f"DAMANCOM_ROLE={ROLE} needs a shared DAMANCOM_SESSION_REGISTRY")
+
+POOL_SIZE = 0 if ROLE == 'frontend' else int(os.environ.get('DAMANCOM_POOL_SIZE', 2))
+POOL_MAX_AGE = int(os.environ.get('DAMANCOM_POOL_MAX_AGE', 600))      # seconds
+POOL_MAX_USES = int(os.environ.get('DAMANCOM_POOL_MAX_USES', 5))      # sessions per driver
+
+# Live view frames: 'jpeg', 'webp' or 'png'
+FRAME_FORMAT = os.environ.get('DAMANCOM_FRAME_FORMAT', 'jpeg')
+FRAME_QUALITY = int(os.environ.get('DAMANCOM_FRAME_QUALITY', 70))
+
+# Push-based live view (Chrome screencast over MJPEG)
+STREAM_MAX_FPS = int(os.environ.get('DAMANCOM_STREAM_MAX_FPS', 10))
+STREAM_QUALITY = int(os.environ.get('DAMANCOM_STREAM_QUALITY', 60))
+
+# Browser backend: 'process' starts one Chrome per session; 'contexts' shares one
+# long-lived Chrome and gives each session its own isolated browser context
+BROWSER_MODE = os.environ.get('DAMANCOM_BROWSER_MODE', 'process')
+
+CHROME_ARGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--window-size=1280,720",
+    "--disable-blink-features=AutomationControlled",
+    "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36",
+]
+
+# Network blocking profile applied to every driver: none, analytics, media or lean
+# (extra patterns: DAMANCOM_BLOCK_DENY / DAMANCOM_BLOCK_ALLOW, see damancom/blocking.py)
+BLOCK_PROFILE = os.environ.get('DAMANCOM_BLOCK_PROFILE', 'analytics')
+
+# Session reaper: idle / lifetime limits and server-wide browser budget
+SESSION_IDLE_TTL = int(os.environ.get('DAMANCOM_SESSION_IDLE_TTL', 600))          # seconds
+SESSION_MAX_LIFETIME = int(os.environ.get('DAMANCOM_SESSION_MAX_LIFETIME', 1800))  # seconds
+MAX_BROWSERS = int(os.environ.get('DAMANCOM_MAX_BROWSERS', 10))  # sessions plus warm pool drivers
+# a new session at the cap only displaces a session idle at least this long (else 503)
+SESSION_EVICT_IDLE = int(os.environ.get('DAMANCOM_SESSION_EVICT_IDLE', 60))     # seconds
+MAX_BROWSER_MEMORY_MB = int(os.environ.get('DAMANCOM_MAX_BROWSER_MEMORY_MB', 0))  # 0 = no limit
+
+# Multi-worker routing (only with a shared session registry)
+REGISTRY_HEARTBEAT = 5      # seconds between a worker's heartbeats
+OWNER_PORT = int(os.environ.get('DAMANCOM_OWNER_PORT', 0))   # internal listener, 0 = any free port
+FORWARDED_HEADER = 'X-Damancom-Forwarded'
+FORWARDED_MAX_AGE = 60      # seconds a forwarded request's signature stays valid
+FORWARD_REQUEST_HEADERS = ('cookie', 'content-type', 'accept', 'if-none-match')
+HOP_BY_HOP_HEADERS = ('connection', 'keep-alive', 'transfer-encoding', 'te', 'trailer', 'upgrade')
+# routes that act on the caller's browser, answered by the worker that owns it
+SESSION_ENDPOINTS = {'get_screenshot_endpoint', 'frame_endpoint', 'frame_delta_endpoint',
+                     'stream_endpoint', 'submit_username', 'submit_password', 'submit_otp',
+                     'job_status', 'cleanup', 'trace_endpoint', 'otp_auto_status'}
+
+OTP_BUTTON_SELECTORS = [
+    "//button[contains(@class, 'btn-primary') and contains(text(), \"S'authentifier avec OTP\")]",
+    "//button[contains(normalize-space(.), \"S'authentifier avec OTP\")]",
+    "//button[contains(., 'OTP')]"
+]
+
+# (strategy, value) as in selenium's By: selenium is only imported once a driver is created
+ID_SELECTORS = [
+    ('xpath', "//input[contains(@placeholder,'IDENTIFIANT') or contains(@placeholder,'Identifiant')]"),
+    ('name', "username"), 
+    ('name', "identifiant"), 
+    ('name', "identite"),
+    ('name', "email"), 
+    ('id', "username"), 
+    ('id', "identifiant"),
+    ('xpath', "//input[@type='text']")
+]
+PWD_SELECTORS = [
+    ('xpath', "//input[contains(@placeholder,'MOT DE PASSE') or contains(@placeholder,'Mot de passe')]"),
+    ('name', "password"), 
+    ('name', "motdepasse"), 
+    ('id', "password"),
+    ('xpath', "//input[@type='password']")
+]
+OTP_FIELDS_XPATH = "//input[@type='tel' and @maxlength='1']"
+SUCCESS_INDICATORS = [
+    "//a[contains(., 'Logout') or contains(., 'Déconnexion') or contains(., 'Se déconnecter')]",
+    "//div[contains(@class,'dashboard')]", 
+    "//h1[contains(.,'Bienvenue')]", 
+    "//a[contains(@href,'/private/')]"
+]
 
 active_sessions = {}
 
+shared_chrome = None
+shared_chrome_lock = threading.Lock()
+
+# Saved logged-in sessions, keyed by account (enabled by DAMANCOM_SESSION_KEY)
+session_store = session_store_from_env()
+
+# OTP read from a mailbox instead of typed (enabled by DAMANCOM_OTP_MAILBOX)
+otp_source = otp_mailbox.from_env()
+otp_watch_lock = threading.Lock()
+
+# Prometheus metrics, served on /metrics
+metrics = Registry()
+step_seconds = metrics.histogram('damancom_step_seconds', 'Duration of each login step',
+                                 labels=('step',))
+frame_encode_seconds = metrics.histogram('damancom_frame_encode_seconds',
+                                         'Time to encode a live view frame',
+                                         labels=('route',), buckets=ENCODE_BUCKETS)
+frame_bytes = metrics.histogram('damancom_frame_bytes', 'Size of live view frames sent',
+                                labels=('route',), buckets=BYTES_BUCKETS)
+
+metrics.gauge('damancom_active_sessions', 'Live browser sessions (all workers)', session_registry.count)
+metrics.gauge('damancom_sessions', 'Live browser sessions by login step (all workers)',
+              session_registry.counts_by_step, labels=('step',))
+metrics.gauge('damancom_worker_sessions', 'Live browser sessions owned by each worker process',
+              lambda: {w['owner']: w['sessions'] for w in session_registry.workers()}, labels=('worker',))
+metrics.gauge('damancom_worker_load', "Share of each browser host's capacity in use (placement load)",
+              lambda: {h['owner']: h['load'] for h in placement.hosts()}, labels=('worker',))
+
+def restore_counts():
+    if not session_store:
+        return {}
+    stats = session_store.status()
+    return {outcome: stats[outcome] for outcome in ('hits', 'misses', 'expired')}
+
+metrics.gauge('damancom_session_restores', 'Saved session restores by outcome', restore_counts,
+              labels=('outcome',))
+metrics.gauge('damancom_otp_mailbox', 'Waits for the OTP email by outcome',
+              lambda: {k: otp_source.stats[k] for k in ('found', 'timeouts', 'cancelled', 'errors')} if otp_source else {},
+              labels=('outcome',))
+metrics.gauge('damancom_shared_contexts', "Browser contexts open in the shared Chrome ('contexts' mode)",
+              lambda: shared_chrome.context_count if shared_chrome else 0)
+metrics.gauge('damancom_blocked_requests', 'Requests blocked by the network blocking profile',
+              lambda: {p: s['blocked'] for p, s in profile_stats().items()}, labels=('profile',))
+metrics.gauge('damancom_transferred_bytes', 'Bytes downloaded by drivers, per blocking profile',
+              lambda: {p: s['bytes_transferred'] for p, s in profile_stats().items()}, labels=('profile',))
+metrics.gauge('damancom_saved_bytes_estimate', 'Bytes blocked requests would have downloaded (estimated '
+              'from completed requests of the same type), per blocking profile',
+              lambda: {p: s['bytes_saved_estimate'] for p, s in profile_stats().items()}, labels=('profile',))
+metrics.gauge('damancom_input_round_trips', "WebDriver round-trips spent filling form fields, by path ('bulk' / 'keys')",
+              lambda: {p: s['round_trips'] for p, s in input_stats().items()}, labels=('path',))
+metrics.gauge('damancom_input_fields', 'Form fields filled, by path',
+              lambda: {p: s['fields'] for p, s in input_stats().items()}, labels=('path',))
+metrics.gauge('damancom_pool_drivers', 'Pre-warmed drivers by state',
+              lambda: {state: driver_pool.status()[state] for state in ('idle', 'in_use', 'warming')},
+              labels=('state',))
+
 def try_find(driver, by, value, timeout=EXPLICIT_WAIT):
-    try:
-        return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
-    except TimeoutException:
-        return None
+    return resolve(driver, [(by, value)], timeout=timeout, ready=False)
 
-def click_if_exists(driver, by, value, timeout=5):
-    el = try_find(driver, by, value, timeout=timeout)
-    if el:
-        try:
-            el.click()
-            return True
-        except ElementClickInterceptedException:
-            driver.execute_script("arguments[0].click();", el)
-            return True
-    return False
-
-def fill_input_if_exists(driver, selectors, text):
-    for by, sel in selectors:
-        try:
-            el = driver.find_element(by, sel)
-            el.clear()
-            el.send_keys(text)
-            return True
-        except Exception:
-            continue
-    return False
+def click_if_exists(driver, selectors, timeout=5, label=None, log=None):
+    """
+    selectors: list of XPaths or (By, selector), resolved in one evaluation
+    """
+    return click_first(driver, selectors, timeout=timeout, label=label, log=log)
+
+def fill_input_if_exists(driver, selectors, text, timeout=EXPLICIT_WAIT, label=None, log=None):
+    return fill_first(driver, selectors, text, timeout=timeout, label=label, log=log)
 
 def fill_otp_fields(driver, otp_code):
-    try:
-        otp_inputs = driver.find_elements(By.XPATH, "//input[@type='tel' and @maxlength='1']")
-        
-        if len(otp_inputs) >= 6:
-            for i, digit in enumerate(otp_code[:6]):
-                otp_inputs[i].clear()
-                otp_inputs[i].send_keys(digit)
-            return True
-        else:
-            return False
-    except Exception:
-        return False
+    # finds the six inputs and sets them in one call (keystrokes only where refused)
+    return fill_otp(driver, otp_code[:6], OTP_FIELDS_XPATH) >= 6
+
+# browsers started by this host's servers (see damancom/procs.py)
+launches = procs.LaunchLog()
 
 def create_driver():
-    options = webdriver.ChromeOptions()
-    
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1280,720")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(options=options)
+    with step_seconds.time(step='driver_create'):
+        return _create_driver()
+
+def shared_browser():
+    """The single Chrome used in 'contexts' mode, started on first use."""
+    global shared_chrome
+    with shared_chrome_lock:
+        if shared_chrome is None or not shared_chrome.running:
+            from damancom.shared_browser import SharedChrome
+            shared_chrome = SharedChrome(CHROME_ARGS, window_size=(1280, 720)).start()
+            launches.track([shared_chrome.process.pid])
+            atexit.register(shared_chrome.stop)
+        return shared_chrome
+
+def _create_driver():
+    if BROWSER_MODE == 'contexts':
+        driver = shared_browser().new_driver(performance_log=timeline.ENABLED)
+    else:
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        for argument in CHROME_ARGS:
+            options.add_argument(argument)
+        if timeline.ENABLED:
+            timeline.enable_performance_log(options)
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option('useAutomationExtension', False)
+        driver = webdriver.Chrome(options=options)
+    # recorded so a later server can kill it if this one dies without quitting it
+    launches.track_driver(driver)
     
     driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
         'source': '''
@@ -87,283 +263,901 @@ def create_driver():
     driver.implicitly_wait(IMPLICIT_WAIT)
     driver.set_page_load_timeout(45)
     
+    try:
+        attach_blocking(driver, BLOCK_PROFILE)
+    except Exception:
+        pass  # blocking is an optimisation, never a reason to fail a session
+    
     return driver
 
+def open_auth_page(driver, log=None):
+    """
+    Navigate to the login page and click "S'authentifier avec OTP" so the
+    driver is parked on the username form.
+    """
+    steps = StepTimer(step_seconds)
+    started = time.perf_counter()
+    with steps.step('navigation'):
+        driver.get(URL)
+        loaded = wait_for(driver, page_has_controls(), timeout=20, label='page content', log=log)
+    if loaded:
+        record_first_input(driver, time.perf_counter() - started)
+    if not loaded:
+        from selenium.common.exceptions import TimeoutException
+        raise TimeoutException("Login page did not load within expected time")
+    
+    with steps.step('otp_button'):
+        if click_if_exists(driver, OTP_BUTTON_SELECTORS, timeout=10, label='OTP button', log=log):
+            resolve(driver, ID_SELECTORS, timeout=EXPLICIT_WAIT, label='username form', log=log)
+
+def wait_report(log):
+    return [{'label': label, 'seconds': round(seconds, 3), 'ok': ok} for label, seconds, ok in log.entries]
+
+# a context is cheap to replace, so in 'contexts' mode none is ever reused by a second user
+driver_pool = DriverPool(create_driver, open_auth_page, size=POOL_SIZE, max_age=POOL_MAX_AGE,
+                         max_uses=1 if BROWSER_MODE == 'contexts' else POOL_MAX_USES,
+                         origins=SITE_ORIGINS, max_total=MAX_BROWSERS)
+atexit.register(driver_pool.shutdown)
+if not RELOADER_WATCHER:
+    # warm up now: the first session after a (re)start should not pay for a cold Chrome
+    driver_pool.fill()
+
+def release_session(session, recycle=False):
+    """
+    Stop a session's live view and worker; its driver is recycled into the
+    pool or quit. Blocks until the driver has been handled (reaper use).
+    """
+    session_registry.remove(session['id'])
+    cancel_otp_watch(session)
+    if session.get('screencast'):
+        session['screencast'].stop()
+    
+    released = threading.Event()
+    def hand_back(driver):
+        try:
+            save_trace(session, driver)
+            if recycle:
+                driver_pool.checkin(driver)
+            else:
+                driver_pool.forget(driver)
+                driver.quit()
+        finally:
+            released.set()
+    
+    session['worker'].stop(then=hand_back)
+    released.wait(EXPLICIT_WAIT + 10)
+
+if MAX_BROWSER_MEMORY_MB and BROWSER_MODE == 'contexts':
+    # a session's memory is measured on its chromedriver's process tree, and in
+    # 'contexts' mode the shared Chrome is not part of it: the budget could never trip
+    print("⚠️  DAMANCOM_MAX_BROWSER_MEMORY_MB is not supported with DAMANCOM_BROWSER_MODE=contexts "
+          "- memory budget disabled", flush=True)
+    MAX_BROWSER_MEMORY_MB = 0
+
+def pool_browsers():
+    """Warm pool drivers (idle or starting), which count against MAX_BROWSERS."""
+    status = driver_pool.status()
+    return status['idle'] + status['warming']
+
+session_reaper = SessionReaper(active_sessions, release_session,
+                               idle_ttl=SESSION_IDLE_TTL, max_lifetime=SESSION_MAX_LIFETIME,
+                               max_browsers=MAX_BROWSERS, others=pool_browsers,
+                               evict_idle=SESSION_EVICT_IDLE, launches=launches,
+                               max_memory=MAX_BROWSER_MEMORY_MB * 1024 * 1024).start()
+
+frame_encoder = FrameEncoder(FRAME_FORMAT, quality=FRAME_QUALITY, size=(1280, 720))
+
+# when the viewer should ask for its next frame (X-Refresh-After), see damancom/cadence.py
+refresh_cadence = RefreshCadence()
+metrics.gauge('damancom_refresh_throttle', 'Factor live view refresh intervals are stretched by under load',
+              lambda: refresh_cadence.throttle(len(active_sessions)))
+
+# frames are decoded, resized and encoded off the request threads; stale ones are dropped
+frame_queue_seconds = metrics.histogram('damancom_frame_queue_seconds',
+                                        'Time a frame waited for an encode worker',
+                                        buckets=ENCODE_BUCKETS)
+
+def observe_encode(queued, encoded):
+    frame_queue_seconds.observe(queued)
+    # waiting for a worker counts too: a saturated pool slows the viewers down
+    refresh_cadence.observe_encode(queued + encoded)
+
+encode_pool = EncodePool(observe=observe_encode)
+atexit.register(encode_pool.shutdown)
+metrics.gauge('damancom_encode_queue_depth', 'Frames waiting for an encode worker',
+              lambda: encode_pool.queue_depth)
+metrics.gauge('damancom_encode_frames', 'Frames handled by the encode pool, by outcome',
+              lambda: {outcome: encode_pool.stats[outcome]
+                       for outcome in ('encoded', 'superseded', 'dropped', 'failed')},
+              labels=('outcome',))
+
+def encode_frame(png, route):
+    with frame_encode_seconds.time(route=route):
+        frame = frame_encoder.encode(png)
+    frame_bytes.observe(len(frame), route=route)
+    return frame
+
+def pooled(key, fn, *args):
+    """fn(*args) on the encode pool; None if the frame was dropped or took too long."""
+    try:
+        return encode_pool.run(key, fn, *args, timeout=SCREENSHOT_TIMEOUT)
+    except (FrameDropped, FutureTimeout, CancelledError):
+        return None
+
+def frame_base64(png, route):
+    return base64.b64encode(encode_frame(png, route).data).decode()
+
+def step_active(session):
+    """A submitted login step is running, or finished moments ago (the page is moving)."""
+    job = session.get('step_job')
+    return (job is not None and not job.done) or time.monotonic() < session.get('boost_until', 0)
+
+def refresh_after(session, active_interval=None):
+    """Seconds until the session's viewer should refresh, None while there is nothing to watch."""
+    return refresh_cadence.interval(session['step'], step_active(session), len(active_sessions),
+                                    active_interval=active_interval,
+                                    logged_in=session.get('logged_in', False))
+
+def refresh_header(response, session):
+    interval = refresh_after(session)
+    response.headers['X-Refresh-After'] = 'paused' if interval is None else str(int(interval * 1000))
+    return response
+
+def capture_frame(driver):
+    try:
+        return pooled(('step', id(driver)), encode_frame, driver.get_screenshot_as_png(), 'step')
+    except Exception:
+        return None
+
 def get_screenshot(driver):
+    frame = capture_frame(driver)
+    if frame is None:
+        return None
+    return base64.b64encode(frame.data).decode()
+
+# ----- multi-worker routing -----
+
+def owner_app(environ, start_response):
+    # only requests arriving here may be forwarded ones (see forwarded())
+    environ['damancom.owner_listener'] = True
+    return app(environ, start_response)
+
+def start_owner_server():
+    """Internal listener other workers forward this worker's sessions to."""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', OWNER_PORT, owner_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='owner-server', daemon=True).start()
+    return f"127.0.0.1:{server.server_port}"
+
+def heartbeat(address):
+    capacity = 0 if ROLE == 'frontend' else MAX_BROWSERS
+    session_registry.heartbeat(WORKER_ID, address, role=ROLE, capacity=capacity)
+
+def registry_heartbeat(address):
+    while True:
+        try:
+            heartbeat(address)
+            # sessions of workers that died went down with their browsers
+            session_registry.prune()
+        except Exception:
+            pass
+        time.sleep(REGISTRY_HEARTBEAT)
+
+if not RELOADER_WATCHER:
+    # the reloader's watcher serves nothing: registered, it would be a phantom worker
+    owner_address = start_owner_server() if session_registry.shared else None
+    heartbeat(owner_address)
+    if session_registry.shared:
+        threading.Thread(target=registry_heartbeat, args=(owner_address,),
+                         name='registry-heartbeat', daemon=True).start()
+    atexit.register(session_registry.retire, WORKER_ID)
+placement = Placement(session_registry)
+
+def save_trace(session, driver):
+    trace = session.get('timeline')
+    if trace is None:
+        return
     try:
-        screenshot = driver.get_screenshot_as_png()
-        img = Image.open(io.BytesIO(screenshot))
-        img = img.resize((1280, 720), Image.Resampling.LANCZOS)
-        
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        screenshot_base64 = base64.b64encode(buffer.getvalue()).decode()
-        return screenshot_base64
+        trace.detach(driver)
+        print(f"🧭 Performance trace for session {session['id'][:8]}: {trace.save()}", flush=True)
     except Exception as e:
+        print(f"⚠️  Could not save the trace of session {session['id'][:8]}: {e}", flush=True)
+
+def set_step(session, step):
+    session['step'] = step
+    session_registry.touch(session['id'], step)
+
+def forward_signature(stamp, method, path, body, session_id):
+    """
+    HMAC over the request line, a digest of the body and the caller's session
+    id, so a captured signature cannot replay another body or session.
+    """
+    key = app.secret_key if isinstance(app.secret_key, bytes) else app.secret_key.encode()
+    digest = hashlib.sha256(body or b'').hexdigest()
+    message = f"{stamp} {method} {path} {digest} {session_id or ''}"
+    return hmac.new(key, message.encode(), hashlib.sha256).hexdigest()
+
+def forwarded():
+    """
+    Whether another worker forwarded this request: it came in on the internal
+    listener and carries a fresh signature made with the shared secret over
+    this very body and session cookie. The header means nothing on the public
+    port.
+    """
+    if not request.environ.get('damancom.owner_listener'):
+        return False
+    stamp, _, signature = request.headers.get(FORWARDED_HEADER, '').partition(' ')
+    try:
+        if abs(time.time() - int(stamp)) > FORWARDED_MAX_AGE:
+            return False
+    except ValueError:
+        return False
+    path = request.full_path if request.query_string else request.path
+    expected = forward_signature(stamp, request.method, path, request.get_data(),
+                                 flask_session.get('session_id'))
+    return hmac.compare_digest(signature, expected)
+
+def owner_request(address, method, path, headers, body=None, timeout=None):
+    """Send a signed request to another worker; `headers` carry the caller's session cookie."""
+    host, port = address.rsplit(':', 1)
+    stamp = str(int(time.time()))
+    # the owner reads the session id from the same forwarded cookie
+    signature = forward_signature(stamp, method, path, body, flask_session.get('session_id'))
+    headers = {**headers, FORWARDED_HEADER: f"{stamp} {signature}"}
+    connection = http.client.HTTPConnection(host, int(port), timeout=timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        return connection, connection.getresponse()
+    except Exception:
+        connection.close()
+        raise
+
+def remote_owner(session_id):
+    """The registry record of a session owned by another worker, or None."""
+    if not session_registry.shared or not session_id or session_id in active_sessions:
+        return None
+    record = session_registry.get(session_id)
+    if not record or record['owner'] == WORKER_ID or not record['address']:
         return None
+    return record
+
+@app.before_request
+def route_to_owner():
+    """Hand requests for another worker's browser to that worker, streaming its answer back."""
+    if request.endpoint not in SESSION_ENDPOINTS or forwarded():
+        return None
+    record = remote_owner(flask_session.get('session_id'))
+    if record is None:
+        return None
+    
+    # the MJPEG stream may go quiet for a long time while the page is static
+    timeout = None if request.endpoint == 'stream_endpoint' else COMMAND_TIMEOUT + 10
+    return forward(record, timeout)
+
+def forward(worker, timeout):
+    """Replay the current request on another worker and stream its response back."""
+    headers = {name: value for name, value in request.headers.items()
+               if name.lower() in FORWARD_REQUEST_HEADERS}
+    path = request.full_path if request.query_string else request.path
+    try:
+        connection, upstream = owner_request(worker['address'], request.method, path, headers,
+                                             body=request.get_data(), timeout=timeout)
+    except OSError as e:
+        return jsonify({'success': False, 'error': f"Worker {worker['owner']} unreachable: {e}"}), 502
+    
+    def relay():
+        try:
+            for chunk in iter(lambda: upstream.read1(65536), b''):
+                yield chunk
+        finally:
+            connection.close()
+    
+    return Response(relay(), status=upstream.status,
+                    headers=[(name, value) for name, value in upstream.getheaders()
+                             if name.lower() not in HOP_BY_HOP_HEADERS])
+
+def release_remote(record):
+    """Ask the owning worker to clean up the caller's previous session."""
+    try:
+        connection, upstream = owner_request(record['address'], 'POST', '/cleanup',
+                                             {'Cookie': request.headers.get('Cookie', '')}, timeout=10)
+        upstream.read()
+        connection.close()
+    except OSError:
+        pass
 
 @app.route('/')
 def index():
     return render_template('viewer.html')
 
+def current_session():
+    session_id = flask_session.get('session_id')
+    if not session_id:
+        return None, None
+    session = active_sessions.get(session_id)
+    if session:
+        session['last_seen'] = time.monotonic()
+    return session_id, session
+
+def no_session():
+    return jsonify({'success': False, 'error': 'No active session'})
+
+def submit_step(session, fn, *args):
+    """Queue a login step on the session's browser worker; RuntimeError once it is stopped."""
+    if session.get('timeline'):
+        fn = session['timeline'].bound(fn)
+    job = session['worker'].submit(fn, *args)
+    # the viewer refreshes fast while the step runs and for a few seconds after
+    session['step_job'] = job
+    job.future.add_done_callback(
+        lambda _: session.__setitem__('boost_until', time.monotonic() + BOOST_SECONDS))
+    return job
+
+def dispatch(session, fn, *args):
+    """
+    Run a login step on the session's browser worker. With ?async=1 the job
+    id is returned at once (poll /job/<id>); otherwise wait for the result.
+    """
+    try:
+        job = submit_step(session, fn, *args)
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    
+    if request.args.get('async'):
+        return jsonify({'success': True, 'job_id': job.id}), 202
+    return jsonify(job_payload(job, timeout=COMMAND_TIMEOUT))
+
+def job_payload(job, timeout=None):
+    try:
+        return job.result(timeout)
+    except FutureTimeout:
+        return {'success': False, 'pending': True, 'job_id': job.id,
+                'error': 'Browser is still busy, try again'}
+    except CancelledError:
+        return {'success': False, 'error': 'Session was closed'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+def screenshot_png(session, timeout=SCREENSHOT_TIMEOUT):
+    """Coalesced screenshot through the worker; None if the browser is busy."""
+    job = session['worker'].submit(session['driver'].get_screenshot_as_png, key='screenshot')
+    try:
+        return job.result(timeout)
+    except Exception:
+        return None
+
+# ----- login steps (run on the session's browser worker) -----
+
+def timed_steps(fn):
+    """
+    Hand the step function a StepTimer feeding /metrics; the step still open
+    when it returns (or fails) is closed, so timeouts are measured too.
+    """
+    @functools.wraps(fn)
+    def wrapper(session, *args):
+        steps = StepTimer(step_seconds)
+        try:
+            return fn(session, *args, steps=steps)
+        finally:
+            steps.end()
+    return wrapper
+
+def enter_username(driver, username, waits):
+    """Fill the username, click Suivant and wait for the password form; returns an error or None."""
+    filled = fill_input_if_exists(driver, ID_SELECTORS, username, timeout=IMPLICIT_WAIT,
+                                  label='username field', log=waits)
+    
+    if not filled:
+        return 'Could not find username field'
+    
+    suivant_selectors = [
+        "//button[contains(@class, 'btn-primary') and contains(text(), 'Suivant')]",
+        "//button[contains(normalize-space(.), 'Suivant')]",
+        "//button[contains(., 'Suivant')]"
+    ]
+    
+    if not click_if_exists(driver, suivant_selectors, timeout=5, label='Suivant button', log=waits):
+        return 'Could not find Next button'
+    
+    if not resolve(driver, PWD_SELECTORS, timeout=EXPLICIT_WAIT, label='password form', log=waits):
+        return 'Password page did not load within expected time'
+    
+    return None
+
+@timed_steps
+def run_username_step(session, username, steps):
+    driver = session['driver']
+    waits = WaitLog()
+    steps.begin('username')
+    error = enter_username(driver, username, waits)
+    if error:
+        return {'success': False, 'error': error}
+    
+    session['username'] = username
+    set_step(session, 'password')
+    
+    return {
+        'success': True,
+        'screenshot': get_screenshot(driver),
+        'screenshot_type': frame_encoder.mime,
+        'step': 'password',
+        'waits': wait_report(waits)
+    }
+
+@timed_steps
+def run_password_step(session, password, steps):
+    driver = session['driver']
+    waits = WaitLog()
+    
+    if session_store and session.get('username'):
+        steps.begin('session_restore')
+        outcome = session_store.restore(driver, session['username'], password, SUCCESS_INDICATORS)
+        if outcome == 'hit':
+            session['logged_in'] = True
+            set_step(session, 'complete')
+            return {
+                'success': True,
+                'screenshot': get_screenshot(driver),
+                'screenshot_type': frame_encoder.mime,
+                'step': 'complete',
+                'logged_in': True,
+                'restored': True,
+                'url': driver.current_url,
+                'waits': wait_report(waits)
+            }
+        if outcome == 'expired':
+            # checking the saved session left the login form: go back to the password step
+            open_auth_page(driver, log=waits)
+            error = enter_username(driver, session['username'], waits)
+            if error:
+                return {'success': False, 'error': error}
+        # kept (hashed) until the OTP step succeeds, to bind the new snapshot to this password
+        session['verifier'] = session_store.verifier(password)
+    
+    steps.begin('password')
+    session['password_at'] = time.time()     # the OTP mail we want arrives after this
+    filled = fill_input_if_exists(driver, PWD_SELECTORS, password, timeout=IMPLICIT_WAIT,
+                                  label='password field', log=waits)
+    
+    if not filled:
+        return {'success': False, 'error': 'Could not find password field'}
+    
+    suivant_selectors = [
+        "//button[contains(@class, 'btn-primary') and contains(text(), 'Suivant')]",
+        "//button[contains(normalize-space(.), 'Suivant')]",
+        "//button[contains(., 'Suivant')]",
+        "//button[contains(normalize-space(.), 'Continuer')]",
+        "//button[@type='submit']"
+    ]
+    
+    if not click_if_exists(driver, suivant_selectors, timeout=5, label='Continue button', log=waits):
+        return {'success': False, 'error': 'Could not find continue button'}
+    
+    steps.begin('otp_page')
+    result = wait_for(driver, any_of(elements_present(OTP_FIELDS_XPATH, 6), failure_signals()),
+                      timeout=EXPLICIT_WAIT, label='OTP page', log=waits)
+    if isinstance(result, dict):
+        # the site answered with an error instead of the OTP page
+        return {
+            'success': False,
+            'error': describe_outcome(result).capitalize(),
+            'reason': result['reason'],
+            'screenshot': get_screenshot(driver),
+            'screenshot_type': frame_encoder.mime,
+            'waits': wait_report(waits)
+        }
+    if not result:
+        return {'success': False, 'error': 'OTP page did not load within expected time'}
+    
+    set_step(session, 'otp')
+    watching = bool(otp_source) and watch_otp_mailbox(session)
+    
+    return {
+        'success': True,
+        'screenshot': get_screenshot(driver),
+        'screenshot_type': frame_encoder.mime,
+        'step': 'otp',
+        'otp_auto': watching,
+        'waits': wait_report(waits)
+    }
+
+@timed_steps
+def run_otp_step(session, otp_code, steps):
+    driver = session['driver']
+    steps.begin('valider')
+    if not fill_otp_fields(driver, otp_code):
+        return {'success': False, 'error': 'Failed to enter OTP'}
+    
+    valider_xpath = "//button[contains(normalize-space(.), 'Valider')]"
+    waits = WaitLog()
+    # the error from a previous attempt may still be shown: only a new one counts
+    mark_stale(driver)
+    click_if_exists(driver, [valider_xpath], timeout=5, label='Valider button', log=waits)
+    
+    # success and error signals are watched together: a rejected code is reported at once
+    steps.begin('success_check')
+    outcome = detect_outcome(driver, timeout=EXPLICIT_WAIT, indicators=SUCCESS_INDICATORS,
+                             label='post-Valider page', log=waits)
+    steps.end()
+    logged_in = outcome['logged_in']
+    
+    if outcome['reason'] == 'invalid_otp':
+        # stay on the OTP step so the user can type the code again
+        return {
+            'success': False,
+            'error': describe_outcome(outcome).capitalize(),
+            'reason': outcome['reason'],
+            'screenshot': get_screenshot(driver),
+            'screenshot_type': frame_encoder.mime,
+            'waits': wait_report(waits)
+        }
+    
+    if logged_in and session_store and session.get('verifier'):
+        try:
+            session_store.save(driver, session['username'], session.pop('verifier'))
+        except Exception:
+            pass
+    
+    session['logged_in'] = logged_in
+    set_step(session, 'complete')
+    
+    return {
+        'success': True,
+        'screenshot': get_screenshot(driver),
+        'screenshot_type': frame_encoder.mime,
+        'logged_in': logged_in,
+        'outcome': outcome['status'],
+        'reason': outcome['reason'],
+        'message': outcome['message'],
+        'url': outcome['url'],
+        'waits': wait_report(waits)
+    }
+
+def watch_otp_mailbox(session):
+    """
+    Wait for the OTP email beside the browser worker (which stays free for
+    the live view) and submit the code as if it had been typed. The viewer
+    follows the watch on /otp_auto; typing the code first cancels it.
+    
+    Unless code mails name their account (DAMANCOM_OTP_MATCH=recipient) a
+    mail could be any user's, so only one session at a time watches, and
+    none when several workers share the mailbox. Returns whether it watches.
+    """
+    cancel_otp_watch(session)
+    if not otp_source.matches_accounts and session_registry.shared:
+        return False
+    watch = {'state': 'waiting', 'job_id': None, 'cancelled': threading.Event()}
+    with otp_watch_lock:
+        if not otp_source.matches_accounts and any(
+                other.get('otp_watch', {}).get('state') == 'waiting'
+                for other in list(active_sessions.values()) if other is not session):
+            return False
+        session['otp_watch'] = watch
+    
+    def run():
+        started = time.monotonic()
+        code = otp_source.wait(session['password_at'], cancelled=watch['cancelled'],
+                               recipient=session.get('username'))
+        with otp_watch_lock:
+            if watch['cancelled'].is_set():
+                watch['state'] = 'cancelled'
+            elif not code:
+                watch['state'] = 'timeout'
+            else:
+                step_seconds.observe(time.monotonic() - started, step='otp_mailbox')
+                try:
+                    job = submit_step(session, run_otp_step, session, code)
+                    watch['state'], watch['job_id'] = 'submitted', job.id
+                except RuntimeError:
+                    watch['state'] = 'cancelled'
+    
+    threading.Thread(target=run, name=f"otp-mailbox-{session['id'][:8]}", daemon=True).start()
+    return True
+
+def cancel_otp_watch(session):
+    """
+    Stop the session's mailbox watch. Returns the job id of the OTP step the
+    watch already submitted if it is still running (a typed code must not be
+    entered on top of it), else None.
+    """
+    watch = session.get('otp_watch')
+    if watch is None:
+        return None
+    with otp_watch_lock:
+        watch['cancelled'].set()
+        if watch['state'] == 'waiting':
+            watch['state'] = 'cancelled'
+        elif watch['state'] == 'submitted':
+            job = session['worker'].job(watch['job_id'])
+            if job is not None and not job.done:
+                return watch['job_id']
+    return None
+
+# ----- routes -----
+
 @app.route('/start_session', methods=['POST'])
 def start_session():
+    if forwarded():
+        # placed here by a frontend, which has already released the previous session
+        return start_local_session()
+    
+    # a browser that reloads without /cleanup would otherwise leak its old session
+    previous_id = flask_session.get('session_id')
+    previous_owner = remote_owner(previous_id)
+    if previous_id in active_sessions:
+        session_reaper.evict(previous_id, 'evicted_replaced')
+    elif previous_owner:
+        # created by another worker: that worker has to quit it
+        release_remote(previous_owner)
+    
+    if not session_registry.shared:
+        return start_local_session()
+    host = placement.choose()
+    if host is None:
+        return jsonify({'success': False, 'error': 'No browser worker available'}), 503
+    with placement.starting(host['owner']):
+        if host['owner'] == WORKER_ID:
+            return start_local_session()
+        # the node answers with the session cookie, which the viewer then sends here
+        return forward(host, COMMAND_TIMEOUT + 30)
+
+def start_local_session():
+    """Open a browser session in this process."""
+    driver = None
+    session_id = None
     try:
+        driver = driver_pool.checkout()
+        from_pool = driver is not None
+        try:
+            # a session idle for a while may make way for this one, an active one never does
+            session_reaper.make_room()
+        except BudgetFull:
+            if from_pool:
+                driver_pool.checkin(driver)
+            return jsonify({'success': False, 'busy': True,
+                            'error': 'All browsers are in use, please try again in a minute'}), 503
+        
         session_id = os.urandom(16).hex()
         flask_session['session_id'] = session_id
+        # recorded from here when DAMANCOM_TRACE_DIR is set (see damancom/timeline.py)
+        trace = timeline.Timeline(f"session-{session_id[:8]}") if timeline.ENABLED else None
         
-        driver = create_driver()
+        waits = WaitLog()
+        if not from_pool:
+            driver = create_driver()
+            driver_pool.adopt(driver)
+        if trace:
+            trace.attach(driver)
+            trace.mark('driver', pooled=from_pool)
+        if not from_pool:
+            with trace.activate() if trace else contextlib.nullcontext():
+                open_auth_page(driver, log=waits)
         
-        driver.get(URL)
-        time.sleep(3)
-        
-        WebDriverWait(driver, 20).until(
-            lambda d: len(d.find_elements(By.TAG_NAME, "button")) > 0 or 
-                     len(d.find_elements(By.TAG_NAME, "input")) > 0
-        )
-        
-        time.sleep(2)
-        
-        otp_button_selectors = [
-            "//button[contains(@class, 'btn-primary') and contains(text(), \"S'authentifier avec OTP\")]",
-            "//button[contains(normalize-space(.), \"S'authentifier avec OTP\")]",
-            "//button[contains(., 'OTP')]"
-        ]
-        
-        for selector in otp_button_selectors:
-            if click_if_exists(driver, By.XPATH, selector, timeout=5):
-                time.sleep(2)
-                break
-        
-        active_sessions[session_id] = {
+        now = time.monotonic()
+        session = {
+            'id': session_id,
+            'timeline': trace,
             'driver': driver,
+            'worker': BrowserWorker(driver, name=f'browser-{session_id[:8]}'),
             'step': 'username',
-            'status': 'ready'
+            'status': 'ready',
+            'frames': FrameDiffer(frame_encoder),
+            'created_at': now,
+            'last_seen': now
         }
-        
-        screenshot = get_screenshot(driver)
+        active_sessions[session_id] = session
+        session_registry.add(session_id, WORKER_ID, 'username')
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'screenshot': screenshot,
-            'step': 'username'
+            'screenshot': session['worker'].call(get_screenshot, driver, timeout=COMMAND_TIMEOUT),
+            'screenshot_type': frame_encoder.mime,
+            'step': 'username',
+            'waits': wait_report(waits)
         })
     except Exception as e:
+        # never leave a browser behind for a session that failed to start
+        session = active_sessions.pop(session_id, None) if session_id else None
+        if session:
+            session_registry.remove(session_id)
+            session['worker'].stop(then=driver_pool.discard)
+        elif driver is not None:
+            driver_pool.discard(driver)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/get_screenshot', methods=['POST'])
 def get_screenshot_endpoint():
-    session_id = flask_session.get('session_id')
-    
-    if not session_id or session_id not in active_sessions:
-        return jsonify({'success': False, 'error': 'No active session'})
+    session_id, session = current_session()
+    if not session:
+        return no_session()
     
-    driver = active_sessions[session_id]['driver']
-    screenshot = get_screenshot(driver)
+    png = screenshot_png(session)
+    screenshot = pooled((session_id, 'get_screenshot'), frame_base64, png, 'get_screenshot') if png else None
     
+    interval = refresh_after(session)
     return jsonify({
         'success': True,
         'screenshot': screenshot,
-        'step': active_sessions[session_id]['step']
+        'screenshot_type': frame_encoder.mime,
+        'step': session['step'],
+        'refresh_after': None if interval is None else int(interval * 1000)
     })
 
+@app.route('/frame')
+def frame_endpoint():
+    """Current browser view as a plain image, revalidated through its ETag."""
+    session_id, session = current_session()
+    if not session:
+        return jsonify({'success': False, 'error': 'No active session'}), 404
+    
+    png = screenshot_png(session)
+    frame = pooled((session_id, 'frame'), encode_frame, png, 'frame') if png else None
+    if frame is None:
+        return jsonify({'success': False, 'error': 'Screenshot failed or server busy'}), 503
+    
+    response = Response(frame.data, mimetype=frame.mime)
+    response.set_etag(frame.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Step'] = session['step']
+    refresh_header(response, session)
+    return response.make_conditional(request)
+
+def diff_frame(frames, png, since):
+    with frame_encode_seconds.time(route='frame_delta'):
+        return frames.update(png, since)
+
+@app.route('/frame_delta')
+def frame_delta_endpoint():
+    """
+    Tiles changed since the viewer's frame `since` (see FrameDelta.pack), or
+    204 with no body when the page has not changed (or the browser is busy
+    with a login step, or the encode pool dropped the frame under load; the
+    viewer then keeps its last frame).
+    """
+    session_id, session = current_session()
+    if not session:
+        return jsonify({'success': False, 'error': 'No active session'}), 404
+    
+    since = request.args.get('since', type=int)
+    png = screenshot_png(session)
+    delta = None
+    if png:
+        # a delta depends on the frame the caller has: only callers with the same `since` share one
+        delta = pooled((session_id, 'frame_delta', since), diff_frame, session['frames'], png, since)
+    
+    if delta is None:
+        response = Response(status=204)
+        response.headers['X-Frame-Id'] = str(since)
+    else:
+        body = delta.pack()
+        frame_bytes.observe(len(body), route='frame_delta')
+        response = Response(body, mimetype='application/octet-stream')
+        response.headers['X-Frame-Id'] = str(delta.frame_id)
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Step'] = session['step']
+    return refresh_header(response, session)
+
+@app.route('/stream')
+def stream_endpoint():
+    """
+    Live view pushed by Chrome's screencast as multipart MJPEG over one
+    long-lived response. Frame rate and quality follow how fast the client
+    reads; the viewer falls back to /frame_delta polling if this fails.
+    """
+    session_id, session = current_session()
+    if not session:
+        return jsonify({'success': False, 'error': 'No active session'}), 404
+    
+    try:
+        screencast = Screencast(session['driver'], max_fps=STREAM_MAX_FPS,
+                                quality=STREAM_QUALITY).start()
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Screencast unavailable: {e}'}), 503
+    
+    previous = session.get('screencast')
+    if previous:
+        previous.stop()
+    session['screencast'] = screencast
+    
+    def counted(chunks):
+        for chunk in chunks:
+            frame_bytes.observe(len(chunk), route='stream')
+            yield chunk
+    
+    # full frame rate while the page moves; the refresh cadence while it waits for the user
+    pace = lambda: refresh_after(session, active_interval=1.0 / STREAM_MAX_FPS)
+    response = Response(counted(mjpeg_stream(screencast, lambda: session_id in active_sessions, pace)),
+                        mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @app.route('/submit_username', methods=['POST'])
 def submit_username():
-    session_id = flask_session.get('session_id')
-    
-    if not session_id or session_id not in active_sessions:
-        return jsonify({'success': False, 'error': 'No active session'})
+    session_id, session = current_session()
+    if not session:
+        return no_session()
     
     username = request.json.get('username')
     if not username:
         return jsonify({'success': False, 'error': 'Username required'})
+    if session.get('timeline'):
+        session['timeline'].label = f"{username}-{session_id[:8]}"
     
-    driver = active_sessions[session_id]['driver']
-    
-    try:
-        id_selectors = [
-            (By.XPATH, "//input[contains(@placeholder,'IDENTIFIANT') or contains(@placeholder,'Identifiant')]"),
-            (By.NAME, "username"), 
-            (By.NAME, "identifiant"), 
-            (By.NAME, "identite"),
-            (By.NAME, "email"), 
-            (By.ID, "username"), 
-            (By.ID, "identifiant"),
-            (By.XPATH, "//input[@type='text']")
-        ]
-        
-        filled = fill_input_if_exists(driver, id_selectors, username)
-        
-        if not filled:
-            return jsonify({'success': False, 'error': 'Could not find username field'})
-        
-        time.sleep(1)
-        
-        suivant_selectors = [
-            "//button[contains(@class, 'btn-primary') and contains(text(), 'Suivant')]",
-            "//button[contains(normalize-space(.), 'Suivant')]",
-            "//button[contains(., 'Suivant')]"
-        ]
-        
-        button_clicked = False
-        for selector in suivant_selectors:
-            if click_if_exists(driver, By.XPATH, selector, timeout=5):
-                button_clicked = True
-                break
-        
-        if not button_clicked:
-            return jsonify({'success': False, 'error': 'Could not find Next button'})
-        
-        try:
-            def password_field_ready(driver):
-                pwd_selectors = [
-                    (By.XPATH, "//input[contains(@placeholder,'MOT DE PASSE') or contains(@placeholder,'Mot de passe')]"),
-                    (By.NAME, "password"), 
-                    (By.ID, "password"),
-                    (By.XPATH, "//input[@type='password']")
-                ]
-                for by, sel in pwd_selectors:
-                    try:
-                        elem = driver.find_element(by, sel)
-                        return elem if elem else False
-                    except:
-                        continue
-                return False
-            
-            WebDriverWait(driver, EXPLICIT_WAIT).until(password_field_ready)
-            
-            active_sessions[session_id]['step'] = 'password'
-            screenshot = get_screenshot(driver)
-            
-            return jsonify({
-                'success': True,
-                'screenshot': screenshot,
-                'step': 'password'
-            })
-        except TimeoutException:
-            return jsonify({'success': False, 'error': 'Password page did not load within expected time'})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return dispatch(session, run_username_step, session, username)
 
 @app.route('/submit_password', methods=['POST'])
 def submit_password():
-    session_id = flask_session.get('session_id')
-    
-    if not session_id or session_id not in active_sessions:
-        return jsonify({'success': False, 'error': 'No active session'})
+    session_id, session = current_session()
+    if not session:
+        return no_session()
     
     password = request.json.get('password')
     if not password:
         return jsonify({'success': False, 'error': 'Password required'})
     
-    driver = active_sessions[session_id]['driver']
-    
-    try:
-        pwd_selectors = [
-            (By.XPATH, "//input[contains(@placeholder,'MOT DE PASSE') or contains(@placeholder,'Mot de passe')]"),
-            (By.NAME, "password"), 
-            (By.NAME, "motdepasse"), 
-            (By.ID, "password"),
-            (By.XPATH, "//input[@type='password']")
-        ]
-        
-        filled = fill_input_if_exists(driver, pwd_selectors, password)
-        
-        if not filled:
-            return jsonify({'success': False, 'error': 'Could not find password field'})
-        
-        time.sleep(1)
-        
-        suivant_selectors = [
-            "//button[contains(@class, 'btn-primary') and contains(text(), 'Suivant')]",
-            "//button[contains(normalize-space(.), 'Suivant')]",
-            "//button[contains(., 'Suivant')]",
-            "//button[contains(normalize-space(.), 'Continuer')]",
-            "//button[@type='submit']"
-        ]
-        
-        button_clicked = False
-        for selector in suivant_selectors:
-            if click_if_exists(driver, By.XPATH, selector, timeout=5):
-                button_clicked = True
-                break
-        
-        if not button_clicked:
-            return jsonify({'success': False, 'error': 'Could not find continue button'})
-        
-        try:
-            def otp_fields_ready(driver):
-                fields = driver.find_elements(By.XPATH, "//input[@type='tel' and @maxlength='1']")
-                return fields if len(fields) >= 6 else False
-            
-            otp_inputs = WebDriverWait(driver, EXPLICIT_WAIT).until(otp_fields_ready)
-            
-            active_sessions[session_id]['step'] = 'otp'
-            screenshot = get_screenshot(driver)
-            
-            return jsonify({
-                'success': True,
-                'screenshot': screenshot,
-                'step': 'otp'
-            })
-        except TimeoutException:
-            return jsonify({'success': False, 'error': 'OTP page did not load within expected time'})
-            
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return dispatch(session, run_password_step, session, password)
 
 @app.route('/submit_otp', methods=['POST'])
 def submit_otp():
-    session_id = flask_session.get('session_id')
-    
-    if not session_id or session_id not in active_sessions:
-        return jsonify({'success': False, 'error': 'No active session'})
+    session_id, session = current_session()
+    if not session:
+        return no_session()
     
     otp_code = request.json.get('otp')
     if not otp_code or len(otp_code) != 6:
         return jsonify({'success': False, 'error': 'OTP must be 6 digits'})
     
-    driver = active_sessions[session_id]['driver']
+    # typed before the mailbox had it: stop watching
+    running = cancel_otp_watch(session)
+    if running:
+        # the mailbox's code is already being entered: follow that step instead
+        return jsonify({'success': False, 'pending': True, 'job_id': running,
+                        'error': 'The code from the mailbox is already being checked'}), 409
+    return dispatch(session, run_otp_step, session, otp_code)
+
+@app.route('/otp_auto')
+def otp_auto_status():
+    """Where the mailbox watch of this session is: waiting, submitted (job_id), timeout, cancelled."""
+    session_id, session = current_session()
+    if not session:
+        return no_session()
+    
+    watch = session.get('otp_watch')
+    if watch is None:
+        return jsonify({'success': True, 'state': 'off'})
+    return jsonify({'success': True, 'state': watch['state'], 'job_id': watch['job_id']})
+
+@app.route('/job/<job_id>')
+def job_status(job_id):
+    """Result of a step submitted with ?async=1, once it has finished."""
+    session_id, session = current_session()
+    if not session:
+        return no_session()
     
+    job = session['worker'].job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if not job.done:
+        return jsonify({'success': True, 'pending': True, 'job_id': job_id}), 202
+    return jsonify(job_payload(job))
+
+@app.route('/trace')
+def trace_endpoint():
+    """The session's performance timeline so far, as a Chrome trace file."""
+    session_id, session = current_session()
+    if not session:
+        return no_session()
+    if not session.get('timeline'):
+        return jsonify({'success': False, 'error': 'Tracing is off (set DAMANCOM_TRACE_DIR)'}), 404
     try:
-        if fill_otp_fields(driver, otp_code):
-            time.sleep(1)
-            
-            click_if_exists(driver, By.XPATH, "//button[contains(normalize-space(.), 'Valider')]", timeout=5)
-            time.sleep(3)
-            
-            success_indicators = [
-                "//a[contains(., 'Logout') or contains(., 'Déconnexion') or contains(., 'Se déconnecter')]",
-                "//div[contains(@class,'dashboard')]", 
-                "//h1[contains(.,'Bienvenue')]", 
-                "//a[contains(@href,'/private/')]"
-            ]
-            
-            logged_in = False
-            for sel in success_indicators:
-                try:
-                    if driver.find_elements(By.XPATH, sel):
-                        logged_in = True
-                        break
-                except Exception:
-                    pass
-            
-            active_sessions[session_id]['step'] = 'complete'
-            screenshot = get_screenshot(driver)
-            
-            return jsonify({
-                'success': True,
-                'screenshot': screenshot,
-                'logged_in': logged_in,
-                'url': driver.current_url
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Failed to enter OTP'})
+        # Chrome's log is read through the driver, so on the session's worker
+        trace = session['worker'].call(session['timeline'].trace, timeout=COMMAND_TIMEOUT)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return jsonify({'success': False, 'error': str(e)}), 503
+    response = jsonify(trace)
+    response.headers['Content-Disposition'] = f'attachment; filename="damancom-{session_id[:8]}.trace.json"'
+    return response
 
 @app.route('/cleanup', methods=['POST'])
 def cleanup():
@@ -371,13 +1165,61 @@ def cleanup():
     
     if session_id and session_id in active_sessions:
         try:
-            active_sessions[session_id]['driver'].quit()
-            del active_sessions[session_id]
+            session = active_sessions.pop(session_id)
+            # the driver goes back to the pool once its last command is done; one that
+            # reached a logged-in page is quit, whatever the site left in its storage
+            threading.Thread(target=release_session, args=(session,),
+                             kwargs={'recycle': session['step'] != 'complete'}, daemon=True).start()
         except:
             pass
     
     flask_session.clear()
     return jsonify({'success': True})
 
+@app.route('/pool_status')
+def pool_status():
+    return jsonify(driver_pool.status())
+
+@app.route('/encode_status')
+def encode_status():
+    return jsonify(encode_pool.status())
+
+@app.route('/reaper_status')
+def reaper_status():
+    return jsonify(session_reaper.status())
+
+@app.route('/otp_mailbox_status')
+def otp_mailbox_status():
+    if not otp_source:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'mailbox': otp_source.name, **otp_source.stats})
+
+@app.route('/session_store_status')
+def session_store_status():
+    if not session_store:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **session_store.status()})
+
+@app.route('/blocking_status')
+def blocking_status():
+    return jsonify({'profile': BLOCK_PROFILE, 'profiles': profile_stats()})
+
+@app.route('/registry_status')
+def registry_status():
+    return jsonify({
+        'shared': session_registry.shared,
+        'worker': WORKER_ID,
+        'role': ROLE,
+        'sessions': session_registry.count(),
+        'steps': session_registry.counts_by_step(),
+        'workers': session_registry.workers(),
+        'placement': placement.status(),
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Step latency histograms, frame metrics and live session counts (Prometheus text format)."""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Network blocking profile benchmark: for each profile, load the auth page in a
+fresh driver (app.create_driver) and report time to first interactive input,
+requests blocked, bytes downloaded and bytes saved against no blocking.
+
+Usage:
+    python -m benchmarks.bench_blocking                       # local stand-in page
+    python -m benchmarks.bench_blocking --url https://www.damancom.ma/fr/authentification
+    python -m benchmarks.bench_blocking --profiles none lean --runs 3 --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the benchmark creates every driver itself: keep app.py's pool from warming any
+os.environ.setdefault('DAMANCOM_POOL_SIZE', '0')
+
+import app
+from benchmarks.standin_server import StandinServer
+from damancom.blocking import PROFILES, profile_stats
+from damancom.waits import wait_for, page_has_controls
+
+
+def load_once(profile, url):
+    app.BLOCK_PROFILE = profile
+    driver = app.create_driver()
+    try:
+        before = profile_stats().get(profile, {})
+        started = time.perf_counter()
+        driver.get(url)
+        ready = wait_for(driver, page_has_controls(), timeout=20)
+        first_input = time.perf_counter() - started
+        time.sleep(0.5)     # let trailing loadingFinished events arrive
+        after = profile_stats()[profile]
+        return {
+            'first_input': round(first_input, 3) if ready else None,
+            'requests': after['requests'] - before.get('requests', 0),
+            'blocked': after['blocked'] - before.get('blocked', 0),
+            'bytes': after['bytes_transferred'] - before.get('bytes_transferred', 0),
+            'intercepting': driver.request_blocker.intercepting,
+        }
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Network blocking profile benchmark")
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument('--url', help="page to load (default: the local stand-in)")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = StandinServer(latency={'page': 0.1}).start()
+        url = server.url
+
+    results = {'url': url, 'profiles': {}}
+    try:
+        for profile in args.profiles:
+            runs = [load_once(profile, url) for _ in range(args.runs)]
+            loaded = [r['first_input'] for r in runs if r['first_input'] is not None]
+            results['profiles'][profile] = {
+                'runs': runs,
+                'first_input_median': round(statistics.median(loaded), 3) if loaded else None,
+                'bytes_median': statistics.median(r['bytes'] for r in runs),
+                'blocked_median': statistics.median(r['blocked'] for r in runs),
+            }
+    finally:
+        if server:
+            server.stop()
+
+    baseline = results['profiles'].get('none', {}).get('bytes_median')
+    print(f"\n{'profile':<12} {'first input':>12} {'blocked':>8} {'downloaded':>12} {'saved':>10}")
+    for profile, result in results['profiles'].items():
+        saved = baseline - result['bytes_median'] if baseline is not None else None
+        result['bytes_saved'] = saved
+        first_input = result['first_input_median']
+        print(f"{profile:<12} {(f'{first_input:.2f}s' if first_input else 'timeout'):>12} "
+              f"{result['blocked_median']:>8} {result['bytes_median'] / 1024:>9.0f} KB "
+              f"{(f'{saved / 1024:.0f} KB' if saved is not None else '-'):>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
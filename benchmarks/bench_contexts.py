@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Browser backend benchmark: memory per session and session start latency for
+app.py's one-Chrome-per-session mode ('process') against one shared Chrome
+with an isolated browser context per session ('contexts').
+
+Each session is created through app.create_driver() and opens the local
+stand-in auth page. The benchmark also checks that a cookie and a
+localStorage entry set in one session are invisible to the others.
+
+Usage:
+    python -m benchmarks.bench_contexts                  # 5 sessions per mode
+    python -m benchmarks.bench_contexts --sessions 10 --modes contexts
+    python -m benchmarks.bench_contexts --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the benchmark creates every driver itself: keep app.py's pool from warming any
+os.environ.setdefault('DAMANCOM_POOL_SIZE', '0')
+
+import app
+from benchmarks.standin_server import StandinServer
+from damancom import procs
+
+MODES = ['process', 'contexts']
+
+
+def chrome_rss():
+    """RSS of every chromedriver/Chrome process below this one."""
+    return procs.rss_bytes(procs.process_tree(os.getpid())[1:])
+
+
+def isolated(drivers):
+    """A cookie and a localStorage entry set in the first session must not show up elsewhere."""
+    if len(drivers) < 2:
+        return None
+    drivers[0].execute_script("document.cookie = 'bench=leak; path=/'; localStorage.setItem('bench', 'leak');")
+    for driver in drivers[1:]:
+        seen = driver.execute_script("return [document.cookie, localStorage.getItem('bench')];")
+        if 'bench=leak' in (seen[0] or '') or seen[1] == 'leak':
+            return False
+    return True
+
+
+def run_mode(mode, sessions, url):
+    app.BROWSER_MODE = mode
+    baseline = chrome_rss()
+    drivers, starts = [], []
+    try:
+        for _ in range(sessions):
+            started = time.perf_counter()
+            driver = app.create_driver()
+            driver.get(url)
+            starts.append(time.perf_counter() - started)
+            drivers.append(driver)
+
+        time.sleep(1)   # let renderers settle before measuring
+        total = chrome_rss() - baseline
+        isolation = isolated(drivers)
+    finally:
+        stops = []
+        for driver in drivers:
+            started = time.perf_counter()
+            driver.quit()
+            stops.append(time.perf_counter() - started)
+        if app.shared_chrome:
+            app.shared_chrome.stop()
+            app.shared_chrome = None
+
+    return {
+        'sessions': sessions,
+        'start_first': round(starts[0], 3),
+        'start_median': round(statistics.median(starts), 3),
+        'start_median_after_first': round(statistics.median(starts[1:]), 3) if sessions > 1 else None,
+        'teardown_median': round(statistics.median(stops), 3),
+        'rss_total_mb': round(total / 1024 / 1024, 1) if procs.available() else None,
+        'rss_per_session_mb': round(total / sessions / 1024 / 1024, 1) if procs.available() else None,
+        'isolated': isolation,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser backend benchmark")
+    parser.add_argument('--sessions', type=int, default=5)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    server = StandinServer(latency={'page': 0}).start()
+    results = {}
+    try:
+        for mode in args.modes:
+            results[mode] = result = run_mode(mode, args.sessions, server.url)
+            print(f"\n=== {mode} ({result['sessions']} sessions) ===")
+            print(f"  {'first session start':<30} {result['start_first']:>7.2f}s")
+            if result['start_median_after_first'] is not None:
+                print(f"  {'next sessions start (median)':<30} {result['start_median_after_first']:>7.2f}s")
+            print(f"  {'teardown (median)':<30} {result['teardown_median']:>7.2f}s")
+            if result['rss_per_session_mb'] is not None:
+                print(f"  {'memory per session':<30} {result['rss_per_session_mb']:>6.1f}MB "
+                      f"({result['rss_total_mb']:.1f}MB total)")
+            if result['isolated'] is not None:
+                print(f"  {'cookies/storage isolated':<30} {'yes' if result['isolated'] else 'NO':>7}")
+    finally:
+        server.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
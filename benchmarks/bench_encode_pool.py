@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Encode pool benchmark: frames per second through damancom.encode_pool for
+each worker count, and what happens under backpressure.
+
+    throughput    a burst of frames from distinct sessions, nothing dropped,
+                  for 1, 2, 4 ... up to the CPU count workers
+    backpressure  viewers polling faster than the pool can encode, with the
+                  default queue bound: frames served, superseded and dropped,
+                  and the queue wait of the frames that were served
+
+Usage:
+    python -m benchmarks.bench_encode_pool                       # synthetic frame, JPEG q70
+    python -m benchmarks.bench_encode_pool --workers 1 2 4 8 --frames 400
+    python -m benchmarks.bench_encode_pool --png damancom_debug.png --format webp
+    python -m benchmarks.bench_encode_pool --viewers 40 --seconds 5
+    python -m benchmarks.bench_encode_pool --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_frames import synthetic_frame
+from damancom.encode_pool import EncodePool, FrameDropped
+from damancom.frames import FrameEncoder
+
+
+def default_workers():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def throughput(encoder, png, workers, frames):
+    pool = EncodePool(workers=workers, max_pending=frames)
+    try:
+        pool.run('warm-up', encoder.encode, png)
+        started = time.perf_counter()
+        futures = [pool.submit(i, encoder.encode, png) for i in range(frames)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+    return frames / elapsed
+
+
+def backpressure(encoder, png, workers, viewers, seconds, interval):
+    """`viewers` threads each asking for a frame every `interval` seconds."""
+    queued = []
+    pool = EncodePool(workers=workers, observe=lambda q, e: queued.append(q))
+    served, failed = [0], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def viewer(n):
+        while time.perf_counter() < deadline:
+            try:
+                pool.run(n, encoder.encode, png, timeout=5)
+                outcome = served
+            except (FrameDropped, FutureTimeout):
+                outcome = failed
+            with lock:
+                outcome[0] += 1
+            time.sleep(interval)
+
+    threads = [threading.Thread(target=viewer, args=(n,)) for n in range(viewers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = pool.status()
+    pool.shutdown()
+    return {
+        'workers': workers,
+        'viewers': viewers,
+        'served_per_second': round(served[0] / seconds, 1),
+        'not_served': failed[0],
+        'superseded': stats['superseded'],
+        'dropped': stats['dropped'],
+        'queue_wait_median_ms': round(statistics.median(queued) * 1000, 1) if queued else None,
+        'queue_wait_max_ms': round(max(queued) * 1000, 1) if queued else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame encode pool benchmark")
+    parser.add_argument('--png', help="PNG capture to encode (default: a synthetic login page)")
+    parser.add_argument('--format', default='jpeg', choices=['jpeg', 'webp', 'png'])
+    parser.add_argument('--quality', type=int, default=70)
+    parser.add_argument('--size', default='1024x576',
+                        help="frame size, different from the capture so every frame is resized")
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers())
+    parser.add_argument('--frames', type=int, default=200, help="frames per throughput run")
+    parser.add_argument('--viewers', type=int, default=20, help="polling viewers in the backpressure run")
+    parser.add_argument('--seconds', type=float, default=3.0, help="length of the backpressure run")
+    parser.add_argument('--interval', type=float, default=0.05, help="seconds between a viewer's polls")
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.png:
+        with open(args.png, 'rb') as f:
+            png = f.read()
+    else:
+        png = synthetic_frame()
+    width, height = (int(n) for n in args.size.split('x'))
+    encoder = FrameEncoder(args.format, quality=args.quality, size=(width, height))
+
+    print(f"{args.format} q{args.quality} at {args.size}, {os.cpu_count()} CPUs\n")
+    print(f"{'workers':>8} {'frames/s':>10} {'scaling':>8}")
+    results = {'format': args.format, 'quality': args.quality, 'size': args.size,
+               'cpus': os.cpu_count(), 'throughput': [], 'backpressure': []}
+    base = None
+    for workers in args.workers:
+        rate = throughput(encoder, png, workers, args.frames)
+        base = base or rate
+        results['throughput'].append({'workers': workers, 'frames_per_second': round(rate, 1),
+                                      'scaling': round(rate / base, 2)})
+        print(f"{workers:>8} {rate:>10.1f} {rate / base:>7.2f}x")
+
+    print(f"\nBackpressure: {args.viewers} viewers polling every {args.interval}s for {args.seconds}s")
+    print(f"{'workers':>8} {'served/s':>9} {'dropped':>8} {'superseded':>11} {'wait p50':>9} {'wait max':>9}")
+    for workers in (min(args.workers), max(args.workers)):
+        row = backpressure(encoder, png, workers, args.viewers, args.seconds, args.interval)
+        results['backpressure'].append(row)
+        print(f"{workers:>8} {row['served_per_second']:>9} {row['dropped']:>8} {row['superseded']:>11} "
+              f"{row['queue_wait_median_ms'] or 0:>7}ms {row['queue_wait_max_ms'] or 0:>7}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
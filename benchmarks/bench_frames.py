@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Frame encoding benchmark: bytes per frame and ms per frame for the legacy
+get_screenshot() path (PNG decode + LANCZOS resize + PNG + base64) against
+the FrameEncoder settings used by app.py.
+
+Usage:
+    python -m benchmarks.bench_frames                      # synthetic login-page frame
+    python -m benchmarks.bench_frames --png damancom_debug.png
+    python -m benchmarks.bench_frames --url https://www.damancom.ma/fr/authentification
+    python -m benchmarks.bench_frames --json results.json
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from damancom.frames import FrameEncoder
+
+CONFIGS = [
+    ('png passthrough', 'png', 0),
+    ('jpeg q85', 'jpeg', 85),
+    ('jpeg q70', 'jpeg', 70),
+    ('jpeg q50', 'jpeg', 50),
+    ('webp q70', 'webp', 70),
+    ('webp q50', 'webp', 50),
+]
+
+
+def legacy_encode(png_bytes):
+    """The original app.py get_screenshot() pipeline."""
+    img = Image.open(io.BytesIO(png_bytes))
+    img = img.resize((1280, 720), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue())
+
+
+def synthetic_frame(size=(1280, 720)):
+    """A login-page-like capture: flat background, a card, fields and text."""
+    img = Image.new('RGB', size, (244, 246, 250))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, size[0], 70], fill=(0, 84, 147))
+    draw.text((30, 25), "DAMANCOM - Authentification", fill=(255, 255, 255))
+    draw.rounded_rectangle([390, 140, 890, 600], radius=12, fill=(255, 255, 255), outline=(220, 224, 230))
+    draw.text((430, 180), "S'authentifier avec OTP", fill=(30, 30, 30))
+    for i, label in enumerate(["IDENTIFIANT", "MOT DE PASSE"]):
+        top = 250 + i * 90
+        draw.text((430, top - 22), label, fill=(90, 90, 90))
+        draw.rectangle([430, top, 850, top + 44], outline=(200, 200, 200))
+    draw.rounded_rectangle([430, 450, 850, 500], radius=6, fill=(0, 102, 204))
+    draw.text((610, 467), "Suivant", fill=(255, 255, 255))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def capture_live(url):
+    from selenium import webdriver
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--window-size=1280,720")
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get(url)
+        time.sleep(2)
+        return driver.get_screenshot_as_png()
+    finally:
+        driver.quit()
+
+
+def measure(fn, png_bytes, runs):
+    fn(png_bytes)  # warm-up
+    start = time.perf_counter()
+    for _ in range(runs):
+        out = fn(png_bytes)
+    elapsed = time.perf_counter() - start
+    return len(out), elapsed / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--png', help="PNG capture to encode (e.g. a saved get_screenshot_as_png())")
+    parser.add_argument('--url', help="capture a frame from this URL with headless Chrome")
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    if args.png:
+        with open(args.png, 'rb') as f:
+            png_bytes = f.read()
+        source = args.png
+    elif args.url:
+        png_bytes = capture_live(args.url)
+        source = args.url
+    else:
+        png_bytes = synthetic_frame()
+        source = 'synthetic'
+
+    results = []
+    size, ms = measure(legacy_encode, png_bytes, args.runs)
+    results.append({'name': 'legacy png+base64', 'bytes': size, 'ms': ms})
+
+    for name, fmt, quality in CONFIGS:
+        encoder = FrameEncoder(fmt, quality=quality or 70)
+        size, ms = measure(lambda data: encoder.encode(data).data, png_bytes, args.runs)
+        results.append({'name': name, 'bytes': size, 'ms': ms})
+
+    baseline = results[0]
+    print(f"Source: {source} ({len(png_bytes)} bytes PNG), {args.runs} runs each\n")
+    print(f"{'pipeline':<20} {'bytes/frame':>12} {'ms/frame':>10} {'size':>8} {'speed':>8}")
+    for row in results:
+        row['size_ratio'] = row['bytes'] / baseline['bytes']
+        row['speedup'] = baseline['ms'] / row['ms'] if row['ms'] else float('inf')
+        print(f"{row['name']:<20} {row['bytes']:>12} {row['ms']:>10.2f} "
+              f"{row['size_ratio']:>7.0%} {row['speedup']:>7.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'source': source, 'runs': args.runs, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
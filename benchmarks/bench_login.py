@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Offline login-flow benchmark: drives the main.py, app.py and gui_login.py
+flows headless against the local stand-in auth page (benchmarks/standin_server.py)
+and reports per-step and end-to-end timings, WebDriver round-trips and peak
+Chrome RSS. Results can be written as JSON to compare commits.
+
+Usage:
+    python -m benchmarks.bench_login                         # all flows, 1 run each
+    python -m benchmarks.bench_login --flows app main --runs 3
+    python -m benchmarks.bench_login --latency password=1.5 --latency otp=0.2
+    python -m benchmarks.bench_login --json results.json
+    python -m benchmarks.bench_login --input-mode keys     # per-keystroke form entry
+
+The gui flow needs a display for Tk and is skipped without one.
+"""
+
+import argparse
+import builtins
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the benchmark creates every driver itself: keep app.py's pool from warming any
+os.environ.setdefault('DAMANCOM_POOL_SIZE', '0')
+
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+from benchmarks.standin_server import StandinServer, DEFAULT_LATENCY, parse_latency
+from damancom import procs, bulk_input
+
+FLOWS = ['app', 'main', 'gui']
+USERNAME = 'bench.user'
+PASSWORD = 'bench-password'
+OTP_CODE = '123456'
+
+
+class RoundTrips:
+    """Counts WebDriver commands sent by any driver in this process."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self._original = None
+
+    def __enter__(self):
+        self._original = RemoteConnection.execute
+        counter = self
+
+        def execute(connection, command, params):
+            with counter._lock:
+                counter.count += 1
+            return counter._original(connection, command, params)
+
+        RemoteConnection.execute = execute
+        return self
+
+    def __exit__(self, *exc):
+        RemoteConnection.execute = self._original
+
+
+class RssSampler:
+    """Peak resident memory of the Chrome/chromedriver processes we started."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        if not procs.available():
+            return
+        children = procs.process_tree(os.getpid())[1:]
+        self.peak = max(self.peak, procs.rss_bytes(children))
+
+
+class StepClock:
+    """Splits a run into steps at timestamped markers."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks = [('startup', self.started)]
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter()))
+
+    def steps(self, finished):
+        marks = [(label, at) for label, at in self.marks if at < finished]
+        bounds = marks + [(None, finished)]
+        return {label: round(bounds[i + 1][1] - at, 3)
+                for i, (label, at) in enumerate(marks)}
+
+
+def step_label(line):
+    """'=== Step 2: Entering username ===' -> 'Step 2: Entering username'."""
+    line = line.strip()
+    if line.startswith('===') and line.endswith('==='):
+        return line.strip('= ').strip()
+    return None
+
+
+# ----- flows -----
+
+def run_app(url):
+    """The Flask routes, called in-process through the test client."""
+    import app
+
+    app.URL = url
+    client = app.app.test_client()
+    clock = StepClock()
+
+    result = client.post('/start_session').get_json()
+    if not result.get('success'):
+        raise RuntimeError(f"start_session failed: {result.get('error')}")
+    session_id = result['session_id']
+
+    for route, payload in [('/submit_username', {'username': USERNAME}),
+                           ('/submit_password', {'password': PASSWORD}),
+                           ('/submit_otp', {'otp': OTP_CODE})]:
+        clock.mark(route)
+        result = client.post(route, json=payload).get_json()
+        if not result.get('success'):
+            raise RuntimeError(f"{route} failed: {result.get('error')}")
+
+    finished = time.perf_counter()
+    clock.mark('cleanup')
+    session = app.active_sessions.pop(session_id, None)
+    if session:
+        app.release_session(session)
+    return clock, finished, bool(result.get('logged_in'))
+
+
+class _MarkingStdout(io.TextIOBase):
+    def __init__(self, clock, lines):
+        self.clock = clock
+        self.lines = lines
+        self._partial = ''
+
+    def write(self, text):
+        self._partial += text
+        *complete, self._partial = self._partial.split('\n')
+        for line in complete:
+            self.lines.append(line)
+            label = step_label(line)
+            if label:
+                self.clock.mark(label)
+        return len(text)
+
+
+def run_main(url):
+    """main.py's CLI flow with scripted input() answers."""
+    import main
+
+    answers = iter([USERNAME, PASSWORD, OTP_CODE])
+    clock = StepClock()
+    lines = []
+    saved = (builtins.input, sys.stdout, main.URL, main.HEADLESS, main.time)
+    builtins.input = lambda prompt='': next(answers)
+    sys.stdout = _MarkingStdout(clock, lines)
+    main.URL, main.HEADLESS = url, True
+    # skip the 10s inspection pause before quitting
+    main.time = types.SimpleNamespace(sleep=lambda seconds: clock.mark('quit'),
+                                      perf_counter=time.perf_counter)
+    try:
+        main.main()
+    finally:
+        builtins.input, sys.stdout, main.URL, main.HEADLESS, main.time = saved
+
+    finished = dict(clock.marks).get('quit', time.perf_counter())
+    return clock, finished, any('Login successful' in line for line in lines)
+
+
+def run_gui(url):
+    """gui_login.py's run_automation on a real (hidden) Tk window."""
+    import tkinter as tk
+    import gui_login
+
+    root = tk.Tk()
+    root.withdraw()
+    gui = gui_login.DamancomLoginGUI(root)
+    gui.username_var.set(USERNAME)
+    gui.password_var.set(PASSWORD)
+    gui.headless_var.set(True)
+
+    clock = StepClock()
+    lines = []
+    log = gui.log
+
+    def marking_log(message):
+        for line in str(message).split('\n'):
+            lines.append(line)
+            label = step_label(line)
+            if label:
+                clock.mark(label)
+        log(message)
+
+    gui.log = marking_log
+    saved = (gui_login.URL, gui_login.time, gui_login.simpledialog, gui_login.messagebox)
+    gui_login.URL = url
+    gui_login.time = types.SimpleNamespace(sleep=lambda seconds: clock.mark('quit'))
+    gui_login.simpledialog = types.SimpleNamespace(askstring=lambda *a, **kw: OTP_CODE)
+    gui_login.messagebox = types.SimpleNamespace(showinfo=lambda *a, **kw: None,
+                                                 showerror=lambda *a, **kw: None)
+    try:
+        gui.run_automation()
+    finally:
+        gui_login.URL, gui_login.time, gui_login.simpledialog, gui_login.messagebox = saved
+        root.destroy()
+
+    finished = dict(clock.marks).get('quit', time.perf_counter())
+    return clock, finished, any('Login successful' in line for line in lines)
+
+
+RUNNERS = {'app': run_app, 'main': run_main, 'gui': run_gui}
+
+
+def gui_available():
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def input_round_trips():
+    return sum(stats['round_trips'] for stats in bulk_input.input_stats().values())
+
+
+def run_flow(flow, url):
+    entry_before = input_round_trips()
+    with RoundTrips() as trips, RssSampler() as rss:
+        clock, finished, logged_in = RUNNERS[flow](url)
+    return {
+        'steps': clock.steps(finished),
+        'total': round(finished - clock.started, 3),
+        'round_trips': trips.count,
+        'input_round_trips': input_round_trips() - entry_before,
+        'peak_rss_mb': round(rss.peak / 1024 / 1024, 1) if procs.available() else None,
+        'logged_in': logged_in,
+    }
+
+
+def summarize(runs):
+    return {
+        'total_median': round(statistics.median(r['total'] for r in runs), 3),
+        'total_min': round(min(r['total'] for r in runs), 3),
+        'round_trips_median': statistics.median(r['round_trips'] for r in runs),
+        'input_round_trips_median': statistics.median(r['input_round_trips'] for r in runs),
+        'peak_rss_mb_max': max((r['peak_rss_mb'] or 0) for r in runs) or None,
+        'all_logged_in': all(r['logged_in'] for r in runs),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline login-flow benchmark")
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, default=FLOWS)
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--latency', action='append', metavar='STEP=SECONDS',
+                        help=f"stand-in latency per step, steps: {', '.join(DEFAULT_LATENCY)}")
+    parser.add_argument('--input-mode', choices=['bulk', 'keys'], default=bulk_input.MODE,
+                        help="form entry: one script call per form (bulk) or clear+send_keys per field (keys)")
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+    bulk_input.MODE = args.input_mode
+
+    latency = dict(DEFAULT_LATENCY, **parse_latency(args.latency))
+    server = StandinServer(latency=latency, otp_code=OTP_CODE).start()
+    print(f"Stand-in auth page: {server.url}")
+
+    flows = list(args.flows)
+    if 'gui' in flows and not gui_available():
+        print("⚠️  No display for Tk - skipping the gui flow")
+        flows.remove('gui')
+
+    results = {'commit': git_commit(), 'latency': latency, 'runs': args.runs,
+               'input_mode': args.input_mode, 'flows': {}}
+    try:
+        for flow in flows:
+            runs = []
+            for i in range(args.runs):
+                try:
+                    runs.append(run_flow(flow, server.url))
+                except Exception as e:
+                    print(f"✗ {flow} run {i + 1} failed: {e}")
+            if not runs:
+                continue
+            results['flows'][flow] = {'runs': runs, 'summary': summarize(runs)}
+
+            summary = results['flows'][flow]['summary']
+            print(f"\n=== {flow} ({len(runs)} run{'s' if len(runs) > 1 else ''}) ===")
+            for label, seconds in runs[-1]['steps'].items():
+                print(f"  {label:<40} {seconds:>7.2f}s")
+            print(f"  {'end-to-end (median)':<40} {summary['total_median']:>7.2f}s")
+            print(f"  {'WebDriver round-trips (median)':<40} {summary['round_trips_median']:>7}")
+            print(f"  {'  of which form entry (' + args.input_mode + ')':<40} "
+                  f"{summary['input_round_trips_median']:>7}")
+            if summary['peak_rss_mb_max']:
+                print(f"  {'peak Chrome RSS':<40} {summary['peak_rss_mb_max']:>6.1f}MB")
+            print(f"  {'logged in':<40} {'yes' if summary['all_logged_in'] else 'NO':>7}")
+    finally:
+        server.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time and time to first prompt for each entry point,
+each measured in a fresh interpreter.
+
+    main  import main; first prompt = "Username:" shown by `python main.py`
+    gui   import gui_login; first prompt = login window drawn
+    app   import app; first prompt = GET / answered
+
+Times include interpreter start-up (shown separately as the baseline). The
+background browser start is off (DAMANCOM_PRESTART=0) unless --prestart is
+given: it begins only after the prompt and would launch Chrome every run.
+
+Usage:
+    python -m benchmarks.bench_startup                      # all entry points, 5 runs each
+    python -m benchmarks.bench_startup --entries main gui --runs 10
+    python -m benchmarks.bench_startup --imports 10         # slowest direct imports of each entry
+    python -m benchmarks.bench_startup --max 1.5            # exit 1 if a first prompt takes longer
+    python -m benchmarks.bench_startup --json results.json
+
+The gui entry needs a display for Tk and is skipped without one.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_login import git_commit, gui_available
+
+ENTRIES = ['main', 'gui', 'app']
+
+MODULES = {'main': 'main', 'gui': 'gui_login', 'app': 'app'}
+
+# (command, text printed once the first prompt is up)
+FIRST_PROMPT = {
+    'main': ([sys.executable, 'main.py'], 'Username:'),
+    'gui': ([sys.executable, '-c',
+             "import tkinter as tk, gui_login\n"
+             "root = tk.Tk()\n"
+             "gui_login.DamancomLoginGUI(root)\n"
+             "root.update()\n"
+             "print('WINDOW READY', flush=True)\n"
+             "root.destroy()\n"], 'WINDOW READY'),
+    'app': ([sys.executable, '-c',
+             "import app\n"
+             "app.app.test_client().get('/')\n"
+             "print('APP READY', flush=True)\n"], 'APP READY'),
+}
+
+IMPORT_SCRIPT = ("import time\n"
+                 "started = time.perf_counter()\n"
+                 "import %s\n"
+                 "print(time.perf_counter() - started)\n")
+
+
+def environment(prestart):
+    env = dict(os.environ)
+    env['PYTHONUNBUFFERED'] = '1'
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    # no pre-warmed browsers or background Chrome while measuring start-up
+    env['DAMANCOM_POOL_SIZE'] = '0'
+    if not prestart:
+        env['DAMANCOM_PRESTART'] = '0'
+    return env
+
+
+def baseline(env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - started
+
+
+def import_time(entry, env):
+    result = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT % MODULES[entry]], cwd=ROOT,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def first_prompt(entry, env, timeout=60):
+    """Seconds from launching the process until it shows its first prompt."""
+    command, marker = FIRST_PROMPT[entry]
+    seen = threading.Event()
+    output = []
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    def read():
+        # the prompt has no newline after it: read in chunks, not lines
+        for chunk in iter(lambda: process.stdout.read1(4096), b''):
+            output.append(chunk)
+            if marker.encode() in b''.join(output):
+                seen.set()
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    shown = seen.wait(timeout)
+    elapsed = time.perf_counter() - started
+
+    # end of input makes main.py give up at its prompt
+    process.stdin.close()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    reader.join(5)
+    if not shown:
+        tail = b''.join(output).decode(errors='replace').strip().splitlines()[-1:]
+        raise RuntimeError(f"no first prompt within {timeout}s: {' '.join(tail)}")
+    return elapsed
+
+
+def slowest_imports(entry, env, count):
+    """The entry module's direct imports by cumulative time (python -X importtime)."""
+    module = MODULES[entry]
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or line.count('|') != 2:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # children are printed before their parent: collect depth 1 until the module itself
+        if depth == 0:
+            if name.strip() == module:
+                return sorted(children, key=lambda m: m[1], reverse=True)[:count]
+            children = []
+        elif depth == 1:
+            children.append((name.strip(), int(cumulative) / 1e6))
+    return []
+
+
+def run_entry(entry, runs, env, imports):
+    imports_s = [import_time(entry, env) for _ in range(runs)]
+    prompts_s = [first_prompt(entry, env) for _ in range(runs)]
+    result = {
+        'import_median': round(statistics.median(imports_s), 3),
+        'import_min': round(min(imports_s), 3),
+        'first_prompt_median': round(statistics.median(prompts_s), 3),
+        'first_prompt_min': round(min(prompts_s), 3),
+    }
+    if imports:
+        result['slowest_imports'] = [[name, round(seconds, 3)]
+                                     for name, seconds in slowest_imports(entry, env, imports)]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entry point start-up benchmark")
+    parser.add_argument('--entries', nargs='+', choices=ENTRIES, default=ENTRIES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--imports', type=int, default=0, metavar='N',
+                        help="also list the N slowest direct imports of each entry point")
+    parser.add_argument('--prestart', action='store_true',
+                        help="leave the background browser start on (launches Chrome every run)")
+    parser.add_argument('--max', type=float, metavar='SECONDS',
+                        help="exit with status 1 if a median time to first prompt exceeds this")
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    env = environment(args.prestart)
+    entries = list(args.entries)
+    if 'gui' in entries and not gui_available():
+        print("⚠️  No display for Tk - skipping the gui entry point")
+        entries.remove('gui')
+
+    results = {'commit': git_commit(), 'python': sys.version.split()[0], 'runs': args.runs,
+               'interpreter_baseline': round(statistics.median(baseline(env) for _ in range(args.runs)), 3),
+               'entries': {}}
+    print(f"Interpreter start-up (python -c pass): {results['interpreter_baseline']:.3f}s")
+
+    over = []
+    for entry in entries:
+        try:
+            result = results['entries'][entry] = run_entry(entry, args.runs, env, args.imports)
+        except Exception as e:
+            print(f"✗ {entry} failed: {e}")
+            continue
+        print(f"\n=== {entry} ({args.runs} run{'s' if args.runs > 1 else ''}) ===")
+        print(f"  {'import ' + MODULES[entry] + ' (median)':<32} {result['import_median']:>7.3f}s")
+        print(f"  {'first prompt (median)':<32} {result['first_prompt_median']:>7.3f}s")
+        for name, seconds in result.get('slowest_imports', []):
+            print(f"    {name:<30} {seconds:>7.3f}s")
+        if args.max is not None and result['first_prompt_median'] > args.max:
+            over.append(entry)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if over:
+        print(f"\n❌ First prompt slower than {args.max}s: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Damancom authentication page.
+
+It reproduces the parts of the real flow the automation touches: the
+"S'authentifier avec OTP" button, the username form with Suivant, the password
+form, six type='tel' maxlength='1' OTP inputs with Valider, and a /private/
+dashboard. Like the real page it also pulls in a banner image, a web font and
+a tracker script the login never needs. Every transition goes through a
+server round trip whose latency is configurable, so login-flow timings can
+be measured offline.
+
+With a Maildir, the OTP is also "emailed" there once the password is
+submitted, to try DAMANCOM_OTP_MAILBOX (damancom/otp_mailbox.py) offline.
+
+Run standalone:
+    python -m benchmarks.standin_server --port 8765 --latency password=1.5
+    python -m benchmarks.standin_server --maildir /tmp/Maildir --mail-delay 2
+"""
+
+import argparse
+import json
+import mailbox
+import threading
+import time
+from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+AUTH_PATH = '/fr/authentification'
+DASHBOARD_PATH = '/fr/private/tableau-de-bord'
+
+# seconds, per step
+DEFAULT_LATENCY = {
+    'page': 0.3,        # initial HTML response
+    'otp_button': 0.2,  # "S'authentifier avec OTP" -> username form
+    'username': 0.4,    # Suivant -> password form
+    'password': 0.6,    # password submitted -> OTP page
+    'otp': 0.5,         # Valider -> dashboard / error
+    'asset': 0.3,       # each image, font and tracker script the page pulls in
+}
+
+# what the real page downloads but the login never needs
+ASSETS = {
+    '/assets/banner.jpg': ('image/jpeg', 180 * 1024),
+    '/assets/brand.woff2': ('font/woff2', 60 * 1024),
+    '/www.googletagmanager.com/gtm.js': ('application/javascript', 90 * 1024),
+}
+
+AUTH_PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>Damancom - Authentification</title>
+<script async src="/www.googletagmanager.com/gtm.js"></script>
+<style>
+  @font-face { font-family: 'Brand'; src: url('/assets/brand.woff2') format('woff2'); }
+  body { font-family: 'Brand', Arial, sans-serif; background: #f4f6fa; margin: 0; }
+  header { background: #005493; color: white; padding: 20px 30px; }
+  .card { width: 460px; margin: 60px auto; background: white; padding: 30px; border-radius: 12px; }
+  input { display: block; width: 100%%; margin: 8px 0 16px; padding: 10px; box-sizing: border-box; }
+  .otp input { display: inline-block; width: 42px; margin: 4px; text-align: center; }
+  .btn-primary { background: #0066cc; color: white; border: 0; padding: 12px 20px; border-radius: 6px; }
+  .hidden { display: none; }
+  .error { color: #c0392b; }
+</style>
+</head>
+<body>
+<header>DAMANCOM</header>
+<img src="/assets/banner.jpg" alt="" width="1280" height="120">
+<div class="card">
+  <div id="start">
+    <h2>Authentification</h2>
+    <button type="button" class="btn btn-primary" id="otpButton">S'authentifier avec OTP</button>
+  </div>
+
+  <div id="usernameStep" class="hidden">
+    <input type="text" name="identifiant" placeholder="IDENTIFIANT">
+    <button type="button" class="btn btn-primary" id="usernameNext">Suivant</button>
+  </div>
+
+  <div id="passwordStep" class="hidden">
+    <input type="password" name="motdepasse" placeholder="MOT DE PASSE">
+    <button type="button" class="btn btn-primary" id="passwordNext">Suivant</button>
+  </div>
+
+  <div id="otpStep" class="hidden">
+    <p>Saisissez le code re&ccedil;u par SMS / Email</p>
+    <div class="otp">
+      <input type="tel" maxlength="1"><input type="tel" maxlength="1"><input type="tel" maxlength="1">
+      <input type="tel" maxlength="1"><input type="tel" maxlength="1"><input type="tel" maxlength="1">
+    </div>
+    <p id="otpError" class="error hidden"></p>
+    <button type="button" class="btn btn-primary" id="valider">Valider</button>
+  </div>
+</div>
+<script>
+  var config = %(config)s;
+
+  function show(id) {
+    ['start', 'usernameStep', 'passwordStep', 'otpStep'].forEach(function(step) {
+      document.getElementById(step).classList.toggle('hidden', step !== id);
+    });
+  }
+
+  function step(name, payload) {
+    return fetch('/api/' + name, {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify(payload || {})
+    }).then(function(r) { return r.json(); });
+  }
+
+  document.getElementById('otpButton').addEventListener('click', function() {
+    step('otp_button').then(function() { show('usernameStep'); });
+  });
+
+  document.getElementById('usernameNext').addEventListener('click', function() {
+    var value = document.querySelector('[name=identifiant]').value;
+    step('username', {username: value}).then(function() { show('passwordStep'); });
+  });
+
+  var passwordSent = false;
+  function submitPassword() {
+    if (passwordSent) return;
+    passwordSent = true;
+    var value = document.querySelector('[name=motdepasse]').value;
+    step('password', {password: value}).then(function() { show('otpStep'); });
+  }
+  document.getElementById('passwordNext').addEventListener('click', submitPassword);
+
+  // main.py and gui_login.py never click after the password: optionally submit
+  // once typing has stopped, like a form that validates on idle
+  var idleTimer = null;
+  document.querySelector('[name=motdepasse]').addEventListener('input', function() {
+    if (!config.password_autosubmit) return;
+    clearTimeout(idleTimer);
+    idleTimer = setTimeout(submitPassword, config.typing_idle_ms);
+  });
+
+  document.getElementById('valider').addEventListener('click', function() {
+    var code = Array.prototype.map.call(
+      document.querySelectorAll('.otp input'), function(el) { return el.value; }).join('');
+    step('otp', {otp: code}).then(function(result) {
+      if (result.ok) {
+        window.location.href = result.next;
+      } else {
+        var error = document.getElementById('otpError');
+        error.textContent = result.error;
+        error.classList.remove('hidden');
+      }
+    });
+  });
+</script>
+</body>
+</html>
+"""
+
+DASHBOARD_PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head><meta charset="utf-8"><title>Damancom - Espace priv&eacute;</title></head>
+<body>
+<nav><a href="/fr/private/profil">Profil</a> <a href="%(auth)s">Se d&eacute;connecter</a></nav>
+<h1>Bienvenue</h1>
+<div class="dashboard">Tableau de bord</div>
+</body>
+</html>
+"""
+
+
+class StandinServer:
+    """
+    latency:             per-step delays in seconds (see DEFAULT_LATENCY)
+    otp_code:            the code Valider accepts
+    password_autosubmit: submit the password once typing stops for
+                         typing_idle_ms, for flows that never click Suivant
+    maildir:             Maildir the OTP email is delivered to, mail_delay
+                         seconds after the password is submitted
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=None, otp_code='123456',
+                 password_autosubmit=True, typing_idle_ms=400, maildir=None, mail_delay=1.0):
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.otp_code = otp_code
+        self.maildir = maildir
+        self.mail_delay = mail_delay
+        self.password_autosubmit = password_autosubmit
+        self.typing_idle_ms = typing_idle_ms
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{AUTH_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def send_otp_mail(self):
+        message = EmailMessage()
+        message['From'] = 'Damancom <no-reply@damancom.ma>'
+        message['Subject'] = 'Votre code de connexion'
+        message.set_content(f"Bonjour,\n\nVotre code OTP est : {self.otp_code}\n"
+                            f"Il est valable 5 minutes.\n")
+        mailbox.Maildir(self.maildir, create=True).add(message)
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type='text/html; charset=utf-8'):
+                data = body.encode() if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                standin.requests.append(('GET', path, time.monotonic()))
+                if path == AUTH_PATH:
+                    time.sleep(standin.latency['page'])
+                    config = json.dumps({
+                        'password_autosubmit': standin.password_autosubmit,
+                        'typing_idle_ms': standin.typing_idle_ms,
+                    })
+                    self._send(200, AUTH_PAGE % {'config': config})
+                elif path in ASSETS:
+                    time.sleep(standin.latency['asset'])
+                    content_type, size = ASSETS[path]
+                    body = content_type.encode() + b';' * (size - len(content_type))
+                    if content_type == 'application/javascript':
+                        body = b'/*' + body[4:] + b'*/'
+                    self._send(200, body, content_type)
+                elif path.startswith('/fr/private/'):
+                    time.sleep(standin.latency['page'])
+                    self._send(200, DASHBOARD_PAGE % {'auth': AUTH_PATH})
+                else:
+                    self._send(404, 'Not found', 'text/plain')
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                standin.requests.append(('POST', path, time.monotonic()))
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                name = path.rsplit('/', 1)[-1]
+                if name not in standin.latency:
+                    self._send(404, '{}', 'application/json')
+                    return
+                time.sleep(standin.latency[name])
+                result = {'ok': True}
+                if name == 'password' and standin.maildir:
+                    threading.Timer(standin.mail_delay, standin.send_otp_mail).start()
+                if name == 'otp':
+                    if payload.get('otp') == standin.otp_code:
+                        result['next'] = DASHBOARD_PATH
+                    else:
+                        result = {'ok': False, 'error': 'Code OTP invalide'}
+                self._send(200, json.dumps(result), 'application/json')
+
+        return Handler
+
+
+def parse_latency(values):
+    latency = {}
+    for value in values or []:
+        name, _, seconds = value.partition('=')
+        if name not in DEFAULT_LATENCY:
+            raise SystemExit(f"Unknown step '{name}' (expected one of {', '.join(DEFAULT_LATENCY)})")
+        latency[name] = float(seconds)
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Damancom auth page")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', action='append', metavar='STEP=SECONDS',
+                        help=f"per-step latency, steps: {', '.join(DEFAULT_LATENCY)}")
+    parser.add_argument('--otp', default='123456', help="OTP code accepted by Valider")
+    parser.add_argument('--maildir', help="deliver the OTP email to this Maildir after the password")
+    parser.add_argument('--mail-delay', type=float, default=1.0, help="seconds before the OTP email arrives")
+    args = parser.parse_args()
+
+    server = StandinServer(args.host, args.port, parse_latency(args.latency), args.otp,
+                           maildir=args.maildir, mail_delay=args.mail_delay).start()
+    print(f"Stand-in auth page: {server.url} (OTP {args.otp})", flush=True)
+    if args.maildir:
+        print(f"OTP emails go to {args.maildir} (DAMANCOM_OTP_MAILBOX=maildir:{args.maildir})", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# browser_node.py
+#
+# Browser worker node: hosts Chrome sessions for app.py frontends, so web
+# capacity and browser capacity scale separately.
+#
+# HOW TO RUN (all on one machine, sharing one registry file):
+#   export DAMANCOM_SESSION_REGISTRY=sqlite:/tmp/damancom.db
+#   python browser_node.py --max-browsers 4        # as many nodes as wanted
+#   python browser_node.py --max-browsers 4
+#   DAMANCOM_ROLE=frontend python app.py           # serves viewer.html on :5000
+#
+# A node is app.py running as DAMANCOM_ROLE=node: it registers its internal
+# address and capacity in the session registry, and frontends send it
+# /start_session for the sessions they place on it (least loaded first),
+# then every login step and screenshot request of those sessions.
+
+import argparse
+import os
+import signal
+import threading
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Damancom browser worker node")
+    parser.add_argument('--port', type=int, default=0,
+                        help="internal port frontends reach this node on (default: any free port)")
+    parser.add_argument('--max-browsers', type=int,
+                        help="browsers this node hosts at once (default DAMANCOM_MAX_BROWSERS)")
+    parser.add_argument('--pool-size', type=int,
+                        help="pre-warmed browsers (default DAMANCOM_POOL_SIZE)")
+    args = parser.parse_args()
+
+    if not os.environ.get('DAMANCOM_SESSION_REGISTRY', 'memory').startswith('sqlite:'):
+        parser.error("set DAMANCOM_SESSION_REGISTRY=sqlite:/path/to/registry.db (shared with the frontends)")
+
+    # app.py reads its configuration from the environment when imported
+    os.environ['DAMANCOM_ROLE'] = 'node'
+    os.environ['DAMANCOM_OWNER_PORT'] = str(args.port)
+    if args.max_browsers is not None:
+        os.environ['DAMANCOM_MAX_BROWSERS'] = str(args.max_browsers)
+    if args.pool_size is not None:
+        os.environ['DAMANCOM_POOL_SIZE'] = str(args.pool_size)
+
+    import app
+
+    print(f"🖥️  Browser node {app.WORKER_ID} listening on {app.owner_address} "
+          f"(capacity {app.MAX_BROWSERS}, pool {app.POOL_SIZE})", flush=True)
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    while not stopping.wait(1):
+        pass
+
+    print(f"🛑 Stopping: closing {len(app.active_sessions)} session(s)", flush=True)
+    # leave the registry first so no frontend places another session here
+    app.session_registry.retire(app.WORKER_ID)
+    for session_id in list(app.active_sessions):
+        session = app.active_sessions.pop(session_id, None)
+        if session:
+            app.release_session(session)
+
+
+if __name__ == '__main__':
+    main()
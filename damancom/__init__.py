@@ -0,0 +1,3 @@
+"""
+Shared helpers for the Damancom login frontends (main.py, gui_login.py, app.py)
+"""
@@ -0,0 +1,240 @@
+"""
+Network request blocking profiles.
+
+The login never uses the auth page's images, fonts, media or third-party
+analytics, but driver.get() waits for them. A RequestBlocker attaches to the
+driver's page over the DevTools protocol and intercepts (Fetch domain) only
+the requests a profile targets, failing them unless an allow pattern matches;
+everything else is never paused. It also counts requests and bytes actually
+transferred so profiles can be compared, and estimates the bytes each block
+saved: a request that never ran has no size, so it is counted at the average
+size of completed requests of the same resource type (TYPICAL_BYTES until
+one has been seen).
+
+Profiles (DAMANCOM_BLOCK_PROFILE):
+    none       block nothing
+    analytics  third-party trackers and analytics
+    media      images, fonts and media
+    lean       media + analytics
+
+DAMANCOM_BLOCK_DENY / DAMANCOM_BLOCK_ALLOW add comma-separated URL wildcard
+patterns. Allow patterns win over everything, so captcha assets keep loading.
+"""
+
+import fnmatch
+import itertools
+import json
+import os
+import threading
+
+from damancom.screencast import page_websocket_url
+
+ANALYTICS_PATTERNS = [
+    '*google-analytics.com/*',
+    '*googletagmanager.com/*',
+    '*doubleclick.net/*',
+    '*googlesyndication.com/*',
+    '*connect.facebook.net/*',
+    '*facebook.com/tr*',
+    '*hotjar.com/*',
+    '*clarity.ms/*',
+    '*mc.yandex.ru/*',
+    '*matomo*',
+    '*nr-data.net/*',
+    '*newrelic.com/*',
+]
+
+MEDIA_TYPES = ['Image', 'Font', 'Media']
+
+# extension fallbacks for when Fetch interception is unavailable
+MEDIA_PATTERNS = ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+                  '*.woff*', '*.ttf*', '*.otf*', '*.eot*', '*.mp4*', '*.webm*', '*.mp3*']
+
+DEFAULT_ALLOW = ['*recaptcha*', '*hcaptcha*', '*captcha*']
+
+# bytes a blocked request is assumed to weigh before any of its type has completed
+TYPICAL_BYTES = {'Image': 30000, 'Font': 40000, 'Media': 500000, 'Script': 60000,
+                 'Stylesheet': 20000, 'XHR': 5000, 'Fetch': 5000}
+DEFAULT_TYPICAL_BYTES = 10000
+
+PROFILES = {
+    'none': {'types': [], 'deny': []},
+    'analytics': {'types': [], 'deny': ANALYTICS_PATTERNS},
+    'media': {'types': MEDIA_TYPES, 'deny': []},
+    'lean': {'types': MEDIA_TYPES, 'deny': ANALYTICS_PATTERNS},
+}
+
+_stats_lock = threading.Lock()
+_stats = {}
+_type_sizes = {}        # resource type -> [completed requests, bytes], for estimates
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def _profile_stats(profile):
+    # caller holds _stats_lock
+    return _stats.setdefault(profile, {
+        'drivers': 0, 'requests': 0, 'blocked': 0, 'bytes_transferred': 0,
+        'bytes_saved_estimate': 0, 'page_loads': 0, 'first_input_total': 0.0,
+    })
+
+
+def estimated_bytes(resource_type):
+    """What a request of this type usually transfers (for requests that never ran)."""
+    with _stats_lock:
+        count, total = _type_sizes.get(resource_type, (0, 0))
+    if count:
+        return total // count
+    return TYPICAL_BYTES.get(resource_type, DEFAULT_TYPICAL_BYTES)
+
+
+def profile_stats():
+    """
+    Per-profile counters, with the average time to first interactive input.
+    bytes_transferred is measured; bytes_saved_estimate is estimated per
+    blocked request (see estimated_bytes).
+    """
+    with _stats_lock:
+        result = {}
+        for profile, stats in _stats.items():
+            stats = dict(stats)
+            loads = stats.pop('page_loads')
+            total = stats.pop('first_input_total')
+            stats['page_loads'] = loads
+            stats['first_input_avg'] = round(total / loads, 3) if loads else None
+            result[profile] = stats
+        return result
+
+
+def record_first_input(driver, seconds):
+    """Report how long a page load took until its first form control was usable."""
+    blocker = getattr(driver, 'request_blocker', None)
+    profile = blocker.profile if blocker else 'none'
+    with _stats_lock:
+        stats = _profile_stats(profile)
+        stats['page_loads'] += 1
+        stats['first_input_total'] += seconds
+
+
+class RequestBlocker:
+    """
+    profile: name from PROFILES
+    deny:    extra URL wildcard patterns to block
+    allow:   URL wildcard patterns never blocked
+    """
+
+    def __init__(self, driver, profile='analytics', deny=(), allow=()):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown blocking profile: {profile}")
+        self.driver = driver
+        self.profile = profile
+        self.types = list(PROFILES[profile]['types'])
+        self.deny = list(PROFILES[profile]['deny']) + list(deny)
+        self.allow = DEFAULT_ALLOW + list(allow)
+        self.intercepting = False
+
+        self._ws = None
+        self._ids = itertools.count(1)
+        self._types = {}        # request id -> resource type, until it finishes
+        self._send_lock = threading.Lock()
+
+    @property
+    def active(self):
+        return bool(self.types or self.deny)
+
+    def start(self):
+        with _stats_lock:
+            _profile_stats(self.profile)['drivers'] += 1
+        try:
+            import websocket  # websocket-client, installed with selenium
+
+            self._ws = websocket.create_connection(page_websocket_url(self.driver),
+                                                   timeout=10, suppress_origin=True)
+            self._ws.settimeout(None)
+        except Exception:
+            # no DevTools socket: plain URL blocking, without allow patterns or stats
+            self._block_urls()
+            return self
+
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        self._send('Network.enable')
+        if self.active:
+            patterns = [{'urlPattern': '*', 'resourceType': t, 'requestStage': 'Request'} for t in self.types]
+            patterns += [{'urlPattern': p, 'requestStage': 'Request'} for p in self.deny]
+            self._send('Fetch.enable', {'patterns': patterns})
+            self.intercepting = True
+        return self
+
+    def stop(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+    def allowed(self, url):
+        return any(fnmatch.fnmatchcase(url, pattern) for pattern in self.allow)
+
+    def _block_urls(self):
+        if not self.active:
+            return
+        patterns = list(self.deny)
+        if self.types:
+            patterns += MEDIA_PATTERNS
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+    def _send(self, method, params=None):
+        message = json.dumps({'id': next(self._ids), 'method': method, 'params': params or {}})
+        with self._send_lock:
+            self._ws.send(message)
+
+    def _read_loop(self):
+        try:
+            while True:
+                message = json.loads(self._ws.recv())
+                method = message.get('method')
+                params = message.get('params', {})
+                if method == 'Fetch.requestPaused':
+                    # only requests the profile targets are paused: block unless allowed
+                    if self.allowed(params['request']['url']):
+                        self._send('Fetch.continueRequest', {'requestId': params['requestId']})
+                    else:
+                        self._send('Fetch.failRequest', {'requestId': params['requestId'],
+                                                         'errorReason': 'BlockedByClient'})
+                        self._count('blocked')
+                        self._count('bytes_saved_estimate', estimated_bytes(params.get('resourceType')))
+                elif method == 'Network.requestWillBeSent':
+                    self._count('requests')
+                    self._types[params.get('requestId')] = params.get('type')
+                elif method == 'Network.loadingFinished':
+                    size = int(params.get('encodedDataLength', 0))
+                    self._count('bytes_transferred', size)
+                    resource_type = self._types.pop(params.get('requestId'), None)
+                    if resource_type and size:
+                        with _stats_lock:
+                            sizes = _type_sizes.setdefault(resource_type, [0, 0])
+                            sizes[0] += 1
+                            sizes[1] += size
+                elif method == 'Network.loadingFailed':
+                    self._types.pop(params.get('requestId'), None)
+        except Exception:
+            pass
+
+    def _count(self, name, amount=1):
+        with _stats_lock:
+            _profile_stats(self.profile)[name] += amount
+
+
+def attach(driver, profile=None, deny=None, allow=None):
+    """
+    Apply a blocking profile to a new driver (before its first navigation).
+    Defaults come from DAMANCOM_BLOCK_PROFILE / _DENY / _ALLOW.
+    """
+    profile = profile or os.environ.get('DAMANCOM_BLOCK_PROFILE', 'analytics')
+    deny = _split(os.environ.get('DAMANCOM_BLOCK_DENY')) if deny is None else deny
+    allow = _split(os.environ.get('DAMANCOM_BLOCK_ALLOW')) if allow is None else allow
+    blocker = RequestBlocker(driver, profile, deny, allow).start()
+    driver.request_blocker = blocker
+    return blocker
@@ -0,0 +1,151 @@
+"""
+Per-session browser worker.
+
+WebDriver is not safe to drive from several threads at once, and a login step
+can block for tens of seconds. Each session therefore owns one worker thread
+that runs driver commands one at a time from a queue; HTTP handlers only
+enqueue a command and either wait for its result or hand back a job id.
+Commands submitted with a coalescing key (e.g. screenshots) are never queued
+twice: a second request shares the pending job.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_job_ids = itertools.count(1)
+_STOP = object()
+
+
+class Job:
+    def __init__(self, fn, args, kwargs, key=None):
+        self.id = f"{next(_job_ids):x}"
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class BrowserWorker:
+    """
+    Serialises every command for one driver on a dedicated thread.
+
+    keep_jobs: how many finished jobs stay available for lookup by id
+    """
+
+    def __init__(self, driver, name='browser-worker', keep_jobs=20):
+        self.driver = driver
+        self.keep_jobs = keep_jobs
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_keys = {}
+        self._jobs = {}
+        self._closed = False
+        self._busy_since = None
+        self._on_stopped = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, key=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs). With a `key`, an identical command that is
+        still waiting in the queue is reused instead of queueing another.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser worker is stopped")
+            if key is not None and key in self._pending_keys:
+                return self._pending_keys[key]
+            job = Job(fn, args, kwargs, key)
+            if key is not None:
+                self._pending_keys[key] = job
+            self._jobs[job.id] = job
+            self._trim_jobs()
+        self._queue.put(job)
+        return job
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        """Submit and wait for the result (raises on timeout or error)."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    @property
+    def busy_for(self):
+        """Seconds the current command has been running, or 0 when idle."""
+        started = self._busy_since
+        return time.monotonic() - started if started else 0.0
+
+    def stop(self, then=None):
+        """
+        Cancel queued commands and stop once the running one finishes.
+        `then(driver)` is called from the worker thread afterwards, e.g. to
+        hand the driver back to the pool.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._on_stopped = then
+        self._queue.put(_STOP)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            with self._lock:
+                if self._pending_keys.get(job.key) is job:
+                    del self._pending_keys[job.key]
+                cancelled = self._closed
+            if cancelled:
+                job.future.cancel()
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            self._busy_since = time.monotonic()
+            try:
+                job.future.set_result(job.fn(*job.args, **job.kwargs))
+            except BaseException as e:
+                job.future.set_exception(e)
+            finally:
+                self._busy_since = None
+
+        # drain anything queued after the stop marker
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _STOP:
+                job.future.cancel()
+
+        if self._on_stopped:
+            try:
+                self._on_stopped(self.driver)
+            except Exception:
+                pass
+
+    def _trim_jobs(self):
+        # caller holds the lock
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.keep_jobs, 0)]:
+            del self._jobs[job_id]
+
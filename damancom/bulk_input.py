@@ -0,0 +1,137 @@
+"""
+Form entry in one browser-side call.
+
+Typing with WebDriver costs a clear() and a send_keys() round-trip per field;
+the six OTP digits alone are 12 commands plus the find_elements that located
+them. Bulk mode sets the values of every target field in a single
+execute_script, through the native value setter (so React-style frameworks
+see the change) followed by the input and change events their validation
+listens for. A field that is read-only, disabled, or whose page handler
+throws the value away is reported back and typed with keystrokes instead.
+
+DAMANCOM_INPUT_MODE=keys (or MODE = 'keys') turns bulk entry off, which is
+what the benchmarks compare against. input_stats() counts fields and
+WebDriver round-trips for each path.
+"""
+
+import os
+import threading
+
+MODE = os.environ.get('DAMANCOM_INPUT_MODE', 'bulk')
+
+OTP_FIELDS_XPATH = "//input[@type='tel' and @maxlength='1']"
+
+_SET_SCRIPT = """
+var els = arguments[0], values = arguments[1], rejected = [];
+for (var i = 0; i < els.length; i++) {
+    var el = els[i], value = values[i];
+    if (!el || el.readOnly || el.disabled) { rejected.push(i); continue; }
+    try {
+        var proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+                                                      : HTMLInputElement.prototype;
+        var setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+        el.focus();
+        setter.call(el, value);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        el.blur();
+        if (el.value !== value) rejected.push(i);
+    } catch (e) {
+        rejected.push(i);
+    }
+}
+return rejected;
+"""
+
+# find the OTP inputs and fill them in the same call
+_OTP_SCRIPT = """
+var code = arguments[0], found = [];
+var snap = document.evaluate(arguments[1], document, null,
+                             XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < snap.snapshotLength; i++) found.push(snap.snapshotItem(i));
+if (found.length < code.length) return {found: found.length, rejected: [], elements: []};
+var els = found.slice(0, code.length), values = code.split('');
+var rejected = (function() { %s }).apply(null, [els, values]);
+return {found: found.length, rejected: rejected,
+        elements: rejected.map(function(i) { return els[i]; })};
+""" % _SET_SCRIPT
+
+_stats_lock = threading.Lock()
+_stats = {
+    'bulk': {'calls': 0, 'fields': 0, 'round_trips': 0},
+    'keys': {'calls': 0, 'fields': 0, 'round_trips': 0},
+}
+
+
+def input_stats():
+    """Fields filled and WebDriver round-trips spent, per path ('bulk' / 'keys')."""
+    with _stats_lock:
+        result = {}
+        for path, stats in _stats.items():
+            stats = dict(stats)
+            stats['round_trips_per_field'] = (round(stats['round_trips'] / stats['fields'], 2)
+                                              if stats['fields'] else None)
+            result[path] = stats
+        return result
+
+
+def _count(path, fields, round_trips):
+    with _stats_lock:
+        stats = _stats[path]
+        stats['calls'] += 1
+        stats['fields'] += fields
+        stats['round_trips'] += round_trips
+
+
+def type_keys(elements, values):
+    """The keystroke path: clear() and send_keys() per field."""
+    for el, value in zip(elements, values):
+        el.clear()
+        el.send_keys(value)
+    _count('keys', len(elements), 2 * len(elements))
+
+
+def fill_elements(driver, elements, values):
+    """
+    Set each element's value; fields that reject it are typed instead.
+    Returns False if a field could not be filled at all.
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    values = [str(value) for value in values]
+    try:
+        if MODE != 'bulk':
+            type_keys(elements, values)
+            return True
+        rejected = driver.execute_script(_SET_SCRIPT, list(elements), values)
+        _count('bulk', len(elements) - len(rejected), 1)
+        if rejected:
+            type_keys([elements[i] for i in rejected], [values[i] for i in rejected])
+        return True
+    except WebDriverException:
+        return False
+
+
+def fill_otp(driver, code, xpath=OTP_FIELDS_XPATH):
+    """
+    Find the one-digit OTP inputs and enter the code: a single round-trip
+    in bulk mode. Returns how many fields were found (0 on error); the code
+    was entered if that is at least len(code).
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    try:
+        if MODE != 'bulk':
+            elements = driver.find_elements('xpath', xpath)
+            if len(elements) >= len(code):
+                type_keys(elements[:len(code)], list(code))
+            return len(elements)
+        result = driver.execute_script(_OTP_SCRIPT, code, xpath)
+        if result['found'] >= len(code):
+            rejected = result['rejected']
+            _count('bulk', len(code) - len(rejected), 1)
+            if rejected:
+                type_keys(result['elements'], [code[i] for i in rejected])
+        return result['found']
+    except WebDriverException:
+        return 0
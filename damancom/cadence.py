@@ -0,0 +1,97 @@
+"""
+Live view refresh cadence, decided by the server.
+
+The viewer used to poll every 2 seconds whatever the session was doing, so
+with many sessions most screenshot CPU went on frames of a form waiting for
+someone to type. The server now tells the viewer when to ask again (the
+X-Refresh-After header): fast while a submitted step runs and for a few
+seconds after, slow while the page waits for user input, paused once the
+login has succeeded (a failed one stays visible: the page shows why). The whole schedule is stretched when this process is
+loaded - frame encoding getting slow or more sessions than its budget - so
+the cost of live views stays bounded.
+
+Settings (environment):
+    DAMANCOM_REFRESH_SESSIONS       sessions before refreshes are throttled (default 5)
+    DAMANCOM_REFRESH_ENCODE_BUDGET  average seconds per frame encode before throttling (default 0.05)
+"""
+
+import os
+import threading
+
+# seconds between refreshes while the page waits for the user; None = paused
+STEP_INTERVALS = {
+    'username': 4.0,
+    'password': 4.0,
+    'otp': 8.0,
+    'complete': None,
+    'failed': 8.0,          # 'complete' without a login: the page shows the error
+}
+DEFAULT_INTERVAL = 2.0
+ACTIVE_INTERVAL = 0.5       # while a submitted step runs, and BOOST_SECONDS after
+BOOST_SECONDS = 6.0
+MAX_INTERVAL = 30.0
+MAX_THROTTLE = 8.0
+
+SESSION_BUDGET = int(os.environ.get('DAMANCOM_REFRESH_SESSIONS', 5))
+ENCODE_BUDGET = float(os.environ.get('DAMANCOM_REFRESH_ENCODE_BUDGET', 0.05))
+
+
+class RefreshCadence:
+    """
+    session_budget: live sessions this process refreshes at full rate
+    encode_budget:  average frame encode seconds it can afford
+    """
+
+    def __init__(self, session_budget=SESSION_BUDGET, encode_budget=ENCODE_BUDGET,
+                 step_intervals=STEP_INTERVALS, active_interval=ACTIVE_INTERVAL):
+        self.session_budget = max(session_budget, 1)
+        self.encode_budget = encode_budget
+        self.step_intervals = dict(step_intervals)
+        self.active_interval = active_interval
+        self._lock = threading.Lock()
+        self._encode = None             # EWMA of frame encode seconds
+
+    def observe_encode(self, seconds):
+        with self._lock:
+            if self._encode is None:
+                self._encode = seconds
+            else:
+                self._encode = 0.8 * self._encode + 0.2 * seconds
+
+    def throttle(self, sessions):
+        """Factor (>= 1) every interval is multiplied by under load."""
+        with self._lock:
+            encode = self._encode or 0.0
+        factor = max(1.0, sessions / self.session_budget,
+                     encode / self.encode_budget if self.encode_budget else 1.0)
+        return min(factor, MAX_THROTTLE)
+
+    def interval(self, step, active, sessions, active_interval=None, logged_in=True):
+        """
+        Seconds until the viewer should refresh, or None to pause.
+        active:          a submitted step is running or has just finished
+        active_interval: overrides the interval while active (e.g. a stream's frame rate)
+        logged_in:       whether a 'complete' login actually succeeded
+        """
+        if active:
+            base = self.active_interval if active_interval is None else active_interval
+        else:
+            if step == 'complete' and not logged_in:
+                step = 'failed'
+            base = self.step_intervals.get(step, DEFAULT_INTERVAL)
+            if base is None:
+                return None
+        return round(min(base * self.throttle(sessions), MAX_INTERVAL), 2)
+
+    def status(self, sessions):
+        with self._lock:
+            encode = self._encode
+        return {
+            'throttle': round(self.throttle(sessions), 2),
+            'encode_seconds': round(encode, 4) if encode is not None else None,
+            'sessions': sessions,
+            'session_budget': self.session_budget,
+            'encode_budget': self.encode_budget,
+            'step_intervals': self.step_intervals,
+            'active_interval': self.active_interval,
+        }
@@ -0,0 +1,223 @@
+"""
+Bounded pool of pre-warmed Chrome drivers.
+
+Each pooled driver has already been created, configured and parked on the
+authentication page (OTP button clicked), so a new session can start on it
+immediately instead of paying for a cold Chrome launch.
+"""
+
+import threading
+import time
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created_at
+
+
+class DriverPool:
+    """
+    factory:  callable returning a fresh, configured driver
+    prepare:  callable(driver) that navigates the driver to the ready state
+    size:     maximum number of idle (ready) drivers kept warm
+    max_age:  seconds after which a driver is retired instead of recycled
+    max_uses: number of sessions a driver may serve before being retired
+    origins:  origins whose storage is wiped when a driver is recycled
+    max_total: cap on the drivers the pool tracks (idle, warming and in use);
+              warming stops there so the pool never pushes the browser count
+              over the server's budget
+    """
+
+    def __init__(self, factory, prepare, size=2, max_age=600, max_uses=5, origins=(),
+                 max_total=None):
+        self.factory = factory
+        self.prepare = prepare
+        self.size = size
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.origins = tuple(origins)
+        self.max_total = max_total
+
+        self._lock = threading.Lock()
+        self._idle = []
+        self._in_use = {}
+        self._warming = 0
+        self._closed = False
+        self.stats = {'hits': 0, 'misses': 0, 'recycled': 0, 'retired': 0, 'failed': 0}
+
+    # ----- public API -----
+
+    def checkout(self):
+        """
+        Return a ready driver, or None when the pool is empty (the caller
+        should then create one cold). Always tops the pool back up.
+        """
+        entry = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop(0)
+                if candidate.age < self.max_age:
+                    entry = candidate
+                    break
+                self._retire_later(candidate)
+            if entry:
+                entry.uses += 1
+                self._in_use[id(entry.driver)] = entry
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+        self.fill()
+        return entry.driver if entry else None
+
+    def adopt(self, driver):
+        """Track a cold-created driver so it can be recycled on checkin."""
+        entry = PooledDriver(driver)
+        entry.uses = 1
+        with self._lock:
+            self._in_use[id(driver)] = entry
+
+    def checkin(self, driver):
+        """
+        Give a driver back. It is reset and re-parked in the background, or
+        quit and replaced when it is too old or has served too many sessions.
+        """
+        with self._lock:
+            entry = self._in_use.pop(id(driver), None)
+        if entry is None:
+            _spawn(_quit, driver)
+            return
+
+        if self._closed or entry.age >= self.max_age or entry.uses >= self.max_uses:
+            with self._lock:
+                self._retire_later(entry)
+            self.fill()
+            return
+
+        with self._lock:
+            self._warming += 1
+        _spawn(self._recycle, entry)
+
+    def discard(self, driver):
+        """Quit a checked-out driver that must not be reused (e.g. it crashed)."""
+        with self._lock:
+            entry = self._in_use.pop(id(driver), None)
+        _spawn(_quit, driver)
+        if entry:
+            self.fill()
+
+    def forget(self, driver):
+        """Stop tracking a checked-out driver that the caller will quit itself."""
+        with self._lock:
+            entry = self._in_use.pop(id(driver), None)
+        if entry:
+            self.fill()
+
+    def fill(self):
+        """Start warming drivers until idle + warming reaches the pool size."""
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - len(self._idle) - self._warming
+            if self.max_total is not None:
+                missing = min(missing, self.max_total - len(self._idle) - self._warming - len(self._in_use))
+            self._warming += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            _spawn(self._warm_new)
+
+    def status(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'warming': self._warming,
+                **self.stats,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            _quit(entry.driver)
+
+    # ----- background work -----
+
+    def _warm_new(self):
+        driver = None
+        try:
+            driver = self.factory()
+            self.prepare(driver)
+            self._park(PooledDriver(driver))
+        except Exception:
+            with self._lock:
+                self._warming -= 1
+                self.stats['failed'] += 1
+            if driver:
+                _quit(driver)
+
+    def _recycle(self, entry):
+        try:
+            reset_browser_state(entry.driver, self.origins)
+            self.prepare(entry.driver)
+            with self._lock:
+                self.stats['recycled'] += 1
+            self._park(entry)
+        except Exception:
+            with self._lock:
+                self._warming -= 1
+                self.stats['failed'] += 1
+            _quit(entry.driver)
+            self.fill()
+
+    def _park(self, entry):
+        with self._lock:
+            self._warming -= 1
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(entry)
+                return
+        _quit(entry.driver)
+
+    def _retire_later(self, entry):
+        # caller holds the lock
+        self.stats['retired'] += 1
+        _spawn(_quit, entry.driver)
+
+
+def reset_browser_state(driver, origins=()):
+    """
+    Wipe cookies, cache and storage so the next user starts clean: all
+    storage types (IndexedDB, service workers, cache storage, local storage...)
+    of `origins` and of the page the driver is on.
+    """
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+    origins = list(origins)
+    try:
+        current = driver.execute_script("return window.location.origin;")
+        if current and current.startswith('http') and current not in origins:
+            origins.append(current)
+        driver.execute_script("window.sessionStorage.clear();")
+    except Exception:
+        pass
+    for origin in origins:
+        driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _spawn(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,136 @@
+"""
+Bounded pool for live view frame encoding.
+
+Decoding a capture, resizing it and encoding the frame is the heaviest CPU
+work the server does, and it used to run on the request threads that also
+answer the login step endpoints. Frames are now encoded by a fixed set of
+threads (Pillow releases the GIL while decoding, resizing and encoding, so
+they run in parallel) fed by a bounded queue:
+
+- a frame queued for a session that already has one waiting replaces it
+  (the waiting caller gets the newer frame): a poll never waits behind a
+  frame that is already stale;
+- when the queue is full, the oldest waiting frame is dropped for the new
+  one and its caller gets FrameDropped.
+
+DAMANCOM_ENCODE_WORKERS sets the number of threads (default: CPU count).
+"""
+
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+WORKERS = int(os.environ.get('DAMANCOM_ENCODE_WORKERS', 0)) or os.cpu_count() or 2
+
+
+class FrameDropped(Exception):
+    """The frame was dropped because newer work filled the queue."""
+
+
+class _Task:
+    def __init__(self, key, fn, args):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class EncodePool:
+    """
+    workers:     encoding threads
+    max_pending: frames that may wait for a thread (default 2 per worker)
+    observe:     optional callable(queue_seconds, encode_seconds) per frame
+    """
+
+    def __init__(self, workers=WORKERS, max_pending=None, observe=None, name='frame-encoder'):
+        self.workers = max(workers, 1)
+        self.max_pending = max_pending or 2 * self.workers
+        self.observe = observe
+        self._queue = collections.OrderedDict()     # key -> waiting _Task, oldest first
+        self._ready = threading.Condition()
+        self._running = 0
+        self._closed = False
+        self.stats = {'submitted': 0, 'encoded': 0, 'failed': 0,
+                      'superseded': 0, 'dropped': 0}
+        self._threads = [threading.Thread(target=self._run, name=f'{name}-{i}', daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, fn, *args):
+        """
+        Queue fn(*args) and return its Future. `key` identifies the stream
+        the frame belongs to (e.g. session and route) and everything besides
+        the frame that shapes the result: callers with the same key may get
+        each other's (newer) result.
+        """
+        dropped = None
+        with self._ready:
+            if self._closed:
+                raise RuntimeError("Encode pool is shut down")
+            self.stats['submitted'] += 1
+            waiting = self._queue.get(key)
+            if waiting is not None:
+                # same slot, newest frame: everyone waiting on it gets the fresh result
+                waiting.fn, waiting.args = fn, args
+                self.stats['superseded'] += 1
+                return waiting.future
+            if len(self._queue) >= self.max_pending:
+                _, dropped = self._queue.popitem(last=False)
+                self.stats['dropped'] += 1
+            task = self._queue[key] = _Task(key, fn, args)
+            self._ready.notify()
+        if dropped is not None:
+            dropped.future.set_exception(FrameDropped(f"frame for {dropped.key!r} dropped"))
+        return task.future
+
+    def run(self, key, fn, *args, timeout=None):
+        """Submit and wait; raises FrameDropped if the frame was dropped."""
+        return self.submit(key, fn, *args).result(timeout)
+
+    @property
+    def queue_depth(self):
+        with self._ready:
+            return len(self._queue)
+
+    def status(self):
+        with self._ready:
+            return {'workers': self.workers, 'max_pending': self.max_pending,
+                    'queue_depth': len(self._queue), 'running': self._running, **self.stats}
+
+    def shutdown(self):
+        with self._ready:
+            self._closed = True
+            waiting = list(self._queue.values())
+            self._queue.clear()
+            self._ready.notify_all()
+        for task in waiting:
+            task.future.cancel()
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._queue and not self._closed:
+                    self._ready.wait()
+                if self._closed:
+                    return
+                _, task = self._queue.popitem(last=False)
+                self._running += 1
+            started = time.perf_counter()
+            try:
+                result = task.fn(*task.args)
+            except BaseException as e:
+                task.future.set_exception(e)
+                failed = True
+            else:
+                task.future.set_result(result)
+                failed = False
+            finished = time.perf_counter()
+            with self._ready:
+                self._running -= 1
+                self.stats['failed' if failed else 'encoded'] += 1
+            if self.observe:
+                self.observe(started - task.queued_at, finished - started)
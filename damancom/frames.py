@@ -0,0 +1,189 @@
+"""
+Screenshot frame encoding for the live view.
+
+The browser already renders at the viewer's size, so frames are only resized
+when the capture does not match. PNG captures at the right size are passed
+through untouched; JPEG/WebP trade a little fidelity for much smaller and
+faster frames.
+
+FrameDiffer adds change detection on top: unchanged captures cost a hash, and
+partial changes are sent as tiles for the viewer to composite.
+
+Pillow is imported on first use: a PNG pass-through (size read from the
+header) or a session that only uses the screencast stream never loads it.
+"""
+
+import hashlib
+import io
+import json
+import struct
+import threading
+
+MIME_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+
+def load_image():
+    """PIL's Image module, imported on first use so Pillow stays optional until frames are encoded."""
+    from PIL import Image
+    return Image
+
+
+def png_size(data):
+    """(width, height) from a PNG's IHDR chunk, or None if `data` is not a PNG."""
+    if data[:8] != b'\x89PNG\r\n\x1a\n' or data[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+class Frame:
+    def __init__(self, data, mime):
+        self.data = data
+        self.mime = mime
+        self.etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FrameEncoder:
+    """
+    fmt:     'jpeg', 'webp' or 'png'
+    quality: 1-100, used by the lossy codecs
+    size:    (width, height) of the frames sent to the viewer
+    """
+
+    def __init__(self, fmt='jpeg', quality=70, size=(1280, 720)):
+        fmt = fmt.lower()
+        if fmt == 'jpg':
+            fmt = 'jpeg'
+        if fmt not in MIME_TYPES:
+            raise ValueError(f"Unsupported frame format: {fmt}")
+        self.fmt = fmt
+        self.quality = quality
+        self.size = tuple(size)
+
+    @property
+    def mime(self):
+        return MIME_TYPES[self.fmt]
+
+    def encode(self, png_bytes):
+        """Turn a PNG capture from get_screenshot_as_png() into a Frame."""
+        if self.fmt == 'png' and png_size(png_bytes) == self.size:
+            # already what the viewer needs: skip decode and re-encode entirely
+            return Frame(png_bytes, self.mime)
+
+        Image = load_image()
+        img = Image.open(io.BytesIO(png_bytes))
+        if img.size != self.size:
+            img = img.resize(self.size, Image.Resampling.BILINEAR)
+
+        return Frame(self.encode_image(img), self.mime)
+
+    def encode_image(self, img):
+        buffer = io.BytesIO()
+        if self.fmt == 'jpeg':
+            img.convert('RGB').save(buffer, format='JPEG', quality=self.quality)
+        elif self.fmt == 'webp':
+            img.save(buffer, format='WEBP', quality=self.quality, method=0)
+        else:
+            img.save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue()
+
+
+class FrameDelta:
+    """
+    The tiles that changed since the viewer's last frame. A keyframe carries
+    one tile covering the whole frame.
+    """
+
+    def __init__(self, frame_id, size, mime, tiles, keyframe):
+        self.frame_id = frame_id
+        self.size = size
+        self.mime = mime
+        self.tiles = tiles          # [(x, y, w, h, encoded bytes), ...]
+        self.keyframe = keyframe
+
+    def pack(self):
+        """
+        Binary wire format: 4-byte big-endian header length, UTF-8 JSON header,
+        then the encoded tiles back to back in header order.
+        """
+        header = json.dumps({
+            'frame_id': self.frame_id,
+            'width': self.size[0],
+            'height': self.size[1],
+            'mime': self.mime,
+            'keyframe': self.keyframe,
+            'tiles': [[x, y, w, h, len(data)] for x, y, w, h, data in self.tiles],
+        }).encode()
+        return b''.join([struct.pack('>I', len(header)), header] + [t[4] for t in self.tiles])
+
+
+class FrameDiffer:
+    """
+    Per-session change detection for the polling live view.
+
+    An identical capture is recognised from the raw PNG hash without decoding
+    anything. Otherwise the frame is split into tiles and only those whose
+    pixels changed are encoded; if most of the frame changed, a keyframe is
+    cheaper and is sent instead.
+    """
+
+    def __init__(self, encoder, tile=(128, 80), keyframe_ratio=0.5):
+        self.encoder = encoder
+        self.tile = tile
+        self.keyframe_ratio = keyframe_ratio
+        self.frame_id = 0
+        self._raw_hash = None
+        self._tile_hashes = {}
+        self._lock = threading.Lock()
+
+    def update(self, png_bytes, since=None):
+        """
+        Return the FrameDelta bringing a viewer at frame `since` up to date,
+        or None when nothing changed.
+        """
+        raw_hash = hashlib.blake2b(png_bytes, digest_size=16).digest()
+        with self._lock:
+            in_sync = since is not None and since == self.frame_id
+            if in_sync and raw_hash == self._raw_hash:
+                return None
+
+            Image = load_image()
+            img = Image.open(io.BytesIO(png_bytes)).convert('RGB')
+            if img.size != self.encoder.size:
+                img = img.resize(self.encoder.size, Image.Resampling.BILINEAR)
+
+            tile_hashes = self._hash_tiles(img)
+            changed = [box for box, digest in tile_hashes.items()
+                       if self._tile_hashes.get(box) != digest]
+            self._raw_hash = raw_hash
+            self._tile_hashes = tile_hashes
+
+            if in_sync and not changed:
+                # byte-different capture, same pixels
+                return None
+
+            self.frame_id += 1
+            keyframe = not in_sync or len(changed) > self.keyframe_ratio * len(tile_hashes)
+            if keyframe:
+                tiles = [(0, 0, img.width, img.height, self.encoder.encode_image(img))]
+            else:
+                tiles = [(x, y, w, h, self.encoder.encode_image(img.crop((x, y, x + w, y + h))))
+                         for x, y, w, h in changed]
+            return FrameDelta(self.frame_id, img.size, self.encoder.mime, tiles, keyframe)
+
+    def _hash_tiles(self, img):
+        tile_w, tile_h = self.tile
+        hashes = {}
+        for y in range(0, img.height, tile_h):
+            for x in range(0, img.width, tile_w):
+                w = min(tile_w, img.width - x)
+                h = min(tile_h, img.height - y)
+                data = img.crop((x, y, x + w, y + h)).tobytes()
+                hashes[(x, y, w, h)] = hashlib.blake2b(data, digest_size=8).digest()
+        return hashes
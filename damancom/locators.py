@@ -0,0 +1,108 @@
+"""
+Single-round-trip selector resolution.
+
+The frontends keep lists of candidate locators for each field or button
+because the Damancom markup changes from time to time. Trying them one by one
+with find_element costs a full implicit wait per miss; here every candidate
+is checked in one browser-side evaluation and the first match by priority is
+returned. There is only one wait, for "any candidate present".
+"""
+
+from damancom.bulk_input import fill_elements
+from damancom.waits import Condition, wait_for
+
+
+def _css_attr(name, value):
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'[{name}="{escaped}"]'
+
+
+def to_query(selector):
+    """
+    Normalise a locator to ('xpath' | 'css', query). Plain strings are XPaths.
+    """
+    if isinstance(selector, str):
+        return ['xpath', selector]
+    # selenium.webdriver loads every browser backend: only import it once a driver exists
+    from selenium.webdriver.common.by import By
+
+    by, value = selector
+    if by == By.XPATH:
+        return ['xpath', value]
+    if by == By.CSS_SELECTOR:
+        return ['css', value]
+    if by == By.ID:
+        return ['css', _css_attr('id', value)]
+    if by == By.NAME:
+        return ['css', _css_attr('name', value)]
+    if by == By.CLASS_NAME:
+        return ['css', '.' + value]
+    if by == By.TAG_NAME:
+        return ['css', value]
+    if by == By.LINK_TEXT:
+        return ['xpath', f"//a[normalize-space(.)={_xpath_literal(value)}]"]
+    if by == By.PARTIAL_LINK_TEXT:
+        return ['xpath', f"//a[contains(., {_xpath_literal(value)})]"]
+    raise ValueError(f"Unsupported locator strategy: {by}")
+
+
+def _xpath_literal(text):
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def first_match(selectors, ready=True):
+    """
+    Condition resolving to the first element, in priority order, matched by
+    any of the selectors. With ready=True the element must also be visible
+    and enabled.
+    """
+    queries = [to_query(selector) for selector in selectors]
+    return Condition(
+        """
+        var queries = args[0], needReady = args[1];
+        for (var i = 0; i < queries.length; i++) {
+            var kind = queries[i][0], q = queries[i][1], els;
+            try {
+                els = kind === 'xpath' ? xpathAll(q)
+                                       : Array.prototype.slice.call(document.querySelectorAll(q));
+            } catch (e) { continue; }
+            for (var j = 0; j < els.length; j++) {
+                if (!needReady || isReady(els[j])) return els[j];
+            }
+        }
+        return null;
+        """,
+        [queries, ready],
+        description=f"first of {len(queries)} locators",
+    )
+
+
+def resolve(driver, selectors, timeout=20, label=None, log=None, ready=True):
+    """Wait once for any candidate and return the best match, or None."""
+    return wait_for(driver, first_match(selectors, ready=ready),
+                    timeout=timeout, label=label, log=log)
+
+
+def fill_first(driver, selectors, text, timeout=20, label=None, log=None):
+    el = resolve(driver, selectors, timeout=timeout, label=label, log=log)
+    if el is None:
+        return False
+    return fill_elements(driver, [el], [text])
+
+
+def click_first(driver, selectors, timeout=5, label=None, log=None):
+    el = resolve(driver, selectors, timeout=timeout, label=label, log=log)
+    if el is None:
+        return False
+    from selenium.common.exceptions import ElementClickInterceptedException
+
+    try:
+        el.click()
+    except ElementClickInterceptedException:
+        driver.execute_script("arguments[0].click();", el)
+    return True
@@ -0,0 +1,184 @@
+"""
+Step timings and Prometheus-style metrics.
+
+StepTimer times the login steps of one run (driver creation, navigation,
+OTP button, username, password, OTP page, Valider, success check) and prints
+a summary; given a Histogram it also feeds every duration into it. app.py
+keeps a Registry and serves it in the Prometheus text format on /metrics.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from damancom.timeline import current as current_timeline
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# seconds: login steps range from tens of milliseconds to a 20s timeout
+STEP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+ENCODE_BUCKETS = (0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576, 2097152)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by label values."""
+
+    def __init__(self, name, help, labels=(), buckets=STEP_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._lock = threading.Lock()
+        self._series = {}       # label values -> [bucket counts, sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            for key, (counts, total, count) in series:
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _label_text(self.labels + ('le',), key + (_number(bound),))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _label_text(self.labels, key)
+                lines.append(f'{self.name}_sum{labels} {_number(total)}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge:
+    """
+    Value read when metrics are rendered. `fn` returns a number, or a dict of
+    label values (tuple) -> number when the gauge has labels.
+    """
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        try:
+            value = self.fn()
+        except Exception:
+            return lines
+        if self.labels:
+            for key, number in sorted(value.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append(f'{self.name}{_label_text(self.labels, key)} {_number(number)}')
+        elif value is not None:
+            lines.append(f'{self.name} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, help, labels=(), buckets=STEP_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, fn, labels=()):
+        metric = Gauge(name, help, fn, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class StepTimer:
+    """
+    Times the steps of one login run. Use `step(name)` around a block, or
+    `begin(name)` to close the current step and start the next one; `end()`
+    closes the last step (e.g. before waiting on the user for the OTP).
+    """
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram
+        self.entries = []
+        self._current = None
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def begin(self, name):
+        self.end()
+        self._current = (name, time.perf_counter())
+
+    def end(self):
+        if self._current:
+            name, start = self._current
+            self._current = None
+            self.record(name, time.perf_counter() - start)
+
+    @property
+    def elapsed(self):
+        """Seconds since the current step began (0 when none is open)."""
+        return time.perf_counter() - self._current[1] if self._current else 0.0
+
+    def record(self, name, seconds):
+        self.entries.append((name, seconds))
+        if self.histogram is not None:
+            self.histogram.observe(seconds, step=name)
+        timeline = current_timeline()
+        if timeline is not None:
+            timeline.record(name, 'step', seconds)
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.entries)
+
+    def report(self):
+        lines = [f"  {name:<30} {seconds:6.2f}s" for name, seconds in self.entries]
+        lines.append(f"  {'total':<30} {self.total:6.2f}s")
+        return lines
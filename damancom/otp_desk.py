@@ -0,0 +1,120 @@
+"""
+Shared console OTP prompt for concurrent logins.
+
+In batch mode several accounts reach their OTP page at different times and
+the codes arrive by SMS/email in whatever order. Each login thread files a
+request at the desk and waits; one console reader takes the operator's lines
+and hands each code to the account it names, so codes can be typed in any
+order as they come in:
+
+    2 123456        code for request #2
+    alice 123456    code for the account named alice
+    123456          code for the only waiting request
+    2 skip          give up on request #2
+"""
+
+import itertools
+import threading
+
+
+class OtpRequest:
+    def __init__(self, ticket, account):
+        self.ticket = ticket
+        self.account = account
+        self.code = None
+        self.answered = threading.Event()
+
+
+class OtpDesk:
+    """
+    read_line: blocking callable returning the operator's next line
+    write:     callable used to print prompts
+    """
+
+    def __init__(self, read_line=input, write=print):
+        self.read_line = read_line
+        self.write = write
+        self._tickets = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._gave_up = {}       # ticket -> account of requests that timed out
+        self._reader = None
+
+    def request(self, account, timeout=300):
+        """Wait for the operator to type this account's code; None on skip or timeout."""
+        with self._lock:
+            request = OtpRequest(next(self._tickets), account)
+            self._pending[request.ticket] = request
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._read_loop, name='otp-desk', daemon=True)
+                self._reader.start()
+        self.write(f"📱 [{request.ticket}] {account} is waiting for its OTP - "
+                   f"type '{request.ticket} <code>'")
+        self._show_pending()
+
+        if not request.answered.wait(timeout):
+            # an answer may have landed since the wait ran out: still pending means it did not
+            with self._lock:
+                timed_out = self._pending.pop(request.ticket, None) is not None
+                if timed_out:
+                    self._gave_up[request.ticket] = account
+            if timed_out:
+                self.write(f"⌛ [{request.ticket}] {account}: no OTP after {timeout}s, giving up")
+        return request.code
+
+    def _show_pending(self):
+        with self._lock:
+            waiting = [f"[{r.ticket}] {r.account}" for r in self._pending.values()]
+        if len(waiting) > 1:
+            self.write(f"   waiting for OTP: {', '.join(waiting)}")
+
+    def _read_loop(self):
+        while True:
+            try:
+                line = self.read_line().strip()
+            except EOFError:
+                return
+            if line:
+                self._answer(line.split())
+
+    def _answer(self, parts):
+        with self._lock:
+            if len(parts) == 1 and len(self._pending) == 1:
+                request = next(iter(self._pending.values()))
+                value = parts[0]
+            elif len(parts) == 2:
+                request = self._find(parts[0])
+                value = parts[1]
+            else:
+                request = value = None
+
+            if request is None and len(parts) == 2 and self._timed_out(parts[0]):
+                self.write(f"✗ [{parts[0]}] already gave up waiting, that OTP was not used")
+                return
+            if request is None:
+                waiting = ', '.join(f"[{r.ticket}] {r.account}" for r in self._pending.values())
+                self.write(f"✗ Type '<number> <code>' for one of: {waiting or 'nobody is waiting'}")
+                return
+            if value.lower() != 'skip' and not (len(value) == 6 and value.isdigit()):
+                self.write("✗ OTP must be 6 digits (or 'skip')")
+                return
+
+            # resolved under the lock, so a timing-out request sees either the code or nothing
+            del self._pending[request.ticket]
+            request.code = None if value.lower() == 'skip' else value
+            request.answered.set()
+
+    def _timed_out(self, key):
+        # caller holds the lock
+        if key.isdigit():
+            return int(key) in self._gave_up
+        return key in self._gave_up.values()
+
+    def _find(self, key):
+        # caller holds the lock
+        if key.isdigit() and int(key) in self._pending:
+            return self._pending[int(key)]
+        for request in self._pending.values():
+            if request.account == key:
+                return request
+        return None
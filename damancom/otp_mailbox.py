@@ -0,0 +1,383 @@
+"""
+Read the OTP from a mailbox instead of waiting for someone to type it.
+
+Every login used to stop at the OTP page until a person read the email/SMS
+and typed six digits, by far the slowest step. When the code is also sent
+to a mailbox the automation can read (the account's email, or an SMS to
+email forward), a provider watches that mailbox and returns the newest
+Damancom code that arrived after the password was submitted:
+
+    DAMANCOM_OTP_MAILBOX=maildir:/home/me/Maildir
+    DAMANCOM_OTP_MAILBOX=imaps://me@mail.example.com/INBOX
+                         (password in DAMANCOM_OTP_IMAP_PASSWORD; imap:// for
+                         a plain connection, :port after the host)
+
+DAMANCOM_OTP_WAIT is how long to watch (default 90s) before falling back to
+manual entry, DAMANCOM_OTP_SENDER the text a message's sender or subject
+must contain (default 'damancom').
+
+A code is handed out once, and a mail naming another account (in its To /
+Delivered-To headers, or a masked address like "jo***@example.com" in the
+text) is never given to this one. A mail that names no account could be
+anyone's, so logins sharing a mailbox take turns between submitting the
+password and reading the code (see OtpProvider.enter_stage). When every
+code mail names its account, DAMANCOM_OTP_MATCH=recipient (or ?match=recipient
+after the mailbox URL) lets them run in parallel and ignores mails that name
+nobody.
+
+A local Maildir is enough to try it: benchmarks/standin_server.py --maildir
+delivers the stand-in's code there when the password is submitted.
+"""
+
+import abc
+import email
+import email.policy
+import email.utils
+import html
+import imaplib
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse, unquote
+
+WAIT = int(os.environ.get('DAMANCOM_OTP_WAIT', 90))
+SENDER = os.environ.get('DAMANCOM_OTP_SENDER', 'damancom').lower()
+MATCH = os.environ.get('DAMANCOM_OTP_MATCH', 'any')    # 'recipient': only mails naming the account
+MATCH_MODES = ('any', 'recipient')
+POLL = 1.0              # seconds between mailbox checks
+
+CODE = re.compile(r'(?<!\d)(\d{6})(?!\d)')
+# a code right after "code"/"OTP" wins over other six digit numbers (dates, amounts)
+CODE_AFTER_KEYWORD = re.compile(r'(?:code|otp)\D{0,40}?(?<!\d)(\d{6})(?!\d)', re.IGNORECASE)
+TAG = re.compile(r'<[^>]+>')
+UID = re.compile(rb'UID (\d+)')
+# an address with some characters hidden: "jo***@gm***.com"
+MASKED_ADDRESS = re.compile(r'[\w.+*-]*\*[\w.+*-]*@[\w*-]+(?:\.[\w*-]+)+|[\w.+-]+@[\w-]*\*[\w*-]*(?:\.[\w*-]+)+')
+RECIPIENT_HEADERS = ('To', 'Cc', 'Delivered-To', 'X-Original-To')
+
+
+def message_text(message):
+    """Subject and text parts of an email.message.Message, HTML reduced to its text."""
+    texts = [message.get('Subject', '')]
+    for part in message.walk():
+        if part.get_content_maintype() != 'text':
+            continue
+        try:
+            content = part.get_content()
+        except (LookupError, ValueError):
+            continue
+        if part.get_content_subtype() == 'html':
+            content = html.unescape(TAG.sub(' ', content))
+        texts.append(content)
+    return '\n'.join(texts)
+
+
+def extract_code(message, sender=SENDER):
+    """The OTP in an email.message.Message, or None if it is not a Damancom code email."""
+    headers = f"{message.get('From', '')} {message.get('Subject', '')}".lower()
+    if sender and sender not in headers:
+        return None
+    text = message_text(message)
+    match = CODE_AFTER_KEYWORD.search(text) or CODE.search(text)
+    return match.group(1) if match else None
+
+
+def addressed_to(message, recipient):
+    """
+    True if the message names `recipient` (an email address) in its
+    recipient headers or as a masked address in its text, False if its text
+    only shows masked addresses of someone else, None if it cannot tell.
+    """
+    recipient = (recipient or '').strip().lower()
+    if '@' not in recipient:
+        return None
+    headers = [value for name in RECIPIENT_HEADERS for value in message.get_all(name, [])]
+    if any(address.lower() == recipient for _, address in email.utils.getaddresses(headers)):
+        return True
+    masks = MASKED_ADDRESS.findall(message_text(message))
+    for mask in masks:
+        pattern = '.*'.join(re.escape(piece) for piece in re.split(r'\*+', mask.lower()))
+        if re.fullmatch(pattern, recipient):
+            return True
+    return False if masks else None
+
+
+class OtpProvider(abc.ABC):
+    """
+    Where OTP codes come from; `fetch` is polled by `wait`.
+    match: 'recipient' to only accept mails that name the account, 'any' to
+           also accept mails that name nobody (logins then take turns)
+    """
+
+    name = 'mailbox'
+    clock_slack = 0         # seconds a message may seem to predate the password submission
+
+    def __init__(self, sender=SENDER, match=MATCH):
+        if match not in MATCH_MODES:
+            raise ValueError(f"Unsupported OTP match {match!r} (expected one of {', '.join(MATCH_MODES)})")
+        self.sender = sender
+        self.match = match
+        self._claimed = set()
+        self._ignored = set()   # messages already read that hold no code
+        self._held = {}         # message id -> (code, message) left for another login
+        self._lock = threading.Lock()
+        self._stage = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'found': 0, 'timeouts': 0, 'cancelled': 0, 'errors': 0, 'seconds': 0.0}
+
+    @property
+    def matches_accounts(self):
+        """Whether every code is matched to its account (parallel logins are safe)."""
+        return self.match == 'recipient'
+
+    @abc.abstractmethod
+    def fetch(self, since, recipient=None):
+        """
+        The newest unclaimed code that arrived at or after `since` (epoch
+        seconds) and may be for `recipient` (the account's email), or None.
+        """
+
+    def enter_stage(self):
+        """
+        Call before submitting the password. Unless codes are matched to
+        accounts, one login at a time may be between its password and its
+        code, so a mail naming nobody can only be for that login.
+        """
+        if not self.matches_accounts and not getattr(self._local, 'staged', False):
+            self._stage.acquire()
+            self._local.staged = True
+
+    def leave_stage(self):
+        """Call once the code is read (or given up on); does nothing if not entered."""
+        if getattr(self._local, 'staged', False):
+            self._local.staged = False
+            self._stage.release()
+
+    def wait(self, since, timeout=WAIT, cancelled=None, recipient=None):
+        """
+        Poll until a code arrives; None on timeout or when the `cancelled`
+        Event is set (the user typed the code meanwhile).
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        code = None
+        while True:
+            try:
+                code = self.fetch(since - self.clock_slack, recipient)
+            except Exception:
+                self._count('errors')
+                self.close()            # reconnect on the next poll
+            if code or time.monotonic() >= deadline:
+                break
+            if cancelled is not None:
+                if cancelled.wait(POLL):
+                    break
+            else:
+                time.sleep(POLL)
+        if code:
+            self._count('found')
+        elif cancelled is not None and cancelled.is_set():
+            self._count('cancelled')
+        else:
+            self._count('timeouts')
+        self._count('seconds', time.monotonic() - started)
+        return code
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def close(self):
+        pass
+
+    def _claim(self, candidates, recipient=None):
+        """
+        candidates: (arrived, message id, message loader); claims the newest
+        code whose mail names `recipient`, else the newest naming nobody.
+        """
+        fallback = None
+        for arrived, message_id, load in sorted(candidates, key=lambda c: c[0], reverse=True):
+            with self._lock:
+                if message_id in self._claimed or message_id in self._ignored:
+                    continue
+                held = self._held.get(message_id)
+            if held is None:
+                message = load()
+                held = (extract_code(message, self.sender), message)
+            code, message = held
+            if code is None:
+                with self._lock:
+                    self._ignored.add(message_id)
+                continue
+            mine = addressed_to(message, recipient)
+            if mine and self._take(message_id):
+                return code
+            if mine is None and not self.matches_accounts and fallback is None:
+                fallback = (message_id, code)
+            elif not mine:
+                # left for the login it is meant for, without reading it again
+                with self._lock:
+                    self._held[message_id] = held
+        if fallback and self._take(fallback[0]):
+            return fallback[1]
+        return None
+
+    def _take(self, message_id):
+        with self._lock:
+            if message_id in self._claimed:
+                return False
+            self._claimed.add(message_id)
+            self._held.pop(message_id, None)
+            return True
+
+
+class MaildirProvider(OtpProvider):
+    """
+    A Maildir on this machine (new/ and cur/); a message's arrival time is
+    the time it was delivered into the Maildir.
+    """
+
+    clock_slack = 1         # file systems with coarse timestamps
+
+    def __init__(self, path, sender=SENDER, match=MATCH):
+        super().__init__(sender, match)
+        self.path = os.path.expanduser(path)
+        self.name = f"maildir {self.path}"
+
+    def fetch(self, since, recipient=None):
+        candidates = []
+        for sub in ('new', 'cur'):
+            try:
+                entries = list(os.scandir(os.path.join(self.path, sub)))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                # the unique name stays the same when a mail client moves it to cur/ and adds flags
+                unique = entry.name.split(':', 1)[0]
+                if unique in self._ignored or unique in self._claimed:
+                    continue
+                try:
+                    arrived = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if arrived >= since:
+                    candidates.append((arrived, unique, lambda p=entry.path: self._load(p)))
+        return self._claim(candidates, recipient)
+
+    @staticmethod
+    def _load(path):
+        with open(path, 'rb') as f:
+            return email.message_from_binary_file(f, policy=email.policy.default)
+
+
+class ImapProvider(OtpProvider):
+    """
+    An IMAP folder, opened read-only (messages are not marked as read); a
+    message's arrival time is the server's INTERNALDATE.
+    """
+
+    clock_slack = 5         # INTERNALDATE is in whole seconds and the server's clock may drift
+
+    def __init__(self, host, user, password, folder='INBOX', port=None, ssl=True, sender=SENDER,
+                 match=MATCH):
+        super().__init__(sender, match)
+        self.host = host
+        self.port = port or (993 if ssl else 143)
+        self.user = user
+        self.password = password
+        self.folder = folder
+        self.ssl = ssl
+        self.name = f"imap {user}@{host}/{folder}"
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._arrived = {}      # uid -> INTERNALDATE (epoch seconds)
+
+    def _connect(self):
+        if self._conn is None:
+            cls = imaplib.IMAP4_SSL if self.ssl else imaplib.IMAP4
+            conn = cls(self.host, self.port, timeout=15)
+            conn.login(self.user, self.password)
+            conn.select(self.folder, readonly=True)
+            self._conn = conn
+        return self._conn
+
+    def fetch(self, since, recipient=None):
+        with self._conn_lock:
+            conn = self._connect()
+            conn.noop()     # some servers only report new messages after a command
+            # SINCE has day granularity (in the server's time zone): the day before is safe
+            day = time.strftime('%d-%b-%Y', time.gmtime(since - 86400))
+            _, data = conn.uid('search', None, 'SINCE', day)
+            # only the latest few: the code mail is one of them
+            uids = (data[0] or b'').split()[-20:]
+            unknown = [uid for uid in uids if uid not in self._arrived]
+            if unknown:
+                _, lines = conn.uid('fetch', b','.join(unknown), '(INTERNALDATE)')
+                for line in lines:
+                    line = line[0] if isinstance(line, tuple) else line
+                    uid, received = UID.search(line or b''), imaplib.Internaldate2tuple(line or b'')
+                    if uid and received:
+                        self._arrived[uid.group(1)] = time.mktime(received)
+        candidates = [(self._arrived[uid], uid, lambda u=uid: self._message(u))
+                      for uid in uids
+                      if self._arrived.get(uid, 0) >= since
+                      and uid not in self._ignored and uid not in self._claimed]
+        return self._claim(candidates, recipient)
+
+    def _message(self, uid):
+        with self._conn_lock:
+            _, parts = self._connect().uid('fetch', uid, '(BODY.PEEK[])')
+        body = next(part[1] for part in parts if isinstance(part, tuple))
+        return email.message_from_bytes(body, policy=email.policy.default)
+
+    def close(self):
+        with self._conn_lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.logout()
+            except Exception:
+                pass
+
+
+def from_url(url, password=None, sender=SENDER, match=MATCH):
+    """
+    'maildir:/path', 'imaps://user@host[:port]/folder' or 'imap://...'; a
+    '?match=recipient' suffix overrides `match`.
+    """
+    url, _, query = url.partition('?')
+    match = parse_qs(query).get('match', [match])[-1]
+    if url.startswith('maildir:'):
+        return MaildirProvider(url[len('maildir:'):], sender, match)
+    parsed = urlparse(url)
+    if parsed.scheme not in ('imap', 'imaps') or not parsed.hostname or not parsed.username:
+        raise ValueError(f"Unsupported OTP mailbox {url!r} (expected maildir:/path or imaps://user@host/folder)")
+    return ImapProvider(parsed.hostname, unquote(parsed.username),
+                        password or unquote(parsed.password or ''),
+                        folder=unquote(parsed.path.lstrip('/')) or 'INBOX',
+                        port=parsed.port, ssl=parsed.scheme == 'imaps', sender=sender, match=match)
+
+
+def from_env():
+    """The provider configured by DAMANCOM_OTP_MAILBOX, or None (manual entry only)."""
+    url = os.environ.get('DAMANCOM_OTP_MAILBOX')
+    if not url:
+        return None
+    return from_url(url, os.environ.get('DAMANCOM_OTP_IMAP_PASSWORD'), match=MATCH)
+
+
+def read_code(provider, since, log=print, timeout=WAIT, cancelled=None, recipient=None):
+    """
+    The code from the mailbox if one arrives within `timeout`, else None
+    (the caller falls back to asking for it).
+    since: when the password was submitted (time.time())
+    recipient: the account's email, to skip codes sent to other accounts
+    """
+    log(f"📬 Waiting up to {timeout}s for the OTP email ({provider.name})...")
+    code = provider.wait(since, timeout, cancelled, recipient)
+    if code:
+        log("✓ OTP read from the mailbox")
+    elif cancelled is None or not cancelled.is_set():
+        log(f"⌛ No OTP email after {timeout}s - enter the code by hand")
+    return code
@@ -0,0 +1,234 @@
+"""
+Login outcome detection.
+
+After Valider (or the password's Suivant) the page either moves on to the
+private area or shows an error. Probing success indicators one XPath at a
+time with find_elements costs a full implicit wait per miss, and error
+messages were never looked at, so a wrong code looked like a slow page.
+Here success signals (private URL, logout link, dashboard) and known failure
+signals (invalid OTP, bad credentials, locked account, captcha challenge) are
+watched together in one event-driven wait that resolves on whichever shows
+up first. Errors already on screen before the submit are marked with
+mark_stale() and ignored, so a retry only reports what the page says next.
+
+The result is a dict:
+    {'status': 'success' | 'failure' | 'unknown',
+     'reason': 'private_url' | 'indicator' | 'invalid_otp' | 'bad_credentials'
+               | 'locked' | 'captcha' | 'timeout',
+     'message': text shown by the page (failures) or None,
+     'url': current URL,
+     'logged_in': status == 'success'}
+"""
+
+from damancom.waits import Condition, wait_for
+
+SUCCESS_INDICATORS = [
+    "//a[contains(., 'Logout') or contains(., 'Déconnexion') or contains(., 'Se déconnecter')]",
+    "//div[contains(@class,'dashboard')]",
+    "//h1[contains(.,'Bienvenue')]",
+    "//a[contains(@href,'/private/')]",
+]
+
+PRIVATE_URL_MARKER = '/private/'
+
+# lower case, without accents
+FAILURE_PHRASES = {
+    'invalid_otp': [
+        'code otp invalide', 'code invalide', 'code incorrect', 'code errone',
+        'code a expire', 'code est expire', 'code otp a expire', 'otp a expire', 'otp est expire',
+        'otp invalide', 'otp incorrect', 'invalid otp', 'invalid code', 'code expired', 'otp expired',
+    ],
+    'bad_credentials': [
+        'mot de passe incorrect', 'identifiant ou mot de passe incorrect', 'identifiants invalides',
+        'identifiant incorrect', 'mot de passe invalide', 'invalid password', 'invalid credentials',
+    ],
+    'locked': [
+        'compte bloque', 'compte verrouille', 'compte suspendu', 'trop de tentatives',
+        'account locked', 'too many attempts',
+    ],
+}
+
+# without accents "code expiré" reads like the hint "le code expire dans 5 minutes",
+# so these only count inside an error element, never in the page text
+MESSAGE_PHRASES = {
+    'invalid_otp': ['code expire', 'otp expire'],
+}
+
+# elements pages use to show form errors, checked before the whole page text
+MESSAGE_SELECTOR = ('[role=alert], [aria-live], .alert, .toast, .error, .invalid-feedback, '
+                    '[class*=error], [class*=danger], [class*=invalid], mat-error')
+
+# a challenge actually being presented (not the v3 badge or an idle checkbox widget)
+CAPTCHA_SELECTOR = ('iframe[src*="recaptcha/api2/bframe"], iframe[src*="recaptcha/enterprise/bframe"], '
+                    'iframe[src*="hcaptcha.com"][src*="challenge"]')
+
+# set on error elements already on screen before a submit (see mark_stale)
+STALE_ATTRIBUTE = 'data-damancom-stale'
+
+_MATCH = """
+function norm(text) {
+    return (text || '').toLowerCase().normalize('NFD').replace(/[\\u0300-\\u036f]/g, '')
+                       .replace(/\\s+/g, ' ');
+}
+function match(text, lists) {
+    text = norm(text);
+    for (var l = 0; l < lists.length; l++) {
+        for (var reason in lists[l]) {
+            for (var i = 0; i < lists[l][reason].length; i++) {
+                if (text.indexOf(lists[l][reason][i]) !== -1) return reason;
+            }
+        }
+    }
+    return null;
+}
+"""
+
+_FAILURE_BODY = """
+var phrases = args[0], messagePhrases = args[1], messageSelector = args[2],
+    captchaSelector = args[3], stale = args[4];
+%(match)s
+var messages = document.querySelectorAll(messageSelector);
+for (var i = 0; i < messages.length; i++) {
+    if (!isVisible(messages[i]) || messages[i].closest('[' + stale + ']')) continue;
+    var reason = match(messages[i].innerText, [phrases, messagePhrases]);
+    if (reason) {
+        return {status: 'failure', reason: reason, message: messages[i].innerText.trim().slice(0, 300),
+                url: location.href};
+    }
+}
+var text = document.body ? document.body.innerText : '';
+var marked = document.querySelectorAll('[' + stale + ']');
+for (var i = 0; i < marked.length; i++) {
+    text = text.replace(marked[i].innerText, ' ');
+}
+var reason = match(text, [phrases]);
+if (reason) {
+    return {status: 'failure', reason: reason, message: null, url: location.href};
+}
+var challenges = document.querySelectorAll(captchaSelector);
+for (var i = 0; i < challenges.length; i++) {
+    if (isVisible(challenges[i])) {
+        return {status: 'failure', reason: 'captcha', message: null, url: location.href};
+    }
+}
+return null;
+""" % {'match': _MATCH}
+
+# Marks every error already on screen (error elements, and the innermost
+# elements whose text holds a failure phrase). A marked element that changes
+# afterwards (re-rendered, text or class updated) loses its mark, so the same
+# error shown again for a second wrong code still counts as new.
+_MARK_SCRIPT = """
+var phrases = arguments[0], messagePhrases = arguments[1], messageSelector = arguments[2],
+    stale = arguments[3];
+%(match)s
+var found = [];
+var messages = document.querySelectorAll(messageSelector);
+for (var i = 0; i < messages.length; i++) {
+    if (match(messages[i].innerText, [phrases, messagePhrases])) found.push(messages[i]);
+}
+var all = document.body ? document.body.querySelectorAll('*') : [];
+for (var i = 0; i < all.length; i++) {
+    var el = all[i];
+    if (!match(el.textContent, [phrases])) continue;
+    var inner = false;
+    for (var c = 0; c < el.children.length && !inner; c++) {
+        inner = !!match(el.children[c].textContent, [phrases]);
+    }
+    if (!inner) found.push(el);
+}
+found.forEach(function(el) {
+    el.setAttribute(stale, '');
+    var observer = new MutationObserver(function() {
+        observer.disconnect();
+        el.removeAttribute(stale);
+    });
+    observer.observe(el, {childList: true, subtree: true, characterData: true,
+                          attributes: true, attributeFilter: ['class', 'style', 'hidden']});
+});
+return found.length;
+""" % {'match': _MATCH}
+
+_SUCCESS_BODY = """
+var indicators = args[0], marker = args[1];
+if (location.href.indexOf(marker) !== -1 && document.readyState !== 'loading') {
+    return {status: 'success', reason: 'private_url', message: null, url: location.href};
+}
+for (var i = 0; i < indicators.length; i++) {
+    if (isReady(xpath(indicators[i]))) {
+        return {status: 'success', reason: 'indicator', message: null, url: location.href};
+    }
+}
+return null;
+"""
+
+
+def failure_signals():
+    """Condition resolving to a failure outcome once the page shows a new known error."""
+    return Condition(_FAILURE_BODY, [FAILURE_PHRASES, MESSAGE_PHRASES, MESSAGE_SELECTOR,
+                                     CAPTCHA_SELECTOR, STALE_ATTRIBUTE],
+                     description="login failure message")
+
+
+def mark_stale(driver):
+    """
+    Mark the errors the page shows now (call right before submitting), so
+    the outcome that follows only reports errors that appear afterwards,
+    e.g. the previous "code invalide" before an OTP retry. Returns how many
+    elements were marked.
+    """
+    try:
+        return driver.execute_script(_MARK_SCRIPT, FAILURE_PHRASES, MESSAGE_PHRASES,
+                                     MESSAGE_SELECTOR, STALE_ATTRIBUTE) or 0
+    except Exception:
+        return 0
+
+
+def success_signals(indicators=SUCCESS_INDICATORS):
+    return Condition(_SUCCESS_BODY, [list(indicators), PRIVATE_URL_MARKER],
+                     description="logged-in page")
+
+
+def login_outcome(indicators=SUCCESS_INDICATORS):
+    """Success or failure, whichever the page shows first (success is checked first)."""
+    success, failure = success_signals(indicators), failure_signals()
+    return Condition(
+        "var s = (function(args) { %s })(args[0]); if (s) return s;\n"
+        "return (function(args) { %s })(args[1]);" % (success.body, failure.body),
+        [success.args, failure.args],
+        description="login outcome",
+    )
+
+
+def as_outcome(value, driver):
+    """Normalise a wait result (outcome dict or None on timeout) into an outcome."""
+    if not isinstance(value, dict):
+        value = {'status': 'unknown', 'reason': 'timeout', 'message': None, 'url': None}
+    if not value.get('url'):
+        try:
+            value['url'] = driver.current_url
+        except Exception:
+            pass
+    value['logged_in'] = value['status'] == 'success'
+    return value
+
+
+def detect(driver, timeout=20, indicators=SUCCESS_INDICATORS, label='login outcome', log=None):
+    """Wait until the page shows success or a new known failure; 'unknown' after `timeout`."""
+    condition = login_outcome(indicators)
+    return as_outcome(wait_for(driver, condition, timeout=timeout, label=label, log=log), driver)
+
+
+def describe(outcome):
+    """One line for the logs."""
+    if outcome['status'] == 'success':
+        return f"logged in ({outcome['reason']})"
+    if outcome['status'] == 'unknown':
+        return "no success or error signal before the timeout"
+    text = {
+        'invalid_otp': 'the OTP code was rejected',
+        'bad_credentials': 'the username or password was rejected',
+        'locked': 'the account is locked',
+        'captcha': 'the site is showing a captcha challenge',
+    }.get(outcome['reason'], outcome['reason'])
+    return f"{text}: {outcome['message']}" if outcome.get('message') else text
@@ -0,0 +1,80 @@
+"""
+Load-aware placement of new browser sessions.
+
+With a shared session registry, app.py processes that serve the viewer and
+browser nodes (browser_node.py) that only host Chrome all register
+themselves with their role and capacity. Each /start_session goes to the
+least-loaded live host: the one with the lowest share of its capacity in
+use, counting sessions this frontend is still starting there so a burst of
+starts is spread out instead of all landing on the same host before the
+registry catches up.
+"""
+
+import contextlib
+import threading
+
+from damancom.session_registry import WORKER_TIMEOUT
+
+HOST_ROLES = ('all', 'node')
+
+
+class Placement:
+    """
+    registry: the session registry hosts heartbeat into
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._starting = {}
+        self.stats = {'placed': {}, 'no_host': 0}
+
+    def hosts(self):
+        """Live browser hosts with their load (0 = idle, 1 = at capacity)."""
+        with self._lock:
+            starting = dict(self._starting)
+        hosts = []
+        for worker in self.registry.workers():
+            if worker.get('role') not in HOST_ROLES or worker['heartbeat_age'] > WORKER_TIMEOUT:
+                continue
+            if not worker.get('address') and self.registry.shared:
+                continue
+            used = worker['sessions'] + starting.get(worker['owner'], 0)
+            capacity = max(worker.get('capacity') or 1, 1)
+            hosts.append({**worker, 'starting': starting.get(worker['owner'], 0),
+                          'load': round(used / capacity, 3), 'full': used >= capacity})
+        return hosts
+
+    def choose(self):
+        """
+        The host for the next session, or None when there is none. Hosts
+        with room come first; when all are full the least loaded one is
+        picked anyway: it makes room only by evicting a session idle long
+        enough, otherwise it answers 503 (see SessionReaper.make_room).
+        """
+        hosts = self.hosts()
+        if not hosts:
+            with self._lock:
+                self.stats['no_host'] += 1
+            return None
+        return min(hosts, key=lambda h: (h['full'], h['load'], h['sessions'], h['heartbeat_age']))
+
+    @contextlib.contextmanager
+    def starting(self, owner):
+        """Count a session being started on `owner` until the block ends."""
+        with self._lock:
+            self._starting[owner] = self._starting.get(owner, 0) + 1
+            self.stats['placed'][owner] = self.stats['placed'].get(owner, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._starting[owner] -= 1
+                if not self._starting[owner]:
+                    del self._starting[owner]
+
+    def status(self):
+        hosts = self.hosts()
+        with self._lock:
+            return {'hosts': hosts, 'placed': dict(self.stats['placed']),
+                    'no_host': self.stats['no_host']}
@@ -0,0 +1,68 @@
+"""
+Browser start in the background while the user is still typing.
+
+Importing Selenium and launching Chrome take a few seconds, and the CLI and
+GUI used to pay for them only after the credentials were entered. A
+Prestart runs the driver factory on its own thread as soon as the prompt is
+shown; the login takes the driver when it needs it, usually already running.
+Messages the factory logs meanwhile are kept in `notes` so they do not
+interleave with the prompt.
+
+DAMANCOM_PRESTART=0 turns it off.
+"""
+
+import os
+import threading
+from concurrent.futures import Future
+
+ENABLED = os.environ.get('DAMANCOM_PRESTART', '1') != '0'
+
+
+class Prestart:
+    """
+    factory: called as factory(log, *args) on a background thread; returns a driver
+    """
+
+    def __init__(self, factory, *args):
+        self.notes = []
+        self._future = Future()
+        self._discarded = False
+        self._lock = threading.Lock()
+        # not a daemon: exiting mid-launch waits for Chrome so it can be quit, not orphaned
+        threading.Thread(target=self._run, args=(factory, args), name='prestart').start()
+
+    def _run(self, factory, args):
+        try:
+            driver = factory(self.notes.append, *args)
+        except BaseException as e:
+            self._future.set_exception(e)
+            return
+        with self._lock:
+            discarded = self._discarded
+            if not discarded:
+                self._future.set_result(driver)
+        if discarded:
+            _quit(driver)
+
+    @property
+    def ready(self):
+        return self._future.done()
+
+    def take(self, timeout=None):
+        """The started driver (waits for it); raises what the factory raised."""
+        return self._future.result(timeout)
+
+    def discard(self):
+        """Not needed after all: quit the driver now, or as soon as it has started."""
+        with self._lock:
+            self._discarded = True
+            started = self._future.done()
+        if started and self._future.exception() is None:
+            _quit(self._future.result())
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
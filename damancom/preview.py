@@ -0,0 +1,89 @@
+"""
+Low-resolution live preview of a (headless) browser for the Tk GUI.
+
+A visible 1920x1080 Chrome window was the only way to watch a login, and it
+costs far more memory and CPU than headless. The preview attaches Chrome's
+screencast (see screencast.py) at a small size and low JPEG quality, so
+Chrome only sends a frame when the page repaints, already scaled down.
+Frames are decoded on the preview thread into PPM, which Tk's PhotoImage
+reads without any conversion; the Tk thread only swaps the image in.
+Identical frames (a blinking caret that did not move) are skipped.
+"""
+
+import hashlib
+import io
+import threading
+
+from damancom.frames import load_image
+from damancom.screencast import Screencast
+
+SIZE = (400, 225)
+QUALITY = 40
+MAX_FPS = 4
+
+
+def to_ppm(jpeg, size=SIZE):
+    """A JPEG frame as binary PPM (what tk.PhotoImage(data=...) decodes natively)."""
+    Image = load_image()
+    img = Image.open(io.BytesIO(jpeg)).convert('RGB')
+    if img.width > size[0] or img.height > size[1]:
+        img.thumbnail(size, Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PPM')
+    return buffer.getvalue()
+
+
+class Preview:
+    """
+    driver: the browser to watch
+    show:   callable(ppm bytes) called from the preview thread for every new
+            frame; it must hand the frame over to the Tk thread itself
+    """
+
+    def __init__(self, driver, show, size=SIZE, quality=QUALITY, max_fps=MAX_FPS):
+        self.driver = driver
+        self.show = show
+        self.size = size
+        self.quality = quality
+        self.max_fps = max_fps
+        self.stats = {'frames': 0, 'shown': 0, 'unchanged': 0}
+        self._screencast = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Attach to the browser; raises if its DevTools endpoint is unreachable."""
+        self._screencast = Screencast(self.driver, max_fps=self.max_fps, quality=self.quality,
+                                      min_quality=self.quality, max_quality=self.quality,
+                                      size=self.size).start()
+        threading.Thread(target=self._run, name='preview', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._screencast:
+            self._screencast.stop()
+
+    def _run(self):
+        last = None
+        interval = 1.0 / self.max_fps
+        screencast = self._screencast
+        while not self._stopped.is_set() and not screencast.closed:
+            try:
+                jpeg = screencast.next_frame(timeout=1.0)
+            except Exception:
+                break           # the browser went away
+            if jpeg is None:
+                continue
+            self.stats['frames'] += 1
+            digest = hashlib.blake2b(jpeg, digest_size=16).digest()
+            if digest == last:
+                self.stats['unchanged'] += 1
+                continue
+            last = digest
+            try:
+                self.show(to_ppm(jpeg, self.size))
+                self.stats['shown'] += 1
+            except Exception:
+                pass
+            # Chrome sends the next frame only after the ack in next_frame(): this caps the rate
+            self._stopped.wait(interval)
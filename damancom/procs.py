@@ -0,0 +1,166 @@
+"""
+Process-tree helpers for the Chrome processes behind a driver.
+
+chromedriver is the driver's own subprocess; Chrome and its renderers are its
+descendants. These helpers read /proc, so memory figures and orphan cleanup
+are only available on Linux; elsewhere they return empty results.
+
+Orphans are only ever looked for among the processes a server recorded in
+its LaunchLog when it started them: nothing else on the host is touched.
+"""
+
+import contextlib
+import json
+import os
+import signal
+import tempfile
+
+_PROC = '/proc'
+DEFAULT_LAUNCH_LOG = os.path.join(tempfile.gettempdir(), f'damancom-launches-{os.getuid()}.json')
+
+
+def available():
+    return os.path.isdir(_PROC)
+
+
+def driver_pid(driver):
+    """PID of the chromedriver process started for `driver`, if known."""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def start_time(pid):
+    """When `pid` started (clock ticks since boot): tells it apart from a later process reusing the pid."""
+    try:
+        with open(f'{_PROC}/{pid}/stat') as f:
+            stat = f.read()
+    except (OSError, TypeError):
+        return None
+    return int(stat[stat.rfind(')') + 2:].split()[19])
+
+
+def _parent_map():
+    parents = {}
+    for entry in os.listdir(_PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'{_PROC}/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name is parenthesised and may contain spaces
+        fields = stat[stat.rfind(')') + 2:].split()
+        parents[int(entry)] = int(fields[1])
+    return parents
+
+
+def process_tree(pid):
+    """`pid` and all of its descendants (empty if /proc is unavailable)."""
+    if pid is None or not available():
+        return []
+    children = {}
+    for child, parent in _parent_map().items():
+        children.setdefault(parent, []).append(child)
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def rss_bytes(pids):
+    """Total resident memory of the given processes."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'{_PROC}/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def driver_rss(driver):
+    return rss_bytes(process_tree(driver_pid(driver)))
+
+
+class LaunchLog:
+    """
+    The browser processes (chromedriver, Chrome) the servers on this host
+    started, with the server that started them, in a JSON file shared by
+    every server process. Those whose server is gone (crashed, killed,
+    restarted) are reaped; nothing that was not recorded here ever is.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('DAMANCOM_LAUNCH_LOG', DEFAULT_LAUNCH_LOG)
+        self.owner = os.getpid()
+        self.owner_start = start_time(self.owner)
+
+    @contextlib.contextmanager
+    def _entries(self):
+        import fcntl
+
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                entries = json.loads(f.read() or '{}')
+            except ValueError:
+                entries = {}
+            yield entries
+            f.seek(0)
+            f.truncate()
+            json.dump(entries, f)
+
+    def track(self, pids):
+        """Record processes this server just started."""
+        if not available():
+            return
+        with self._entries() as entries:
+            for pid in pids:
+                started = start_time(pid)
+                if started is not None:
+                    entries[str(pid)] = {'start': started, 'owner': self.owner,
+                                         'owner_start': self.owner_start}
+
+    def track_driver(self, driver):
+        """chromedriver and the Chrome it launched for `driver`."""
+        self.track(process_tree(driver_pid(driver)))
+
+    def reap(self):
+        """Kill the recorded processes whose server is gone. Returns how many were killed."""
+        if not available():
+            return 0
+        victims = []
+        with self._entries() as entries:
+            for key, entry in list(entries.items()):
+                pid = int(key)
+                if start_time(pid) != entry['start']:
+                    del entries[key]        # it exited (the pid may have been reused since)
+                elif start_time(entry['owner']) != entry['owner_start']:
+                    victims.append(pid)
+                    del entries[key]
+        tree = set()
+        for pid in victims:
+            tree.update(process_tree(pid))
+        return kill_tree(tree)
+
+
+def kill_tree(pids):
+    """SIGKILL whatever is still alive among `pids`. Returns how many were killed."""
+    killed = 0
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except (OSError, AttributeError):
+            continue
+    return killed
@@ -0,0 +1,193 @@
+"""
+Idle session reaper for app.py's active_sessions.
+
+Sessions normally end with /cleanup, but closed tabs, crashed viewers and
+failed starts leave whole Chrome processes behind. The reaper runs in the
+background and evicts sessions that are idle too long or too old, keeps the
+number of live browsers and their total memory under a budget, and makes
+sure evicted browsers are really gone.
+
+A new session that does not fit in the budget only displaces a session that
+has been idle for a while (most idle first); if every session is in active
+use it is refused with BudgetFull instead.
+"""
+
+import threading
+import time
+
+from damancom import procs
+
+
+class BudgetFull(Exception):
+    """No room for another browser without evicting a session in active use."""
+
+
+class SessionReaper:
+    """
+    sessions:      the dict of live sessions (session_id -> session dict with
+                   'driver', 'created_at' and 'last_seen')
+    idle_ttl:      seconds without a request before a session is evicted
+    max_lifetime:  seconds after which any session is evicted
+    max_browsers:  cap on concurrent browsers, sessions plus `others()`
+    others:        callable returning the browsers running outside sessions
+                   (warm pool drivers), counted against max_browsers
+    evict_idle:    seconds without a request before a session may be evicted
+                   to make room for a new one
+    max_memory:    cap on total browser RSS in bytes (Linux only), 0 = off
+    launches:      procs.LaunchLog of the browsers started on this host; the
+                   ones left by servers that are gone are killed on each sweep
+    release:       callable(session) that stops the session's work and quits
+                   its driver; called on a background thread
+    """
+
+    def __init__(self, sessions, release, idle_ttl=600, max_lifetime=1800,
+                 max_browsers=10, max_memory=0, interval=15, others=None, evict_idle=60,
+                 launches=None):
+        self.sessions = sessions
+        self.release = release
+        self.idle_ttl = idle_ttl
+        self.max_lifetime = max_lifetime
+        self.max_browsers = max_browsers
+        self.others = others or (lambda: 0)
+        self.evict_idle = evict_idle
+        self.max_memory = max_memory
+        self.launches = launches
+        self.interval = interval
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'sweeps': 0,
+            'evicted_idle': 0,
+            'evicted_lifetime': 0,
+            'evicted_capacity': 0,
+            'evicted_memory': 0,
+            'evicted_replaced': 0,
+            'over_memory': 0,           # sweeps left over budget: only active sessions remained
+            'orphans_killed': 0,
+            'last_memory_bytes': None,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='session-reaper', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            return {
+                'live_sessions': len(self.sessions),
+                'idle_ttl': self.idle_ttl,
+                'max_lifetime': self.max_lifetime,
+                'max_browsers': self.max_browsers,
+                'other_browsers': self.others(),
+                'evict_idle': self.evict_idle,
+                'max_memory': self.max_memory,
+                **self.stats,
+            }
+
+    # ----- eviction -----
+
+    def make_room(self, incoming=1):
+        """
+        Make `incoming` new browsers fit under the cap by evicting sessions
+        idle for at least `evict_idle` seconds; raises BudgetFull (evicting
+        nothing) when there are not enough of them.
+        """
+        excess = len(self.sessions) + self.others() + incoming - self.max_browsers
+        if excess <= 0:
+            return
+        idle = self._evictable()
+        if len(idle) < excess:
+            raise BudgetFull(f"all {self.max_browsers} browsers are in use")
+        for session_id in idle[:excess]:
+            self.evict(session_id, 'evicted_capacity')
+
+    def evict(self, session_id, reason):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        with self._lock:
+            self.stats[reason] += 1
+        threading.Thread(target=self._dispose, args=(session,), daemon=True).start()
+        return True
+
+    def sweep(self):
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if now - session['created_at'] > self.max_lifetime:
+                self.evict(session_id, 'evicted_lifetime')
+            elif now - session['last_seen'] > self.idle_ttl:
+                self.evict(session_id, 'evicted_idle')
+
+        # over the cap (e.g. it was lowered): shed what is idle, never an active session
+        excess = len(self.sessions) + self.others() - self.max_browsers
+        for session_id in self._evictable()[:max(excess, 0)]:
+            self.evict(session_id, 'evicted_capacity')
+
+        if self.launches is not None:
+            killed = self.launches.reap()
+            if killed:
+                with self._lock:
+                    self.stats['orphans_killed'] += killed
+
+        if self.max_memory and procs.available():
+            usage = {sid: procs.driver_rss(s['driver']) for sid, s in list(self.sessions.items())}
+            total = sum(usage.values())
+            # like the cap, the budget only sheds idle sessions: a login in progress is never cut
+            for session_id in self._evictable():
+                if total <= self.max_memory:
+                    break
+                if self.evict(session_id, 'evicted_memory'):
+                    total -= usage.get(session_id, 0)
+            with self._lock:
+                self.stats['last_memory_bytes'] = total
+                if total > self.max_memory:
+                    self.stats['over_memory'] += 1
+
+        with self._lock:
+            self.stats['sweeps'] += 1
+
+    def _evictable(self):
+        now = time.monotonic()
+        return [session_id for session_id in self._most_idle()
+                if now - self.sessions.get(session_id, {}).get('last_seen', now) >= self.evict_idle]
+
+    def _most_idle(self):
+        items = list(self.sessions.items())
+        items.sort(key=lambda item: item[1]['last_seen'])
+        return [session_id for session_id, _ in items]
+
+    def _dispose(self, session):
+        tree = procs.process_tree(procs.driver_pid(session['driver']))
+        done = threading.Event()
+
+        def release():
+            try:
+                self.release(session)
+            finally:
+                done.set()
+
+        threading.Thread(target=release, daemon=True).start()
+        # a wedged driver must not keep its Chrome alive: kill leftovers after a grace period
+        done.wait(30)
+        killed = procs.kill_tree(pid for pid in tree if _alive(pid))
+        if killed:
+            with self._lock:
+                self.stats['orphans_killed'] += killed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                pass
+
+
+def _alive(pid):
+    return procs.available() and procs.rss_bytes([pid]) > 0
@@ -0,0 +1,202 @@
+"""
+Push-based live view using Chrome's screencast.
+
+Instead of one WebDriver screenshot command per poll, we attach to the
+driver's page over the DevTools protocol and let Chrome push JPEG frames as
+the page repaints. Chrome only sends the next frame once the previous one
+has been acknowledged, and we acknowledge a frame only when the viewer has
+taken it, so a slow client gets fewer frames rather than a growing backlog.
+Quality is lowered or raised to follow how quickly the client keeps up.
+"""
+
+import base64
+import itertools
+import json
+import threading
+import time
+
+MJPEG_BOUNDARY = 'frame'
+
+
+def page_websocket_url(driver):
+    """DevTools websocket of the page controlled by `driver`."""
+    import urllib.request
+
+    address = driver.capabilities.get('goog:chromeOptions', {}).get('debuggerAddress')
+    if not address:
+        raise RuntimeError("Chrome did not expose a DevTools debugger address")
+    with urllib.request.urlopen(f"http://{address}/json", timeout=5) as response:
+        targets = json.load(response)
+    pages = [t for t in targets if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+    # a driver on a shared Chrome (see shared_browser.py) knows its own tab
+    target_id = getattr(driver, 'target_id', None)
+    for target in pages:
+        if target_id is None or target.get('id') == target_id:
+            return target['webSocketDebuggerUrl']
+    raise RuntimeError("No page target found for the driver")
+
+
+class Screencast:
+    """
+    max_fps:      upper bound on frames handed to the client
+    quality:      starting JPEG quality, adapted between min/max_quality
+    size:         maximum frame size requested from Chrome
+    """
+
+    def __init__(self, driver, max_fps=10, quality=60, min_quality=20, max_quality=80,
+                 size=(1280, 720)):
+        self.driver = driver
+        self.max_fps = max_fps
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.size = size
+
+        self._ws = None
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._frame_ready = threading.Condition()
+        self._frame = None              # (jpeg bytes, screencast session id)
+        self._closed = False
+        self._delivery = None           # EWMA of seconds to hand a frame to the client
+        self._last_tune = 0.0
+        self.frames_sent = 0
+
+    # ----- lifecycle -----
+
+    def start(self):
+        import websocket  # websocket-client, installed with selenium
+
+        self._ws = websocket.create_connection(page_websocket_url(self.driver),
+                                               timeout=10, suppress_origin=True)
+        self._ws.settimeout(None)
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        self._start_screencast()
+        return self
+
+    def stop(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._send('Page.stopScreencast')
+        except Exception:
+            pass
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    # ----- frames -----
+
+    def next_frame(self, timeout=5.0):
+        """
+        Wait for the next pushed frame and acknowledge it, which allows Chrome
+        to produce the one after. Returns None if nothing arrived in time.
+        """
+        with self._frame_ready:
+            if self._frame is None and not self._closed:
+                self._frame_ready.wait(timeout)
+            frame, self._frame = self._frame, None
+        if frame is None:
+            return None
+        data, session_id = frame
+        self._send('Page.screencastFrameAck', {'sessionId': session_id})
+        self.frames_sent += 1
+        return data
+
+    def delivered(self, seconds):
+        """Report how long the client took to accept the last frame."""
+        if self._delivery is None:
+            self._delivery = seconds
+        else:
+            self._delivery = 0.7 * self._delivery + 0.3 * seconds
+        self._tune()
+
+    def _tune(self):
+        now = time.monotonic()
+        if now - self._last_tune < 2.0:
+            return
+        budget = 1.0 / self.max_fps
+        quality = self.quality
+        if self._delivery > 2 * budget:
+            quality = max(self.min_quality, quality - 10)
+        elif self._delivery < budget / 2:
+            quality = min(self.max_quality, quality + 5)
+        if quality != self.quality:
+            self.quality = quality
+            self._last_tune = now
+            self._send('Page.stopScreencast')
+            self._start_screencast()
+
+    # ----- DevTools plumbing -----
+
+    def _start_screencast(self):
+        self._send('Page.startScreencast', {
+            'format': 'jpeg',
+            'quality': self.quality,
+            'maxWidth': self.size[0],
+            'maxHeight': self.size[1],
+        })
+
+    def _send(self, method, params=None):
+        message = json.dumps({'id': next(self._ids), 'method': method, 'params': params or {}})
+        with self._send_lock:
+            self._ws.send(message)
+
+    def _read_loop(self):
+        try:
+            while not self._closed:
+                message = json.loads(self._ws.recv())
+                if message.get('method') != 'Page.screencastFrame':
+                    continue
+                params = message['params']
+                with self._frame_ready:
+                    # an unacknowledged frame is simply replaced by the newer one
+                    self._frame = (base64.b64decode(params['data']), params['sessionId'])
+                    self._frame_ready.notify_all()
+        except Exception:
+            pass
+        finally:
+            self._closed = True
+            with self._frame_ready:
+                self._frame_ready.notify_all()
+
+
+def mjpeg_stream(screencast, keep_going, pace=None):
+    """
+    multipart/x-mixed-replace body for a Screencast. `keep_going()` is checked
+    between frames so the stream ends with its session. `pace()`, if given,
+    returns the seconds wanted between frames (at most max_fps apart) or None
+    to hold frames back for now.
+    """
+    def interval():
+        wanted = pace() if pace is not None else 0.0
+        return None if wanted is None else max(1.0 / screencast.max_fps, wanted)
+
+    try:
+        while keep_going() and not screencast.closed:
+            started = time.monotonic()
+            frame = screencast.next_frame(timeout=2.0)
+            if frame is None:
+                continue
+            handed = time.monotonic()
+            yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                   f"Content-Length: {len(frame)}\r\n\r\n").encode() + frame + b"\r\n"
+            # the server asks for the next chunk once this one is written out
+            screencast.delivered(time.monotonic() - handed)
+            # the pace is re-read while waiting, so a submit cuts a slow wait short
+            while keep_going() and not screencast.closed:
+                wait = interval()
+                spare = 0.25 if wait is None else wait - (time.monotonic() - started)
+                if spare <= 0:
+                    break
+                time.sleep(min(spare, 0.25))
+    finally:
+        screencast.stop()
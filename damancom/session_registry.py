@@ -0,0 +1,236 @@
+"""
+Registry of live browser sessions, shared between app.py worker processes.
+
+A session's WebDriver lives in the process that created it, so with more
+than one web worker a request can land in a process that does not own its
+browser. Every worker records the sessions it owns here, together with an
+internal address it can be reached on; a worker that gets a request for
+someone else's session forwards it to the owner. Session counts, steps and
+per-worker load read from the registry cover all workers.
+
+Backends (DAMANCOM_SESSION_REGISTRY):
+    memory                 one process, nothing shared (the default)
+    sqlite:/path/to/db     every worker on this host opens the same SQLite file
+
+Both have the same methods. Workers send a heartbeat with their role
+('all' serves the viewer and hosts browsers, 'node' only hosts browsers,
+'frontend' only serves) and how many browsers they take; sessions of a
+worker whose heartbeat stopped (the process died, and its browsers with it)
+are dropped by prune().
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+# a worker that has not sent a heartbeat for this long is considered dead
+WORKER_TIMEOUT = 30
+
+
+class MemoryRegistry:
+    """Single-process registry: the sessions of this process only."""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._workers = {}
+        self._secret = os.urandom(24)
+
+    def secret(self):
+        return self._secret
+
+    # ----- workers -----
+
+    def heartbeat(self, owner, address=None, role='all', capacity=0):
+        with self._lock:
+            worker = self._workers.setdefault(owner, {'owner': owner, 'pid': os.getpid(),
+                                                      'started_at': time.time()})
+            worker.update(address=address, role=role, capacity=capacity, heartbeat=time.time())
+
+    def retire(self, owner):
+        """A worker shutting down: forget it and its sessions."""
+        with self._lock:
+            self._workers.pop(owner, None)
+            for session_id in [s for s, r in self._sessions.items() if r['owner'] == owner]:
+                del self._sessions[session_id]
+
+    def workers(self):
+        """Every live worker with its session count (its load)."""
+        with self._lock:
+            now = time.time()
+            result = []
+            for worker in self._workers.values():
+                sessions = sum(1 for r in self._sessions.values() if r['owner'] == worker['owner'])
+                result.append({**worker, 'sessions': sessions,
+                               'heartbeat_age': round(now - worker['heartbeat'], 1)})
+            return result
+
+    def prune(self, timeout=WORKER_TIMEOUT):
+        with self._lock:
+            cutoff = time.time() - timeout
+            dead = [owner for owner, w in self._workers.items() if w['heartbeat'] < cutoff]
+        for owner in dead:
+            self.retire(owner)
+        return len(dead)
+
+    # ----- sessions -----
+
+    def add(self, session_id, owner, step):
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = {'session_id': session_id, 'owner': owner, 'step': step,
+                                          'created_at': now, 'last_seen': now}
+
+    def touch(self, session_id, step):
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record:
+                record['step'] = step
+                record['last_seen'] = time.time()
+
+    def get(self, session_id):
+        """The session's record with its owner's 'address', or None."""
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            worker = self._workers.get(record['owner'], {})
+            return {**record, 'address': worker.get('address')}
+
+    def remove(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def count(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def counts_by_step(self):
+        with self._lock:
+            counts = {}
+            for record in self._sessions.values():
+                counts[record['step']] = counts.get(record['step'], 0) + 1
+            return counts
+
+
+class SqliteRegistry:
+    """
+    Registry in a SQLite file that every worker process on the host opens.
+    path: database file (created on first use)
+    """
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    owner TEXT PRIMARY KEY, pid INTEGER, address TEXT,
+                    started_at REAL, heartbeat REAL, role TEXT, capacity INTEGER);
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY, owner TEXT NOT NULL, step TEXT,
+                    created_at REAL, last_seen REAL);
+                CREATE INDEX IF NOT EXISTS sessions_owner ON sessions (owner);
+                CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value BLOB);
+            """)
+            # registries created before workers had a role and a capacity
+            columns = {row['name'] for row in db.execute("PRAGMA table_info(workers)")}
+            for column, kind in (('role', 'TEXT'), ('capacity', 'INTEGER')):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE workers ADD COLUMN {column} {kind}")
+
+    def _db(self):
+        # one connection per thread; SQLite itself arbitrates between processes
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA busy_timeout=10000")
+            self._local.db = db
+        return db
+
+    def secret(self):
+        """A cookie-signing key shared by all workers (created by the first one)."""
+        db = self._db()
+        db.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('secret_key', ?)",
+                   (os.urandom(24),))
+        return db.execute("SELECT value FROM settings WHERE key = 'secret_key'").fetchone()[0]
+
+    # ----- workers -----
+
+    def heartbeat(self, owner, address=None, role='all', capacity=0):
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO workers (owner, pid, address, started_at, heartbeat, role, capacity) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(owner) DO UPDATE SET address = excluded.address, heartbeat = excluded.heartbeat, "
+            "role = excluded.role, capacity = excluded.capacity",
+            (owner, os.getpid(), address, now, now, role, capacity))
+
+    def retire(self, owner):
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM sessions WHERE owner = ?", (owner,))
+            db.execute("DELETE FROM workers WHERE owner = ?", (owner,))
+
+    def workers(self):
+        now = time.time()
+        rows = self._db().execute(
+            "SELECT w.*, (SELECT COUNT(*) FROM sessions s WHERE s.owner = w.owner) AS sessions "
+            "FROM workers w ORDER BY w.started_at").fetchall()
+        return [{**dict(row), 'heartbeat_age': round(now - row['heartbeat'], 1)} for row in rows]
+
+    def prune(self, timeout=WORKER_TIMEOUT):
+        cutoff = time.time() - timeout
+        dead = [row['owner'] for row in
+                self._db().execute("SELECT owner FROM workers WHERE heartbeat < ?", (cutoff,))]
+        for owner in dead:
+            self.retire(owner)
+        return len(dead)
+
+    # ----- sessions -----
+
+    def add(self, session_id, owner, step):
+        now = time.time()
+        self._db().execute(
+            "INSERT OR REPLACE INTO sessions (session_id, owner, step, created_at, last_seen) "
+            "VALUES (?, ?, ?, ?, ?)", (session_id, owner, step, now, now))
+
+    def touch(self, session_id, step):
+        self._db().execute("UPDATE sessions SET step = ?, last_seen = ? WHERE session_id = ?",
+                           (step, time.time(), session_id))
+
+    def get(self, session_id):
+        row = self._db().execute(
+            "SELECT s.*, w.address FROM sessions s LEFT JOIN workers w ON w.owner = s.owner "
+            "WHERE s.session_id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def remove(self, session_id):
+        self._db().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def count(self):
+        return self._db().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def counts_by_step(self):
+        rows = self._db().execute("SELECT step, COUNT(*) AS n FROM sessions GROUP BY step")
+        return {row['step']: row['n'] for row in rows}
+
+
+def from_env():
+    """The registry named by DAMANCOM_SESSION_REGISTRY ('memory' or 'sqlite:<path>')."""
+    spec = os.environ.get('DAMANCOM_SESSION_REGISTRY', 'memory')
+    if spec == 'memory':
+        return MemoryRegistry()
+    if spec.startswith('sqlite:'):
+        return SqliteRegistry(spec[len('sqlite:'):])
+    raise ValueError(f"Unknown session registry: {spec}")
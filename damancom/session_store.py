@@ -0,0 +1,293 @@
+"""
+Encrypted store of authenticated browser sessions.
+
+After a successful OTP login the browser's cookies and local/session storage
+are saved, encrypted, under a key derived from the account name. The next
+run for that account restores them into a fresh driver and checks whether
+the private area loads; only if the session has expired does the caller go
+through the full OTP login again.
+
+A snapshot is only restored for the password it was saved with (a scrypt
+verifier is kept inside the encrypted payload), so on a shared app.py knowing
+a username is not enough to reuse someone else's session.
+
+Enabled by setting DAMANCOM_SESSION_KEY (the passphrase the store is
+encrypted with); DAMANCOM_SESSION_STORE picks the directory. Needs the
+`cryptography` package.
+"""
+
+import base64
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+from damancom.driver_pool import reset_browser_state
+from damancom.waits import wait_for, element_ready, any_of
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.damancom', 'sessions')
+
+# a restored session that bounces back here has expired
+LOGIN_MARKERS = [
+    "//button[contains(., 'OTP')]",
+    "//input[@type='password']",
+]
+
+_STORAGE_SCRIPT = """
+return {
+    url: location.href,
+    origin: location.origin,
+    local: JSON.parse(JSON.stringify(localStorage)),
+    session: JSON.parse(JSON.stringify(sessionStorage))
+};
+"""
+
+_SEED_SCRIPT = """
+(function(origin, local, session) {
+    if (location.origin !== origin) return;
+    try {
+        Object.keys(local).forEach(function(k) { localStorage.setItem(k, local[k]); });
+        Object.keys(session).forEach(function(k) { sessionStorage.setItem(k, session[k]); });
+    } catch (e) {}
+})(%s, %s, %s);
+"""
+
+# fields of Network.getAllCookies results that Network.setCookies accepts
+_COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+
+class SessionStore:
+    """
+    path:       directory holding one encrypted file per account
+    passphrase: secret the encryption key is derived from
+    max_age:    seconds after which a snapshot is not even tried
+    """
+
+    def __init__(self, path, passphrase, max_age=12 * 3600):
+        try:
+            from cryptography.fernet import Fernet, InvalidToken
+            from cryptography.hazmat.primitives import hashes
+            from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        except ImportError:
+            raise RuntimeError("The session store needs the 'cryptography' package "
+                               "(pip install cryptography)")
+
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(path, mode=0o700, exist_ok=True)
+
+        salt = self._salt()
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=200_000)
+        key = kdf.derive(passphrase.encode())
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+        self._invalid_token = InvalidToken
+        self._name_key = hashlib.blake2b(key, digest_size=32, person=b'damancom-names').digest()
+        self._stats_file = os.path.join(path, 'stats.json')
+        self.stats = self._load_stats()
+
+    # ----- snapshots -----
+
+    @staticmethod
+    def verifier(password):
+        """Salted hash of the password a snapshot is bound to."""
+        salt = os.urandom(16)
+        return {'salt': salt.hex(), 'hash': _verifier(password, salt).hex()}
+
+    def save(self, driver, account, verifier):
+        """Snapshot the logged-in browser for `account` (verifier from verifier(password))."""
+        cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        storage = driver.execute_script(_STORAGE_SCRIPT)
+        snapshot = {
+            'account': account,
+            'saved_at': time.time(),
+            'verifier': verifier,
+            'url': storage['url'],
+            'origin': storage['origin'],
+            'cookies': [{k: c[k] for k in _COOKIE_FIELDS if k in c} for c in cookies],
+            'local_storage': storage['local'],
+            'session_storage': storage['session'],
+        }
+        token = self._fernet.encrypt(json.dumps(snapshot).encode())
+        target = self._file(account)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(token)
+        os.replace(tmp, target)
+        self._count('saved')
+
+    def load(self, account, password):
+        """The snapshot for this account and password, or None."""
+        try:
+            with open(self._file(account), 'rb') as f:
+                snapshot = json.loads(self._fernet.decrypt(f.read()))
+        except (OSError, ValueError, self._invalid_token):
+            return None
+        verifier = snapshot.get('verifier', {})
+        expected = bytes.fromhex(verifier.get('hash', ''))
+        if not hmac.compare_digest(_verifier(password, bytes.fromhex(verifier.get('salt', ''))), expected):
+            return None
+        if time.time() - snapshot['saved_at'] > self.max_age:
+            self.forget(account)
+            return None
+        return snapshot
+
+    def forget(self, account):
+        try:
+            os.remove(self._file(account))
+        except OSError:
+            pass
+
+    def restore(self, driver, account, password, indicators, timeout=10):
+        """
+        Load the saved session into `driver` and open the page it was saved
+        on. Returns 'hit' when the private area loaded; 'miss' when there is
+        no usable snapshot (the driver was not touched); 'expired' when the
+        site rejected it, in which case the browser has navigated away and
+        been wiped again. On anything but a hit the caller runs the full login.
+        """
+        snapshot = self.load(account, password)
+        if snapshot is None:
+            self._count('misses')
+            return 'miss'
+
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': [
+            {k: v for k, v in cookie.items() if not (k == 'expires' and v < 0)}
+            for cookie in snapshot['cookies']
+        ]})
+        seed = driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': _SEED_SCRIPT % (json.dumps(snapshot['origin']),
+                                      json.dumps(snapshot['local_storage']),
+                                      json.dumps(snapshot['session_storage'])),
+        })
+        try:
+            driver.get(snapshot['url'])
+            wait_for(driver, any_of(element_ready(indicators), element_ready(LOGIN_MARKERS)),
+                     timeout=timeout, label='restored session')
+            # one quick re-check tells the dashboard apart from a bounce to the login page
+            restored = ('authentification' not in driver.current_url
+                        and wait_for(driver, element_ready(indicators), timeout=1) is not None)
+        except Exception:
+            restored = False
+        finally:
+            try:
+                driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument',
+                                       {'identifier': seed['identifier']})
+            except Exception:
+                pass
+
+        if restored:
+            self._count('hits')
+            return 'hit'
+
+        self.forget(account)
+        self._count('expired')
+        try:
+            reset_browser_state(driver)
+        except Exception:
+            pass
+        return 'expired'
+
+    # ----- stats -----
+
+    def status(self):
+        with self._lock:
+            stats = dict(self.stats)
+        tried = stats['hits'] + stats['misses'] + stats['expired']
+        stats['hit_rate'] = round(stats['hits'] / tried, 3) if tried else None
+        return stats
+
+    def _count(self, name):
+        """
+        Add one to a counter in stats.json. Every process using the store
+        shares the file, so it is re-read and updated under a file lock and
+        replaced atomically: a crash mid-write never leaves it truncated.
+        """
+        with self._lock, self._stats_locked():
+            stats = self._load_stats()
+            stats[name] += 1
+            tmp = f"{self._stats_file}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump(stats, f)
+                os.replace(tmp, self._stats_file)
+            except OSError:
+                pass
+            self.stats = stats
+
+    @contextlib.contextmanager
+    def _stats_locked(self):
+        try:
+            import fcntl
+        except ImportError:
+            # no flock (Windows): the thread lock still covers this process
+            yield
+            return
+        with open(f"{self._stats_file}.lock", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _load_stats(self):
+        stats = {'hits': 0, 'misses': 0, 'expired': 0, 'saved': 0}
+        try:
+            with open(self._stats_file) as f:
+                stats.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    # ----- files -----
+
+    def _salt(self):
+        salt_file = os.path.join(self.path, 'salt')
+        try:
+            with open(salt_file, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        salt = os.urandom(16)
+        try:
+            with open(os.open(salt_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+                f.write(salt)
+        except FileExistsError:
+            # another process created it first
+            with open(salt_file, 'rb') as f:
+                return f.read()
+        return salt
+
+    def _file(self, account):
+        # the file name does not reveal the account
+        digest = hashlib.blake2b(account.strip().lower().encode(), key=self._name_key,
+                                 digest_size=16).hexdigest()
+        return os.path.join(self.path, f'{digest}.session')
+
+
+def _verifier(password, salt):
+    return hashlib.scrypt(password.encode(), salt=salt, n=2 ** 14, r=8, p=1, dklen=32)
+
+
+def from_env():
+    """The store configured by DAMANCOM_SESSION_KEY / DAMANCOM_SESSION_STORE, or None."""
+    passphrase = os.environ.get('DAMANCOM_SESSION_KEY')
+    if not passphrase:
+        return None
+    return SessionStore(os.environ.get('DAMANCOM_SESSION_STORE', DEFAULT_PATH), passphrase,
+                        max_age=int(os.environ.get('DAMANCOM_SESSION_MAX_AGE', 12 * 3600)))
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared():
+    """
+    from_env(), built once per process: the key derivation is deliberately
+    slow, and the hit/miss counters should cover every login of the run.
+    """
+    with _shared_lock:
+        if 'store' not in _shared:
+            _shared['store'] = from_env()
+        return _shared['store']
@@ -0,0 +1,177 @@
+"""
+One long-lived Chrome hosting many isolated browser contexts.
+
+Launching Chrome per session costs a browser process, a GPU process, a network
+service and their memory every time. In shared mode a single Chrome is
+started once; each session gets its own browser context (separate cookies,
+storage and cache, like an incognito profile) with one tab in it, and a
+lightweight chromedriver attached to that tab. Sessions still have their own
+WebDriver and can run commands concurrently, but creating one is a context
+plus a tab instead of a browser launch, and quitting it closes only that
+context.
+"""
+
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import websocket  # websocket-client, installed with selenium
+from selenium import webdriver
+
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+
+def find_chrome():
+    binary = os.environ.get('DAMANCOM_CHROME_BINARY')
+    if binary:
+        return binary
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    raise RuntimeError("Chrome not found; set DAMANCOM_CHROME_BINARY")
+
+
+class ContextDriver(webdriver.Chrome):
+    """A driver attached to one context of a SharedChrome; quit() disposes the context."""
+
+    def quit(self):
+        try:
+            super().quit()
+        finally:
+            self.shared_chrome.dispose_context(self.browser_context_id)
+
+
+class SharedChrome:
+    """
+    args:        Chrome command-line switches (headless, user agent, ...)
+    window_size: size of each session's tab
+    """
+
+    def __init__(self, args=(), window_size=(1280, 720), binary=None):
+        self.args = list(args)
+        self.window_size = window_size
+        self.binary = binary
+        self.process = None
+        self.address = None
+        self._profile = None
+        self._ws = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._contexts = set()
+
+    # ----- lifecycle -----
+
+    def start(self, timeout=20):
+        self._profile = tempfile.mkdtemp(prefix='damancom-shared-')
+        command = [self.binary or find_chrome(), '--remote-debugging-port=0',
+                   f'--user-data-dir={self._profile}', '--no-first-run',
+                   '--no-default-browser-check', *self.args, 'about:blank']
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # Chrome writes the port it picked and the browser websocket path here
+        port_file = os.path.join(self._profile, 'DevToolsActivePort')
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with open(port_file) as f:
+                    port, path = f.read().split('\n')[:2]
+                break
+            except (OSError, ValueError):
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("Shared Chrome did not start")
+                time.sleep(0.05)
+
+        self.address = f'127.0.0.1:{port}'
+        self._ws = websocket.create_connection(f'ws://{self.address}{path}', timeout=30,
+                                               suppress_origin=True)
+        return self
+
+    def stop(self):
+        if self._ws:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._profile:
+            shutil.rmtree(self._profile, ignore_errors=True)
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def context_count(self):
+        with self._lock:
+            return len(self._contexts)
+
+    # ----- contexts -----
+
+    def new_driver(self, performance_log=False):
+        """
+        A driver on a fresh, isolated context (one tab, about:blank).
+        performance_log: have chromedriver record the tab's network and page
+                         events (see damancom/timeline.py)
+        """
+        context_id = self._command('Target.createBrowserContext', {'disposeOnDetach': False})['browserContextId']
+        with self._lock:
+            self._contexts.add(context_id)
+        try:
+            target_id = self._command('Target.createTarget', {
+                'url': 'about:blank',
+                'browserContextId': context_id,
+                'width': self.window_size[0],
+                'height': self.window_size[1],
+            })['targetId']
+
+            options = webdriver.ChromeOptions()
+            options.debugger_address = self.address
+            if performance_log:
+                options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            driver = ContextDriver(options=options)
+            driver.shared_chrome = self
+            driver.browser_context_id = context_id
+            driver.target_id = target_id
+            driver.switch_to.window(target_id)
+            return driver
+        except Exception:
+            self.dispose_context(context_id)
+            raise
+
+    def dispose_context(self, context_id):
+        """Close a context and every tab in it."""
+        with self._lock:
+            if context_id not in self._contexts:
+                return
+            self._contexts.discard(context_id)
+        if self.running:
+            try:
+                self._command('Target.disposeBrowserContext', {'browserContextId': context_id})
+            except Exception:
+                pass
+
+    # ----- DevTools plumbing -----
+
+    def _command(self, method, params=None):
+        with self._lock:
+            message_id = next(self._ids)
+            self._ws.send(json.dumps({'id': message_id, 'method': method, 'params': params or {}}))
+            while True:
+                message = json.loads(self._ws.recv())
+                if message.get('id') != message_id:
+                    continue
+                if 'error' in message:
+                    raise RuntimeError(f"{method}: {message['error'].get('message')}")
+                return message.get('result', {})
@@ -0,0 +1,311 @@
+"""
+Per-session performance timeline, exported in Chrome's trace event format.
+
+Opt-in with DAMANCOM_TRACE_DIR: every main.py / gui_login.py login and every
+app.py session then writes one .trace.json file there, which opens in
+Perfetto (ui.perfetto.dev) or chrome://tracing. It shows on one time axis:
+
+- every WebDriver command with its duration; find commands that came back
+  empty after sitting out the implicit wait are tagged 'implicit_wait_miss'
+- our login steps (StepTimer), event-driven waits (wait_for) and sleeps
+- Chrome's own view from its performance log: each network request from
+  send to finish (or failure/block) and page navigations, DOMContentLoaded
+  and load
+
+so a slow login can be split into time spent by the site, by our waits and
+sleeps, and by implicit-wait misses.
+
+A timeline is made current for a thread with `activate()` (or `bound()` for
+work handed to another thread); StepTimer and wait_for record into the
+current timeline, and `attach(driver)` records the driver's commands.
+"""
+
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+TRACE_DIR = os.environ.get('DAMANCOM_TRACE_DIR')
+ENABLED = bool(TRACE_DIR)
+
+FIND_COMMANDS = ('findElement', 'findElements', 'findChildElement', 'findChildElements')
+
+# trace process ids
+_OURS, _CHROME = 1, 2
+
+_local = threading.local()
+
+
+def current():
+    """The timeline active on this thread, or None."""
+    return getattr(_local, 'timeline', None)
+
+
+def sleep(seconds, reason='sleep'):
+    """time.sleep, shown on the current timeline if there is one."""
+    timeline = current()
+    if timeline is None:
+        time.sleep(seconds)
+    else:
+        timeline.sleep(seconds, reason)
+
+
+def enable_performance_log(options):
+    """Ask chromedriver for Chrome's network and page events (set before the driver starts)."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+class Timeline:
+    """
+    label: names the trace file and the session in the viewer (e.g. the account)
+    """
+
+    def __init__(self, label='session'):
+        self.label = label
+        self.events = []
+        self._lock = threading.Lock()
+        self._perf0 = time.perf_counter()
+        self._wall0 = time.time()
+        self._threads = {}
+        self._drivers = []
+        self._requests = {}
+        self._clock_offset = None       # Chrome monotonic seconds -> wall clock seconds
+        self._main_frame = None
+        self._metadata(_OURS, 0, 'process_name', name=f'damancom {label}')
+        self._metadata(_CHROME, 0, 'process_name', name='Chrome')
+        self._metadata(_CHROME, 1, 'thread_name', name='page')
+        self._metadata(_CHROME, 2, 'thread_name', name='network')
+
+    # ----- activation -----
+
+    @contextlib.contextmanager
+    def activate(self):
+        previous, _local.timeline = current(), self
+        try:
+            yield self
+        finally:
+            _local.timeline = previous
+
+    def bound(self, fn):
+        """fn wrapped to run with this timeline active (for worker threads)."""
+        def run(*args, **kwargs):
+            with self.activate():
+                return fn(*args, **kwargs)
+        return run
+
+    # ----- our events -----
+
+    def _ts(self, perf):
+        return round((perf - self._perf0) * 1e6, 1)
+
+    def _tid(self):
+        thread = threading.current_thread()
+        with self._lock:
+            tid = self._threads.get(thread.ident)
+            if tid is None:
+                tid = self._threads[thread.ident] = len(self._threads) + 1
+                self.events.append({'ph': 'M', 'pid': _OURS, 'tid': tid, 'name': 'thread_name',
+                                    'args': {'name': thread.name}})
+        return tid
+
+    def _add(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def _metadata(self, pid, tid, kind, **args):
+        self.events.append({'ph': 'M', 'pid': pid, 'tid': tid, 'name': kind, 'args': args})
+
+    def complete(self, name, cat, start, end, **args):
+        """A finished span from perf_counter() `start` to `end`."""
+        self._add({'ph': 'X', 'name': name, 'cat': cat, 'pid': _OURS, 'tid': self._tid(),
+                   'ts': self._ts(start), 'dur': round((end - start) * 1e6, 1), 'args': args})
+
+    def record(self, name, cat, seconds, **args):
+        """A span of `seconds` that ends now."""
+        end = time.perf_counter()
+        self.complete(name, cat, end - seconds, end, **args)
+
+    @contextlib.contextmanager
+    def span(self, name, cat='step', **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, start, time.perf_counter(), **args)
+
+    def mark(self, name, cat='marker', **args):
+        self._add({'ph': 'i', 's': 't', 'name': name, 'cat': cat, 'pid': _OURS, 'tid': self._tid(),
+                   'ts': self._ts(time.perf_counter()), 'args': args})
+
+    def sleep(self, seconds, reason='sleep'):
+        with self.span(reason, cat='sleep', seconds=seconds):
+            time.sleep(seconds)
+
+    # ----- WebDriver commands -----
+
+    def attach(self, driver):
+        """Record every command sent through `driver` until detach()."""
+        from selenium.common.exceptions import NoSuchElementException
+
+        try:
+            implicit = driver.timeouts.implicit_wait
+        except Exception:
+            implicit = 0
+        state = {'implicit': implicit, 'wrapped': 'execute' in vars(driver)}
+        original = driver.execute
+        try:
+            # what Chrome logged earlier (pool warm-up, a previous session) is not ours
+            original('getLog', {'type': 'performance'})
+        except Exception:
+            pass
+        try:
+            # first paint, first contentful paint, network idle... in the performance log
+            original('executeCdpCommand', {'cmd': 'Page.setLifecycleEventsEnabled',
+                                           'params': {'enabled': True}})
+        except Exception:
+            pass
+
+        def execute(command, params=None):
+            if command == 'setTimeouts' and params and 'implicit' in params:
+                state['implicit'] = params['implicit'] / 1000
+            start = time.perf_counter()
+            args, cat = {}, 'webdriver'
+            try:
+                response = original(command, params)
+            except NoSuchElementException:
+                args['error'] = 'no such element'
+                if command in FIND_COMMANDS and state['implicit']:
+                    cat = 'implicit_wait_miss'
+                raise
+            except Exception as e:
+                args['error'] = type(e).__name__
+                raise
+            else:
+                if command in FIND_COMMANDS and state['implicit'] and not (response or {}).get('value'):
+                    cat = 'implicit_wait_miss'
+                return response
+            finally:
+                if params and command in FIND_COMMANDS:
+                    args['using'], args['value'] = params.get('using'), str(params.get('value'))[:200]
+                elif params and command == 'get':
+                    args['url'] = params.get('url')
+                elif params and command == 'executeCdpCommand':
+                    args['cdp'] = params.get('cmd')
+                self.complete(command, cat, start, time.perf_counter(), **args)
+
+        driver.execute = execute
+        self._drivers.append((driver, original, state))
+        return driver
+
+    def detach(self, driver):
+        """Stop recording `driver` (after reading what Chrome logged for it)."""
+        self.collect(driver)
+        for entry in list(self._drivers):
+            if entry[0] is driver:
+                self._drivers.remove(entry)
+                if entry[2]['wrapped']:
+                    driver.execute = entry[1]
+                else:
+                    del driver.execute
+
+    # ----- Chrome's performance log -----
+
+    def collect(self, driver=None):
+        """Turn Chrome's buffered network and page events into trace events."""
+        for attached, original, _ in list(self._drivers):
+            if driver is not None and attached is not driver:
+                continue
+            try:
+                entries = original('getLog', {'type': 'performance'})['value']
+            except Exception:
+                continue        # no performance log (capability not set) or driver gone
+            for entry in entries:
+                try:
+                    message = json.loads(entry['message'])['message']
+                    self._chrome_event(message['method'], message.get('params', {}), entry['timestamp'] / 1000)
+                except (KeyError, ValueError):
+                    pass
+
+    def _chrome_ts(self, monotonic, fallback_wall):
+        wall = monotonic + self._clock_offset if self._clock_offset is not None and monotonic else fallback_wall
+        return round((wall - self._wall0) * 1e6, 1)
+
+    def _chrome_event(self, method, params, logged_at):
+        if method == 'Network.requestWillBeSent':
+            if params.get('wallTime') and params.get('timestamp'):
+                self._clock_offset = params['wallTime'] - params['timestamp']
+            request = params.get('request', {})
+            self._requests[params['requestId']] = {
+                'ts': self._chrome_ts(params.get('timestamp'), logged_at),
+                'url': request.get('url', ''), 'method': request.get('method'),
+                'type': params.get('type'),
+            }
+        elif method == 'Network.responseReceived':
+            request = self._requests.get(params.get('requestId'))
+            if request is not None:
+                response = params.get('response', {})
+                request.update(status=response.get('status'), mime=response.get('mimeType'),
+                               from_cache=response.get('fromDiskCache'))
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            request = self._requests.pop(params.get('requestId'), None)
+            if request is None:
+                return
+            end = self._chrome_ts(params.get('timestamp'), logged_at)
+            args = {k: v for k, v in request.items() if k != 'ts' and v is not None}
+            if method == 'Network.loadingFailed':
+                args['failed'] = params.get('blockedReason') or params.get('errorText')
+            else:
+                args['bytes'] = params.get('encodedDataLength')
+            name = _short_url(request['url'])
+            event_id = f"{params['requestId']}"
+            self._add({'ph': 'b', 'cat': 'network', 'name': name, 'id': event_id, 'pid': _CHROME,
+                       'tid': 2, 'ts': request['ts'], 'args': args})
+            self._add({'ph': 'e', 'cat': 'network', 'name': name, 'id': event_id, 'pid': _CHROME,
+                       'tid': 2, 'ts': max(end, request['ts'])})
+        elif method in ('Page.domContentEventFired', 'Page.loadEventFired'):
+            name = 'DOMContentLoaded' if method == 'Page.domContentEventFired' else 'load'
+            self._page_mark(name, self._chrome_ts(params.get('timestamp'), logged_at))
+        elif method == 'Page.frameNavigated' and not params.get('frame', {}).get('parentId'):
+            self._main_frame = params['frame'].get('id')
+            self._page_mark('navigated', self._chrome_ts(None, logged_at), url=params['frame'].get('url'))
+        elif method == 'Page.lifecycleEvent' and params.get('frameId') == self._main_frame:
+            # DOMContentLoaded and load already come from their own events
+            if params.get('name') not in ('DOMContentLoaded', 'load'):
+                self._page_mark(params.get('name', 'lifecycle'),
+                                self._chrome_ts(params.get('timestamp'), logged_at))
+
+    def _page_mark(self, name, ts, **args):
+        self._add({'ph': 'i', 's': 'p', 'cat': 'page', 'name': name, 'pid': _CHROME, 'tid': 1,
+                   'ts': ts, 'args': args})
+
+    # ----- export -----
+
+    def trace(self):
+        """The timeline as a trace event JSON object."""
+        self.collect()
+        with self._lock:
+            events = list(self.events)
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'metadata': {'label': self.label, 'started_at': self._wall0},
+        }
+
+    def save(self, path=None):
+        """Write the trace file (to TRACE_DIR by default) and return its path."""
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._wall0))
+            safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.label)[:60]
+            path = os.path.join(TRACE_DIR, f"damancom-{safe}-{stamp}.trace.json")
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+        return path
+
+
+def _short_url(url):
+    url = re.sub(r'^https?://', '', url)
+    return url if len(url) <= 120 else url[:117] + '...'
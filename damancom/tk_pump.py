@@ -0,0 +1,135 @@
+"""
+Thread-safe UI updates for the Tk GUI.
+
+Tk widgets may only be touched from the thread running the main loop, yet
+the login runs on a worker thread and logs a line per action. The worker
+now only posts events to a queue; a timer on the main loop drains it in
+batches: consecutive log lines become one insert into the log view, a
+status that changed several times between ticks is set once, and the log
+view is trimmed to a maximum number of lines. Dialogs the worker needs an
+answer from (the OTP prompt) run on the main thread through `call()`.
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+_LOG = object()
+
+
+class TkPump:
+    """
+    root:      the Tk root whose main loop drains the queue
+    log_view:  Text widget log lines are appended to
+    max_lines: lines kept in the log view (older ones are dropped)
+    interval:  milliseconds between drains
+    max_batch: events handled per drain, so a flood cannot freeze the window
+    """
+
+    def __init__(self, root, log_view, max_lines=2000, interval=50, max_batch=1000):
+        self.root = root
+        self.log_view = log_view
+        self.max_lines = max_lines
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._seq = itertools.count()
+        self._latest = {}               # key -> seq of the newest event with that key
+        self._pending = set()           # futures of call()s not answered yet
+        self._lock = threading.Lock()
+        self._main_thread = threading.get_ident()
+        self._stopped = False
+        self.stats = {'lines': 0, 'inserts': 0, 'trimmed': 0, 'coalesced': 0}
+        self.root.after(self.interval, self._tick)
+
+    # ----- any thread -----
+
+    def log(self, message):
+        self._queue.put((None, None, _LOG, (f"{message}\n",)))
+
+    def post(self, fn, *args, key=None):
+        """
+        Run fn(*args) on the main thread soon. With a `key`, only the newest
+        pending event with that key runs (e.g. the status text).
+        """
+        seq = next(self._seq)
+        if key is not None:
+            with self._lock:
+                self._latest[key] = seq
+        self._queue.put((key, seq, fn, args))
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the main thread and wait for its result."""
+        if threading.get_ident() == self._main_thread:
+            return fn(*args)
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("The window was closed")
+            self._pending.add(future)
+
+        def run():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.post(run)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._pending.discard(future)
+
+    def stop(self):
+        """The window is closing: nothing more is drawn, waiting callers are released."""
+        with self._lock:
+            self._stopped = True
+            pending = list(self._pending)
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("The window was closed"))
+
+    # ----- main thread -----
+
+    def _tick(self):
+        if self._stopped:
+            return
+        # scheduled first: a modal dialog opened below keeps the log flowing
+        self.root.after(self.interval, self._tick)
+        lines = []
+        for _ in range(self.max_batch):
+            try:
+                key, seq, fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if fn is _LOG:
+                lines.append(args[0])
+                continue
+            if key is not None:
+                with self._lock:
+                    if self._latest.get(key) != seq:
+                        self.stats['coalesced'] += 1
+                        continue
+            self._append(lines)
+            lines = []
+            try:
+                fn(*args)
+            except Exception:
+                pass
+        self._append(lines)
+
+    def _append(self, lines):
+        if not lines:
+            return
+        view = self.log_view
+        view.insert('end', ''.join(lines))
+        self.stats['lines'] += len(lines)
+        self.stats['inserts'] += 1
+        # the text always ends with an empty line after the last newline
+        excess = int(view.index('end-1c').split('.')[0]) - 1 - self.max_lines
+        if excess > 0:
+            view.delete('1.0', f'{excess + 1}.0')
+            self.stats['trimmed'] += excess
+        view.see('end')
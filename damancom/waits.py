@@ -0,0 +1,253 @@
+"""
+Event-driven waits for the login flow.
+
+Instead of sleeping for a fixed time, a wait arms a MutationObserver plus
+page lifecycle / URL listeners inside the browser and returns as soon as the
+condition holds. The timeout is only an upper bound. Every wait is recorded
+in a WaitLog so the frontends can report how long each step really took.
+"""
+
+import time
+
+from damancom.timeline import current as current_timeline
+
+
+# how chromedriver reports a page transition that killed the wait script;
+# other errors (a broken condition, a closed window or session) are raised
+_TRANSITION_ERRORS = (
+    'document unloaded',
+    'execution context was destroyed',
+    'cannot find context with specified id',
+    'inspected target navigated or closed',
+    'target frame detached',
+)
+
+
+def _page_transition(error):
+    message = (getattr(error, 'msg', None) or str(error)).lower()
+    return any(text in message for text in _TRANSITION_ERRORS)
+
+
+# Helpers available to every condition body (`args` holds the condition args)
+_PRELUDE = """
+function xpath(q) {
+    return document.evaluate(q, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function xpathAll(q) {
+    var snap = document.evaluate(q, document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var out = [];
+    for (var i = 0; i < snap.snapshotLength; i++) out.push(snap.snapshotItem(i));
+    return out;
+}
+function isVisible(el) {
+    if (!el || !el.isConnected) return false;
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none') return false;
+    var rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+}
+function isReady(el) {
+    return isVisible(el) && !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+}
+"""
+
+_WAIT_SCRIPT = """
+var args = arguments[0];
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+%(prelude)s
+var check = function(args) { %(body)s };
+
+var finished = false, observer = null, timer = null, heartbeat = null;
+var events = ['DOMContentLoaded', 'load', 'readystatechange', 'popstate', 'hashchange', 'pageshow'];
+
+function finish(value) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearTimeout(timer);
+    clearInterval(heartbeat);
+    events.forEach(function(name) {
+        window.removeEventListener(name, probe, true);
+        document.removeEventListener(name, probe, true);
+    });
+    done(value === undefined ? null : value);
+}
+function probe() {
+    if (finished) return;
+    try {
+        var value = check(args);
+        if (value) finish(value);
+    } catch (e) {}
+}
+
+probe();
+if (!finished) {
+    observer = new MutationObserver(probe);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    events.forEach(function(name) {
+        window.addEventListener(name, probe, true);
+        document.addEventListener(name, probe, true);
+    });
+    // pushState navigations and CSS transitions do not always mutate the DOM
+    heartbeat = setInterval(probe, 250);
+    timer = setTimeout(function() { finish(null); }, timeoutMs);
+}
+"""
+
+
+class Condition:
+    """
+    A JavaScript predicate evaluated in the page.
+
+    body: JS function body; receives `args` and returns a truthy value
+          (element, list, string...) once the condition holds
+    """
+
+    def __init__(self, body, args=None, description=""):
+        self.body = body
+        self.args = list(args or [])
+        self.description = description
+
+    def script(self):
+        return _WAIT_SCRIPT % {'prelude': _PRELUDE, 'body': self.body}
+
+    def __repr__(self):
+        return f"Condition({self.description or self.body.strip()[:40]})"
+
+
+def page_has_controls():
+    return Condition(
+        "return document.querySelector('button, input') ? true : null;",
+        description="any button or input",
+    )
+
+
+def element_ready(xpaths):
+    """First element (by priority) that is visible and enabled."""
+    if isinstance(xpaths, str):
+        xpaths = [xpaths]
+    return Condition(
+        """
+        for (var i = 0; i < args.length; i++) {
+            var el = xpath(args[i]);
+            if (isReady(el)) return el;
+        }
+        return null;
+        """,
+        xpaths,
+        description=f"element ready: {xpaths[0]}",
+    )
+
+
+def elements_present(xpath_query, count):
+    """All elements matching the XPath, once there are at least `count`."""
+    return Condition(
+        "var els = xpathAll(args[0]); return els.length >= args[1] ? els : null;",
+        [xpath_query, count],
+        description=f"{count}+ elements: {xpath_query}",
+    )
+
+
+def url_changed(from_url):
+    return Condition(
+        "return window.location.href !== args[0] ? window.location.href : null;",
+        [from_url],
+        description="URL change",
+    )
+
+
+def any_of(*conditions):
+    """Resolve as soon as one of the conditions holds."""
+    parts = []
+    args = []
+    for index, condition in enumerate(conditions):
+        parts.append(
+            "var r%(i)d = (function(args) { %(body)s })(args[%(i)d]); if (r%(i)d) return r%(i)d;"
+            % {'i': index, 'body': condition.body}
+        )
+        args.append(condition.args)
+    return Condition(
+        "\n".join(parts) + "\nreturn null;",
+        args,
+        description=" | ".join(c.description for c in conditions),
+    )
+
+
+class WaitLog:
+    """Records how long each wait actually took."""
+
+    def __init__(self):
+        self.entries = []
+
+    def record(self, label, seconds, ok):
+        self.entries.append((label, seconds, ok))
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds, _ in self.entries)
+
+    def report(self):
+        lines = [
+            f"  {'✓' if ok else '✗'} {label:<28} {seconds:6.2f}s"
+            for label, seconds, ok in self.entries
+        ]
+        lines.append(f"  {'total waiting':<30} {self.total:6.2f}s")
+        return lines
+
+
+def wait_for(driver, condition, timeout=20, label=None, log=None):
+    """
+    Block until `condition` holds in the page or `timeout` seconds pass.
+
+    Returns the condition's value (e.g. the WebElement found) or None on
+    timeout. Navigations that unload the page mid-wait simply re-arm the
+    observer in the new document.
+    """
+    from selenium.common.exceptions import (
+        WebDriverException, StaleElementReferenceException, TimeoutException,
+    )
+
+    label = label or condition.description
+    script = condition.script()
+    start = time.monotonic()
+    deadline = start + timeout
+    result = None
+
+    try:
+        script_timeout = driver.timeouts.script
+    except Exception:
+        script_timeout = None
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                driver.set_script_timeout(remaining + 5)
+                result = driver.execute_async_script(script, condition.args, int(remaining * 1000))
+                break
+            except (StaleElementReferenceException, TimeoutException):
+                time.sleep(0.05)
+            except WebDriverException as e:
+                if not _page_transition(e):
+                    raise
+                # document unloaded while waiting (page transition): try again
+                time.sleep(0.05)
+    finally:
+        if script_timeout is not None:
+            try:
+                driver.set_script_timeout(script_timeout)
+            except WebDriverException:
+                pass
+
+    elapsed = time.monotonic() - start
+    if log is not None:
+        log.record(label, elapsed, bool(result))
+    timeline = current_timeline()
+    if timeline is not None:
+        timeline.record(label, 'wait', elapsed, ok=bool(result), timeout=timeout)
+    return result
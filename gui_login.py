@@ -6,23 +6,97 @@ Run this script to open a graphical interface
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, simpledialog
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+# selenium.webdriver is imported where it is used, so the window opens right away
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import os
 import threading
 import time
 
+from damancom.waits import WaitLog, wait_for, page_has_controls, elements_present, any_of
+from damancom.locators import first_match
+from damancom.metrics import StepTimer
+from damancom.session_store import shared as shared_session_store
+from damancom.blocking import attach as attach_blocking, record_first_input, profile_stats
+from damancom.bulk_input import fill_elements, input_stats
+from damancom.outcome import detect, failure_signals, mark_stale, describe, as_outcome
+from damancom import prestart
+from damancom import timeline
+from damancom.tk_pump import TkPump
+from damancom import preview
+from damancom import otp_mailbox
+
+URL = "https://www.damancom.ma/fr/authentification"
+BLOCK_PROFILE = "analytics"   # skip requests the login never needs: none, analytics, media, lean
+LOG_MAX_LINES = int(os.environ.get('DAMANCOM_GUI_LOG_LINES', 2000))   # older log lines are dropped
+LOG_FLUSH_MS = 100            # the log view is updated in batches this often
+PREVIEW_SIZE = (400, 225)     # live preview of the headless browser, frames only when the page changes
+
+SUCCESS_INDICATORS = [
+    "//a[contains(., 'Logout') or contains(., 'Déconnexion')]",
+    "//div[contains(@class,'dashboard')]",
+    "//h1[contains(.,'Bienvenue')]"
+]
+
+def start_browser(log, headless):
+    """Chrome with the anti-detection options and the blocking profile"""
+    from selenium import webdriver
+    
+    # Setup Chrome options
+    options = webdriver.ChromeOptions()
+    
+    if headless:
+        options.add_argument("--headless=new")
+        log("✓ Headless mode enabled")
+    else:
+        log("✓ Running in visible mode")
+    
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36")
+    
+    if timeline.ENABLED:
+        timeline.enable_performance_log(options)
+    
+    log("✓ Chrome options configured")
+    
+    # Start browser
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': 'Object.defineProperty(navigator, "webdriver", {get: () => undefined})'
+    })
+    
+    driver.implicitly_wait(8)
+    driver.set_page_load_timeout(45)
+    log("✓ Chrome browser started successfully!")
+    
+    try:
+        blocker = attach_blocking(driver, BLOCK_PROFILE)
+        log(f"✓ Request blocking profile: {blocker.profile}")
+    except Exception as e:
+        log(f"⚠️  Request blocking unavailable: {e}")
+    return driver
+
 class DamancomLoginGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Damancom Login Automation")
-        self.root.geometry("600x700")
+        self.root.geometry("1030x700")
         self.root.resizable(False, False)
         
         self.driver = None
+        self.prestarted = None
+        self.trace = None
+        self.preview = None
+        self.preview_image = None
         self.running = False
+        self.stopped = threading.Event()    # ends a wait for the OTP email early
+        self.waits = WaitLog()
+        self.steps = StepTimer()
         
         # Main frame
         main_frame = ttk.Frame(root, padding="10")
@@ -49,6 +123,9 @@ class DamancomLoginGUI:
         self.password_entry = ttk.Entry(info_frame, textvariable=self.password_var, 
                                        width=40, show="*")
         self.password_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=5, padx=5)
+        # typing the credentials is the sign a login is coming: launch Chrome meanwhile
+        for entry in (self.username_entry, self.password_entry):
+            entry.bind('<Key>', lambda event: self.prestart_browser(), add='+')
         
         # Show/Hide password checkbox
         self.show_password_var = tk.BooleanVar()
@@ -79,19 +156,37 @@ class DamancomLoginGUI:
                                      command=self.stop_automation, width=20, state='disabled')
         self.stop_button.grid(row=0, column=1, padx=5)
         
+        # Live preview of the headless browser
+        preview_frame = ttk.LabelFrame(main_frame, text="Browser preview", padding="10")
+        preview_frame.grid(row=1, column=2, rowspan=3, sticky=(tk.N, tk.S), padx=(10, 0), pady=10)
+        self.preview_label = ttk.Label(preview_frame, anchor=tk.CENTER, justify=tk.CENTER,
+                                       text="The page appears here in headless mode")
+        self.preview_label.grid(row=0, column=0)
+        preview_frame.columnconfigure(0, minsize=PREVIEW_SIZE[0])
+        preview_frame.rowconfigure(0, minsize=PREVIEW_SIZE[1])
+        
         # Log/Status Section
         log_frame = ttk.LabelFrame(main_frame, text="Automation Log", padding="10")
-        log_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        log_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
         
         self.log_text = scrolledtext.ScrolledText(log_frame, width=70, height=20, 
                                                   wrap=tk.WORD, font=('Courier', 9))
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # the login thread never touches widgets: it posts to this pump instead
+        self.pump = TkPump(root, self.log_text, max_lines=LOG_MAX_LINES, interval=LOG_FLUSH_MS)
+        
+        # DAMANCOM_OTP_MAILBOX: read the OTP from a mailbox before asking for it
+        try:
+            self.otp_source = otp_mailbox.from_env()
+        except ValueError as e:
+            self.otp_source = None
+            self.log(f"⚠️  {e} - the OTP will be asked for")
         
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, 
                               relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        status_bar.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(5, 0))
         
         # Configure grid weights
         root.columnconfigure(0, weight=1)
@@ -108,12 +203,17 @@ class DamancomLoginGUI:
             self.password_entry.config(show="*")
     
     def log(self, message):
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.pump.log(message)
     
     def set_status(self, status):
-        self.status_var.set(status)
+        self.pump.post(self.status_var.set, status, key='status')
+    
+    def show(self, box, title, message):
+        """A messagebox from any thread; waits until it is dismissed"""
+        try:
+            return self.pump.call(box, title, message)
+        except RuntimeError:
+            return None  # the window was closed
     
     def start_automation(self):
         if not self.username_var.get() or not self.password_var.get():
@@ -121,17 +221,19 @@ class DamancomLoginGUI:
             return
         
         self.running = True
+        self.stopped.clear()
         self.run_button.config(state='disabled')
         self.stop_button.config(state='normal')
         self.username_entry.config(state='disabled')
         self.password_entry.config(state='disabled')
         
         # Run automation in separate thread
-        thread = threading.Thread(target=self.run_automation, daemon=True)
+        thread = threading.Thread(target=self.run_traced, daemon=True)
         thread.start()
     
     def stop_automation(self):
         self.running = False
+        self.stopped.set()
         self.log("\n⏹ Stopping automation...")
         if self.driver:
             try:
@@ -141,6 +243,71 @@ class DamancomLoginGUI:
                 pass
         self.reset_ui()
     
+    def prestart_browser(self):
+        """Start Chrome in the background while the credentials are typed"""
+        if prestart.ENABLED and self.prestarted is None and not self.running:
+            self.prestarted = prestart.Prestart(start_browser, self.headless_var.get())
+            self.prestarted.headless = self.headless_var.get()
+    
+    def take_browser(self):
+        prestarted, self.prestarted = self.prestarted, None
+        headless = self.headless_var.get()
+        if prestarted and prestarted.headless == headless:
+            try:
+                driver = prestarted.take()
+                for note in prestarted.notes:
+                    self.log(note)
+                self.log("✓ Browser was started in the background while you typed")
+                return driver
+            except Exception as e:
+                self.log(f"⚠️  Background browser start failed ({e}) - starting it again")
+        elif prestarted:
+            # the headless setting changed since it was started
+            prestarted.discard()
+        return start_browser(self.log, headless)
+    
+    def on_close(self):
+        self.running = False
+        self.stopped.set()
+        self.pump.stop()
+        if self.otp_source:
+            self.otp_source.close()
+        if self.preview:
+            self.preview.stop()
+        if self.prestarted:
+            self.prestarted.discard()
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.root.destroy()
+    
+    def show_preview(self, ppm):
+        """Main thread: swap in a preview frame (already decoded and scaled)"""
+        # keep a reference, Tk does not and the image would be garbage collected
+        self.preview_image = tk.PhotoImage(data=ppm, format='ppm')
+        self.preview_label.config(image=self.preview_image, text="")
+    
+    def start_preview(self):
+        """Follow the headless browser in the preview pane"""
+        try:
+            self.preview = preview.Preview(
+                self.driver, lambda ppm: self.pump.post(self.show_preview, ppm, key='preview'),
+                size=PREVIEW_SIZE).start()
+            self.log("✓ Live preview attached")
+        except Exception as e:
+            self.preview = None
+            self.log(f"⚠️  Preview unavailable: {e}")
+    
+    def stop_preview(self):
+        if self.preview:
+            self.preview.stop()
+            stats = self.preview.stats
+            self.log(f"\n🖼  Preview: {stats['shown']} frames shown, "
+                     f"{stats['unchanged']} unchanged frames skipped")
+            self.preview = None
+    
     def reset_ui(self):
         self.run_button.config(state='normal')
         self.stop_button.config(state='disabled')
@@ -148,6 +315,16 @@ class DamancomLoginGUI:
         self.password_entry.config(state='normal')
         self.set_status("Ready")
     
+    def run_traced(self):
+        """run_automation, recorded as a trace file when DAMANCOM_TRACE_DIR is set"""
+        if not timeline.ENABLED:
+            return self.run_automation()
+        self.trace = timeline.Timeline(self.username_var.get())
+        with self.trace.activate():
+            self.run_automation()
+        self.log(f"🧭 Performance trace: {self.trace.save()} (open it in ui.perfetto.dev)")
+        self.trace = None
+    
     def run_automation(self):
         try:
             self.log("\n" + "="*60)
@@ -155,263 +332,318 @@ class DamancomLoginGUI:
             self.log("="*60)
             self.set_status("Starting browser...")
             
-            # Setup Chrome options
-            options = webdriver.ChromeOptions()
-            
+            self.steps = StepTimer()
+            self.steps.begin('driver_create')
+            self.driver = self.take_browser()
+            if self.trace:
+                self.trace.attach(self.driver)
             if self.headless_var.get():
-                options.add_argument("--headless=new")
-                self.log("✓ Headless mode enabled")
-            else:
-                self.log("✓ Running in visible mode")
-            
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36")
-            
-            self.log("✓ Chrome options configured")
-            
-            # Start browser
-            self.driver = webdriver.Chrome(options=options)
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': 'Object.defineProperty(navigator, "webdriver", {get: () => undefined})'
-            })
-            
-            self.driver.implicitly_wait(8)
-            self.driver.set_page_load_timeout(45)
-            self.log("✓ Chrome browser started successfully!")
-            
-            # Load page
-            url = "https://www.damancom.ma/fr/authentification"
-            self.log(f"\n📂 Opening URL: {url}")
-            self.set_status("Loading page...")
-            
-            try:
-                self.driver.get(url)
-                self.log("✓ Page loaded successfully!")
-            except TimeoutException:
-                self.log("⚠️  Page load timeout - continuing anyway")
-            
-            # Wait for content
-            self.log("⏳ Waiting for page content to load...")
-            time.sleep(3)
-            
-            try:
-                WebDriverWait(self.driver, 20).until(
-                    lambda d: len(d.find_elements(By.TAG_NAME, "button")) > 0
-                )
-                self.log(f"✓ Page loaded at: {self.driver.current_url}")
-            except TimeoutException:
-                self.log(f"⚠️  Timeout waiting for content. URL: {self.driver.current_url}")
-            
-            if not self.running:
-                return
-            
-            time.sleep(2)
-            
-            # Step 1: Click OTP button
-            self.log("\n=== Step 1: Clicking 'S'authentifier avec OTP' button ===")
-            self.set_status("Step 1: Clicking OTP button...")
-            
-            otp_clicked = self.click_element([
-                "//button[contains(@class, 'btn-primary') and contains(text(), \"S'authentifier avec OTP\")]",
-                "//button[contains(normalize-space(.), \"S'authentifier avec OTP\")]",
-                "//button[contains(., 'OTP')]"
-            ])
-            
-            if otp_clicked:
-                self.log("✓ Clicked 'S'authentifier avec OTP' button")
-                time.sleep(2)
-            else:
-                self.log("✗ Could not find 'S'authentifier avec OTP' button")
-            
-            if not self.running:
-                return
-            
-            # Step 2: Enter username
-            self.log("\n=== Step 2: Entering username ===")
-            self.set_status("Step 2: Entering username...")
-            
-            username_filled = self.fill_input([
-                (By.XPATH, "//input[contains(@placeholder,'IDENTIFIANT') or contains(@placeholder,'Identifiant')]"),
-                (By.NAME, "username"),
-                (By.NAME, "identifiant"),
-                (By.ID, "username"),
-                (By.XPATH, "//input[@type='text']")
-            ], self.username_var.get())
-            
-            if username_filled:
-                self.log(f"✓ Entered username: {self.username_var.get()}")
-            else:
-                self.log("✗ Could not find username field")
-            
-            if not self.running:
-                return
-            
-            # Step 3: Click Suivant
-            self.log("\n=== Step 3: Clicking 'Suivant' button ===")
-            self.set_status("Step 3: Clicking next button...")
-            time.sleep(1)
-            
-            suivant_clicked = self.click_element([
-                "//button[contains(@class, 'btn-primary') and contains(text(), 'Suivant')]",
-                "//button[contains(normalize-space(.), 'Suivant')]"
-            ])
-            
-            if suivant_clicked:
-                self.log("✓ Clicked 'Suivant' button")
-                time.sleep(2)
-            else:
-                self.log("✗ Could not find 'Suivant' button")
-            
-            if not self.running:
-                return
-            
-            # Step 4: Enter password
-            self.log("\n=== Step 4: Entering password ===")
-            self.set_status("Step 4: Entering password...")
-            
-            password_filled = self.fill_input([
-                (By.XPATH, "//input[contains(@placeholder,'MOT DE PASSE') or contains(@placeholder,'Mot de passe')]"),
-                (By.NAME, "password"),
-                (By.ID, "password"),
-                (By.XPATH, "//input[@type='password']")
-            ], self.password_var.get())
-            
-            if password_filled:
-                self.log("✓ Entered password")
-            else:
-                self.log("✗ Could not find password field")
-            
-            if not self.running:
-                return
-            
-            # Step 5: Wait for OTP
-            self.log("\n=== Step 5: Waiting for OTP page ===")
-            self.set_status("Step 5: Waiting for OTP page...")
-            time.sleep(3)
-            
-            otp_inputs = self.driver.find_elements(By.XPATH, "//input[@type='tel' and @maxlength='1']")
-            
-            if len(otp_inputs) >= 6:
-                self.log(f"✓ OTP page detected! Found {len(otp_inputs)} input fields")
-                self.log("\n" + "="*50)
-                self.log("📱 Please check your SMS and Email for the OTP code")
-                self.log("="*50)
-                self.set_status("Waiting for OTP input...")
-                
-                # Ask for OTP in GUI
-                otp_code = simpledialog.askstring("OTP Required", 
-                                                 "Enter the 6-digit OTP code from SMS/Email:",
-                                                 parent=self.root)
-                
-                if otp_code and len(otp_code) == 6 and otp_code.isdigit():
-                    self.log(f"\n✓ Received OTP code: {otp_code}")
-                    self.set_status("Entering OTP code...")
-                    
-                    # Fill OTP
-                    self.log(f"📝 Found {len(otp_inputs)} OTP input fields. Filling...")
-                    for i, digit in enumerate(otp_code[:6]):
-                        otp_inputs[i].clear()
-                        otp_inputs[i].send_keys(digit)
-                        self.log(f"  → Entered digit {i+1}: {digit}")
-                    
-                    self.log("✓ OTP code entered successfully")
-                    time.sleep(1)
-                    
-                    # Step 6: Click Valider
-                    self.log("\n=== Step 6: Clicking 'Valider' button ===")
-                    self.set_status("Step 6: Validating OTP...")
-                    
-                    valider_clicked = self.click_element([
-                        "//button[contains(normalize-space(.), 'Valider')]"
-                    ])
-                    
-                    if valider_clicked:
-                        self.log("✓ Clicked 'Valider' button")
-                        time.sleep(3)
-                    else:
-                        self.log("✗ Could not find 'Valider' button")
+                self.start_preview()
+            self.waits = WaitLog()
+            
+            session_store = shared_session_store()
+            restored = False
+            if session_store:
+                self.steps.begin('session_restore')
+                self.log("\n♻️  Trying the saved session for this account...")
+                self.set_status("Restoring saved session...")
+                restored = session_store.restore(self.driver, self.username_var.get(),
+                                                 self.password_var.get(), SUCCESS_INDICATORS) == 'hit'
+                if restored:
+                    self.log("✓ Saved session is still valid - skipping the OTP login")
                 else:
-                    self.log("✗ Invalid or cancelled OTP input")
-            else:
-                self.log(f"✗ OTP page not detected. Found {len(otp_inputs)} fields (expected 6)")
+                    self.log("✗ No valid saved session - running the full login")
             
-            # Final check
+            outcome = None
+            if not restored:
+                outcome = self.login_with_otp()
+                if not self.running:
+                    return
+            
+            # Final check: success and error signals together
             self.log("\n=== Final Check: Login Status ===")
             self.set_status("Checking login status...")
+            if outcome is None:
+                self.steps.begin('success_check')
+                outcome = self.check_outcome("login status", timeout=5 if restored else 2)
+            self.steps.end()
             
-            success_indicators = [
-                "//a[contains(., 'Logout') or contains(., 'Déconnexion')]",
-                "//div[contains(@class,'dashboard')]",
-                "//h1[contains(.,'Bienvenue')]"
-            ]
-            
-            logged_in = False
-            for sel in success_indicators:
-                try:
-                    if self.driver.find_elements(By.XPATH, sel):
-                        logged_in = True
-                        break
-                except:
-                    pass
-            
-            if logged_in:
+            if outcome['logged_in']:
                 self.log("✅ Login successful!")
                 self.set_status("Login successful!")
-                messagebox.showinfo("Success", "Login completed successfully!")
+                if session_store and not restored:
+                    try:
+                        session_store.save(self.driver, self.username_var.get(),
+                                           session_store.verifier(self.password_var.get()))
+                        self.log("💾 Session saved for next time")
+                    except Exception as e:
+                        self.log(f"⚠️  Could not save the session: {e}")
+                self.show(messagebox.showinfo, "Success", "Login completed successfully!")
+            elif outcome['status'] == 'failure':
+                self.log(f"❌ Login failed: {describe(outcome)}")
+                self.set_status("Login failed")
+                self.show(messagebox.showerror, "Login failed", describe(outcome).capitalize())
             else:
                 self.log(f"⚠️  Login status unclear")
                 self.log(f"Current URL: {self.driver.current_url}")
                 self.set_status("Login status unclear")
             
+            self.log("\n⏱  Time spent waiting on the page:")
+            for line in self.waits.report():
+                self.log(line)
+            
+            self.log("\n⏱  Time per step:")
+            for line in self.steps.report():
+                self.log(line)
+            
+            for profile, stats in profile_stats().items():
+                self.log(f"\n🚫 Blocking profile '{profile}': {stats['blocked']} of {stats['requests']} "
+                         f"requests blocked, {stats['bytes_transferred'] / 1024:.0f} KB downloaded, "
+                         f"~{stats['bytes_saved_estimate'] / 1024:.0f} KB saved (estimated)")
+            
+            for path, stats in input_stats().items():
+                if stats['fields']:
+                    self.log(f"\n⌨️  Form entry ({path}): {stats['fields']} fields in "
+                             f"{stats['round_trips']} WebDriver round-trips")
+            
+            if session_store:
+                stats = session_store.status()
+                self.log(f"\n♻️  Saved sessions: {stats['hits']} hits, {stats['misses']} misses, "
+                         f"{stats['expired']} expired (hit rate {stats['hit_rate']})")
+            
             self.log("\n⏳ Keeping browser open for inspection...")
-            time.sleep(60)
+            timeline.sleep(60, 'inspection')
             
         except Exception as e:
             self.log(f"\n❌ ERROR: {e}")
             self.set_status(f"Error: {str(e)[:50]}")
-            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            self.show(messagebox.showerror, "Error", f"An error occurred:\n{str(e)}")
         
         finally:
+            self.stop_preview()
             if self.driver:
+                if self.trace:
+                    self.trace.detach(self.driver)
                 self.driver.quit()
                 self.log("\n✅ Browser closed")
-            self.reset_ui()
+            self.pump.post(self.reset_ui)
     
-    def click_element(self, xpaths):
-        for xpath in xpaths:
-            try:
-                element = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, xpath))
-                )
-                try:
-                    element.click()
-                except ElementClickInterceptedException:
-                    self.driver.execute_script("arguments[0].click();", element)
-                return True
-            except:
-                continue
-        return False
+    def login_with_otp(self):
+        """
+        The full flow: open the auth page, OTP button, username, password, OTP.
+        Returns the login outcome, or None if it stopped before the site answered
+        """
+        from selenium.webdriver.common.by import By
+        
+        # Load page
+        self.steps.begin('navigation')
+        url = URL
+        self.log(f"\n📂 Opening URL: {url}")
+        self.set_status("Loading page...")
+        
+        try:
+            self.driver.get(url)
+            self.log("✓ Page loaded successfully!")
+        except TimeoutException:
+            self.log("⚠️  Page load timeout - continuing anyway")
+        
+        # Wait for content
+        self.log("⏳ Waiting for page content to load...")
+        if self.wait_step(page_has_controls(), "page content", timeout=20):
+            record_first_input(self.driver, self.steps.elapsed)
+            self.log(f"✓ Page loaded at: {self.driver.current_url}")
+        else:
+            self.log(f"⚠️  Timeout waiting for content. URL: {self.driver.current_url}")
+        
+        if not self.running:
+            return
+        
+        # Step 1: Click OTP button
+        self.steps.begin('otp_button')
+        self.log("\n=== Step 1: Clicking 'S'authentifier avec OTP' button ===")
+        self.set_status("Step 1: Clicking OTP button...")
+        
+        otp_button_xpaths = [
+            "//button[contains(@class, 'btn-primary') and contains(text(), \"S'authentifier avec OTP\")]",
+            "//button[contains(normalize-space(.), \"S'authentifier avec OTP\")]",
+            "//button[contains(., 'OTP')]"
+        ]
+        otp_clicked = self.click_element(otp_button_xpaths, "OTP button", timeout=10)
+        
+        if otp_clicked:
+            self.log("✓ Clicked 'S'authentifier avec OTP' button")
+        else:
+            self.log("✗ Could not find 'S'authentifier avec OTP' button")
+        
+        if not self.running:
+            return
+        
+        # Step 2: Enter username
+        self.steps.begin('username')
+        self.log("\n=== Step 2: Entering username ===")
+        self.set_status("Step 2: Entering username...")
+        
+        username_filled = self.fill_input([
+            (By.XPATH, "//input[contains(@placeholder,'IDENTIFIANT') or contains(@placeholder,'Identifiant')]"),
+            (By.NAME, "username"),
+            (By.NAME, "identifiant"),
+            (By.ID, "username"),
+            (By.XPATH, "//input[@type='text']")
+        ], self.username_var.get(), "username form")
+        
+        if username_filled:
+            self.log(f"✓ Entered username: {self.username_var.get()}")
+        else:
+            self.log("✗ Could not find username field")
+        
+        if not self.running:
+            return
+        
+        # Step 3: Click Suivant
+        self.log("\n=== Step 3: Clicking 'Suivant' button ===")
+        self.set_status("Step 3: Clicking next button...")
+        
+        suivant_xpaths = [
+            "//button[contains(@class, 'btn-primary') and contains(text(), 'Suivant')]",
+            "//button[contains(normalize-space(.), 'Suivant')]"
+        ]
+        suivant_clicked = self.click_element(suivant_xpaths, "Suivant button")
+        
+        if suivant_clicked:
+            self.log("✓ Clicked 'Suivant' button")
+        else:
+            self.log("✗ Could not find 'Suivant' button")
+        
+        if not self.running:
+            return
+        
+        # Step 4: Enter password
+        self.steps.begin('password')
+        password_at = time.time()       # the OTP mail we want arrives after this
+        self.log("\n=== Step 4: Entering password ===")
+        self.set_status("Step 4: Entering password...")
+        
+        password_filled = self.fill_input([
+            (By.XPATH, "//input[contains(@placeholder,'MOT DE PASSE') or contains(@placeholder,'Mot de passe')]"),
+            (By.NAME, "password"),
+            (By.ID, "password"),
+            (By.XPATH, "//input[@type='password']")
+        ], self.password_var.get(), "password form")
+        
+        if password_filled:
+            self.log("✓ Entered password")
+        else:
+            self.log("✗ Could not find password field")
+        
+        if not self.running:
+            return
+        
+        # Step 5: Wait for OTP
+        self.steps.begin('otp_page')
+        self.log("\n=== Step 5: Waiting for OTP page ===")
+        self.set_status("Step 5: Waiting for OTP page...")
+        
+        otp_inputs = self.wait_step(
+            any_of(elements_present("//input[@type='tel' and @maxlength='1']", 6), failure_signals()),
+            "OTP page"
+        ) or []
+        if isinstance(otp_inputs, dict):
+            # the site answered the password with an error instead of the OTP page
+            outcome = as_outcome(otp_inputs, self.driver)
+            self.log(f"✗ {describe(outcome)}")
+            return outcome
+        
+        if len(otp_inputs) >= 6:
+            self.log(f"✓ OTP page detected! Found {len(otp_inputs)} input fields")
+            self.log("\n" + "="*50)
+            self.log("📱 Please check your SMS and Email for the OTP code")
+            self.log("="*50)
+            self.set_status("Waiting for OTP input...")
+            
+            # Ask for OTP in GUI (time spent typing it is not a step)
+            self.steps.end()
+            otp_code = None
+            if self.otp_source:
+                self.set_status("Waiting for the OTP email...")
+                with self.steps.step('otp_mailbox'):
+                    otp_code = otp_mailbox.read_code(self.otp_source, password_at, log=self.log,
+                                                     cancelled=self.stopped,
+                                                     recipient=self.username_var.get())
+                if not self.running:
+                    return
+                self.set_status("Waiting for OTP input...")
+            if not otp_code:
+                # the dialog runs on the Tk thread; this thread waits for the answer
+                otp_code = self.pump.call(lambda: simpledialog.askstring(
+                    "OTP Required", "Enter the 6-digit OTP code from SMS/Email:", parent=self.root))
+            
+            if otp_code and len(otp_code) == 6 and otp_code.isdigit():
+                self.log(f"\n✓ Received OTP code: {otp_code}")
+                self.set_status("Entering OTP code...")
+                
+                # Fill OTP
+                self.steps.begin('valider')
+                self.log(f"📝 Found {len(otp_inputs)} OTP input fields. Filling...")
+                if fill_elements(self.driver, otp_inputs[:6], list(otp_code)):
+                    self.log("✓ OTP code entered successfully")
+                else:
+                    self.log("✗ Failed to enter OTP code")
+                
+                # Step 6: Click Valider
+                self.log("\n=== Step 6: Clicking 'Valider' button ===")
+                self.set_status("Step 6: Validating OTP...")
+                
+                valider_xpath = "//button[contains(normalize-space(.), 'Valider')]"
+                mark_stale(self.driver)
+                valider_clicked = self.click_element([valider_xpath], "Valider button")
+                
+                if valider_clicked:
+                    self.log("✓ Clicked 'Valider' button")
+                    self.steps.begin('success_check')
+                    return self.check_outcome("post-Valider page")
+                else:
+                    self.log("✗ Could not find 'Valider' button")
+            else:
+                self.log("✗ Invalid or cancelled OTP input")
+        else:
+            self.log(f"✗ OTP page not detected. Found {len(otp_inputs)} fields (expected 6)")
+        return None
     
-    def fill_input(self, selectors, text):
-        for by, sel in selectors:
-            try:
-                element = self.driver.find_element(by, sel)
-                element.clear()
-                element.send_keys(text)
-                return True
-            except:
-                continue
-        return False
+    def check_outcome(self, label, timeout=20):
+        # success and error signals are watched together, whichever shows first wins
+        outcome = detect(self.driver, timeout=timeout, indicators=SUCCESS_INDICATORS,
+                         label=label, log=self.waits)
+        _, seconds, _ = self.waits.entries[-1]
+        self.log(f"  ⏱  {label}: {describe(outcome)} after {seconds:.2f}s")
+        return outcome
+    
+    def wait_step(self, condition, label, timeout=20):
+        result = wait_for(self.driver, condition, timeout=timeout, label=label, log=self.waits)
+        _, seconds, ok = self.waits.entries[-1]
+        self.log(f"  ⏱  {label}: {'ready' if ok else 'timed out'} after {seconds:.2f}s")
+        return result
+    
+    def click_element(self, xpaths, label, timeout=5):
+        # All candidates are checked in one evaluation; first match by priority wins
+        element = self.wait_step(first_match(xpaths), label, timeout=timeout)
+        if not element:
+            return False
+        try:
+            element.click()
+        except ElementClickInterceptedException:
+            self.driver.execute_script("arguments[0].click();", element)
+        return True
+    
+    def fill_input(self, selectors, text, label, timeout=20):
+        element = self.wait_step(first_match(selectors), label, timeout=timeout)
+        if not element:
+            return False
+        return fill_elements(self.driver, [element], [text])
 
 def main():
     root = tk.Tk()
     app = DamancomLoginGUI(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -4,135 +4,122 @@
 # (The Run button won't work - this script needs your OTP input!)
 # 
 # The script will ask you for the 6-digit OTP code from your SMS/Email
+#
+# BATCH MODE: python main.py --batch accounts.txt --parallel 3
+# accounts.txt has one "username,password" per line (# starts a comment).
+# Logins run side by side; type each OTP as "<number> <code>" when it arrives.
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import (
-    NoSuchElementException, TimeoutException, ElementClickInterceptedException
-)
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+# selenium.webdriver is imported where it is used: the prompt appears right away
+# and Chrome starts in the background while the credentials are typed
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
+import argparse
+import contextlib
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from damancom.waits import WaitLog, wait_for, page_has_controls, elements_present, any_of
+from damancom.locators import first_match
+from damancom.metrics import StepTimer
+from damancom.session_store import shared as shared_session_store
+from damancom.blocking import attach as attach_blocking, record_first_input, profile_stats
+from damancom.otp_desk import OtpDesk
+from damancom import otp_mailbox
+from damancom.bulk_input import fill_elements, fill_otp, input_stats
+from damancom.outcome import detect, failure_signals, mark_stale, describe, as_outcome
+from damancom import prestart
+from damancom import timeline
 
 # ===== CONFIG =====
 URL = "https://www.damancom.ma/fr/authentification"
 HEADLESS = False              # Temporarily disabled - site blocks headless browsers
 IMPLICIT_WAIT = 8             # seconds
 EXPLICIT_WAIT = 20            # seconds
+BLOCK_PROFILE = "analytics"   # skip requests the login never needs: none, analytics, media, lean
+BATCH_PARALLEL = 3            # browsers open at once in batch mode
+OTP_TIMEOUT = 300             # seconds an account waits for its OTP in batch mode
+# OTP from a mailbox: set DAMANCOM_OTP_MAILBOX to skip typing the code
+# (see damancom/otp_mailbox.py; typing it stays the fallback)
+# Saved sessions: set DAMANCOM_SESSION_KEY to reuse a logged-in session
+# instead of the OTP login (see damancom/session_store.py)
 # ==================
 
-def try_find(driver, by, value, timeout=EXPLICIT_WAIT):
-    try:
-        return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
-    except TimeoutException:
-        return None
+SUCCESS_INDICATORS = [
+    "//a[contains(., 'Logout') or contains(., 'Déconnexion') or contains(., 'Se déconnecter')]",
+    "//div[contains(@class,'dashboard')]", 
+    "//h1[contains(.,'Bienvenue')]", 
+    "//a[contains(@href,'/private/')]"
+]
+
+def wait_step(driver, condition, label, waits, timeout=EXPLICIT_WAIT):
+    """
+    Wait for the page to reach the next step and print how long it took
+    """
+    result = wait_for(driver, condition, timeout=timeout, label=label, log=waits)
+    _, seconds, ok = waits.entries[-1]
+    print(f"  ⏱  {label}: {'ready' if ok else 'timed out'} after {seconds:.2f}s", flush=True)
+    return result
 
-def click_if_exists(driver, by, value, timeout=5):
-    el = try_find(driver, by, value, timeout=timeout)
+def click_if_exists(driver, selectors, label, waits, timeout=5):
+    """
+    selectors: list of XPaths or (By, selector); all are checked in one go
+    and the first match by priority is clicked
+    """
+    el = wait_step(driver, first_match(selectors), label, waits, timeout=timeout)
     if el:
         try:
             el.click()
-            return True
         except ElementClickInterceptedException:
             driver.execute_script("arguments[0].click();", el)
-            return True
+        return True
     return False
 
-def fill_input_if_exists(driver, selectors, text):
+def fill_input_if_exists(driver, selectors, text, label, waits, timeout=IMPLICIT_WAIT):
     """
-    selectors: list of (By, selector) to try in order
+    selectors: list of (By, selector) in priority order
     """
-    for by, sel in selectors:
-        try:
-            el = driver.find_element(by, sel)
-            el.clear()
-            el.send_keys(text)
-            return True
-        except Exception:
-            continue
+    el = wait_step(driver, first_match(selectors), label, waits, timeout=timeout)
+    if el:
+        return fill_elements(driver, [el], [text])
     return False
 
+def check_outcome(driver, label, waits, timeout=EXPLICIT_WAIT):
+    """
+    Wait for the page to show success or a known error (wrong OTP, bad
+    password, locked account, captcha), whichever comes first
+    """
+    outcome = detect(driver, timeout=timeout, indicators=SUCCESS_INDICATORS, label=label, log=waits)
+    _, seconds, _ = waits.entries[-1]
+    print(f"  ⏱  {label}: {describe(outcome)} after {seconds:.2f}s", flush=True)
+    return outcome
+
 def fill_otp_fields(driver, otp_code):
     """
     Fill 6 separate OTP input fields with the OTP code digits
     """
-    try:
-        # Find all OTP input fields (type='tel', maxlength='1')
-        otp_inputs = driver.find_elements(By.XPATH, "//input[@type='tel' and @maxlength='1']")
-        
-        if len(otp_inputs) >= 6:
-            print(f"📝 Found {len(otp_inputs)} OTP input fields. Filling with code...", flush=True)
-            for i, digit in enumerate(otp_code[:6]):
-                otp_inputs[i].clear()
-                otp_inputs[i].send_keys(digit)
-                print(f"  → Entered digit {i+1}: {digit}", flush=True)
-            return True
-        else:
-            print(f"✗ Expected 6 OTP fields but found {len(otp_inputs)}", flush=True)
-            return False
-    except Exception as e:
-        print(f"✗ Error filling OTP fields: {e}", flush=True)
-        return False
+    # Find the OTP input fields (type='tel', maxlength='1') and set all six in one call
+    found = fill_otp(driver, otp_code[:6])
+    if found >= 6:
+        print(f"📝 Filled {found} OTP input fields with the code", flush=True)
+        return True
+    print(f"✗ Expected 6 OTP fields but found {found}", flush=True)
+    return False
 
-def main():
-    print("\n" + "="*60, flush=True)
-    print("🚀 DAMANCOM LOGIN AUTOMATION", flush=True)
-    print("="*60, flush=True)
-    
-    # Ask for credentials
-    print("\nPlease enter your Damancom credentials:", flush=True)
-    EMAIL = input("Username: ").strip()
-    PASSWORD = input("Password: ").strip()
-    
-    if not EMAIL or not PASSWORD:
-        print("\n❌ Username and password are required!", flush=True)
-        return
-    
-    print("\n" + "="*60, flush=True)
-    print("STARTING AUTOMATION", flush=True)
-    print("="*60, flush=True)
-    
-    options = webdriver.ChromeOptions()
-    
-    # Headless mode - currently disabled as site blocks headless browsers
-    if HEADLESS:
-        options.add_argument("--headless=new")
-        print("✓ Headless mode enabled", flush=True)
-    else:
-        print("✓ Running in visible mode (headless disabled)", flush=True)
-    
-    # Required options for Replit/containerized environments
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    
-    # Anti-detection
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36")
-    
-    print("✓ Chrome options configured", flush=True)
-    
-    # Use regular Selenium with anti-detection options
-    print("✓ Starting Chrome browser...", flush=True)
-    driver = webdriver.Chrome(options=options)
-    
-    # Hide webdriver flag
-    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-        'source': '''
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            })
-        '''
-    })
-    
-    driver.implicitly_wait(IMPLICIT_WAIT)
-    driver.set_page_load_timeout(45)
-    print("✓ Chrome browser started successfully!", flush=True)
+def ask_otp_console():
+    return input("\nEnter the 6-digit OTP code: ")
+
+def login_with_otp(driver, email, password, waits, steps, ask_otp=ask_otp_console, otp_source=None):
+    """
+    The full flow: open the auth page, OTP button, username, password, OTP
+    ask_otp: returns the code the user typed (None to give up)
+    otp_source: mailbox provider tried before ask_otp (see damancom/otp_mailbox.py)
+    Returns the login outcome (see damancom/outcome.py), or None if the
+    flow stopped before the site answered
+    """
+    from selenium.webdriver.common.by import By
 
+    steps.begin('navigation')
     print(f"\n📂 Opening URL: {URL}", flush=True)
     try:
         driver.get(URL)
@@ -140,23 +127,16 @@ def main():
     except TimeoutException:
         print("⚠️  Page load timeout - continuing anyway", flush=True)
     
-    # Wait for page to actually load by checking for elements
-    print("⏳ Waiting for page content to load...", flush=True)
-    time.sleep(3)
-    
     # Wait for any button or form to appear (sign the page has loaded)
-    try:
-        WebDriverWait(driver, 20).until(
-            lambda d: len(d.find_elements(By.TAG_NAME, "button")) > 0 or 
-                     len(d.find_elements(By.TAG_NAME, "input")) > 0
-        )
+    print("⏳ Waiting for page content to load...", flush=True)
+    if wait_step(driver, page_has_controls(), "page content", waits, timeout=20):
+        record_first_input(driver, steps.elapsed)
         print(f"✓ Page loaded successfully at: {driver.current_url}", flush=True)
-    except TimeoutException:
+    else:
         print(f"⚠️  Timeout waiting for content. Current URL: {driver.current_url}", flush=True)
-    
-    time.sleep(2)
 
     # Step 1: Click "S'authentifier avec OTP" button
+    steps.begin('otp_button')
     print("\n=== Step 1: Clicking 'S'authentifier avec OTP' button ===", flush=True)
     print(f"Current URL: {driver.current_url}", flush=True)
     print(f"Page title: {driver.title}", flush=True)
@@ -167,21 +147,16 @@ def main():
         "//button[contains(normalize-space(.), \"S'authentifier avec OTP\")]",
         "//button[contains(., 'OTP')]"
     ]
-    
-    otp_button_clicked = False
-    for selector in otp_button_selectors:
-        if click_if_exists(driver, By.XPATH, selector, timeout=5):
-            print("✓ Clicked 'S'authentifier avec OTP' button", flush=True)
-            otp_button_clicked = True
-            time.sleep(2)
-            break
-    
-    if not otp_button_clicked:
+    otp_button_clicked = click_if_exists(driver, otp_button_selectors, "OTP button", waits, timeout=10)
+    if otp_button_clicked:
+        print("✓ Clicked 'S'authentifier avec OTP' button", flush=True)
+    else:
         print("✗ Could not find 'S'authentifier avec OTP' button", flush=True)
         driver.save_screenshot("step1_debug.png")
         print("📸 Saved debug screenshot: step1_debug.png", flush=True)
 
     # Step 2: Enter username/identifier
+    steps.begin('username')
     print("\n=== Step 2: Entering username ===", flush=True)
     id_selectors = [
         (By.XPATH, "//input[contains(@placeholder,'IDENTIFIANT') or contains(@placeholder,'Identifiant')]"),
@@ -193,15 +168,15 @@ def main():
         (By.ID, "identifiant"),
         (By.XPATH, "//input[@type='text']")
     ]
-    filled_id = fill_input_if_exists(driver, id_selectors, EMAIL)
+    filled_id = fill_input_if_exists(driver, id_selectors, email, "username form", waits,
+                                     timeout=EXPLICIT_WAIT)
     if filled_id:
-        print(f"✓ Entered username: {EMAIL}", flush=True)
+        print(f"✓ Entered username: {email}", flush=True)
     else:
         print("✗ Could not find username field", flush=True)
 
     # Step 3: Click "Suivant" button
     print("\n=== Step 3: Clicking 'Suivant' button ===", flush=True)
-    time.sleep(1)
     
     # Try multiple selectors for the Suivant button
     suivant_selectors = [
@@ -209,19 +184,18 @@ def main():
         "//button[contains(normalize-space(.), 'Suivant')]",
         "//button[contains(., 'Suivant')]"
     ]
-    
-    suivant_clicked = False
-    for selector in suivant_selectors:
-        if click_if_exists(driver, By.XPATH, selector, timeout=5):
-            print("✓ Clicked 'Suivant' button", flush=True)
-            suivant_clicked = True
-            time.sleep(2)
-            break
-    
-    if not suivant_clicked:
+    suivant_clicked = click_if_exists(driver, suivant_selectors, "Suivant button", waits)
+    if suivant_clicked:
+        print("✓ Clicked 'Suivant' button", flush=True)
+    else:
         print("✗ Could not find 'Suivant' button", flush=True)
 
     # Step 4: Enter password
+    steps.begin('password')
+    if otp_source:
+        # until the code is read, unless code mails can be told apart by account
+        otp_source.enter_stage()
+    password_at = time.time()       # the OTP mail we want arrives after this
     print("\n=== Step 4: Entering password ===", flush=True)
     pwd_selectors = [
         (By.XPATH, "//input[contains(@placeholder,'MOT DE PASSE') or contains(@placeholder,'Mot de passe')]"),
@@ -230,7 +204,8 @@ def main():
         (By.ID, "password"),
         (By.XPATH, "//input[@type='password']")
     ]
-    filled_pwd = fill_input_if_exists(driver, pwd_selectors, PASSWORD)
+    filled_pwd = fill_input_if_exists(driver, pwd_selectors, password, "password form", waits,
+                                      timeout=EXPLICIT_WAIT)
     if filled_pwd:
         print("✓ Entered password", flush=True)
     else:
@@ -238,10 +213,17 @@ def main():
 
     # Step 5: Wait for OTP page and ask user for code
     print("\n=== Step 5: Waiting for OTP page ===", flush=True)
-    time.sleep(3)
     
     # Check if we're on the OTP page by looking for the 6 OTP input fields
-    otp_inputs = driver.find_elements(By.XPATH, "//input[@type='tel' and @maxlength='1']")
+    steps.begin('otp_page')
+    otp_inputs = wait_step(driver, any_of(elements_present("//input[@type='tel' and @maxlength='1']", 6),
+                                          failure_signals()),
+                           "OTP page", waits) or []
+    if isinstance(otp_inputs, dict):
+        # the site answered the password with an error instead of the OTP page
+        outcome = as_outcome(otp_inputs, driver)
+        print(f"✗ {describe(outcome)}", flush=True)
+        return outcome
     
     if len(otp_inputs) >= 6:
         print(f"✓ OTP page detected! Found {len(otp_inputs)} input fields", flush=True)
@@ -249,29 +231,33 @@ def main():
         print("📱 Please check your SMS and Email for the OTP code", flush=True)
         print("="*50, flush=True)
         
-        # Ask user for OTP code
-        otp_code = input("\nEnter the 6-digit OTP code: ").strip()
+        # Ask user for OTP code (time spent typing it is not a step)
+        steps.end()
+        otp_code = None
+        if otp_source:
+            with steps.step('otp_mailbox'):
+                otp_code = otp_mailbox.read_code(otp_source, password_at, log=say, recipient=email)
+            otp_source.leave_stage()
+        otp_code = (otp_code or ask_otp() or '').strip()
         
         # Validate OTP code
         if len(otp_code) == 6 and otp_code.isdigit():
             print(f"\n✓ Received OTP code: {otp_code}", flush=True)
             
             # Fill OTP fields
+            steps.begin('valider')
             if fill_otp_fields(driver, otp_code):
                 print("✓ OTP code entered successfully", flush=True)
-                time.sleep(1)
                 
                 # Step 6: Click "Valider" button
                 print("\n=== Step 6: Clicking 'Valider' button ===", flush=True)
-                valider_clicked = click_if_exists(
-                    driver, 
-                    By.XPATH, 
-                    "//button[contains(normalize-space(.), 'Valider')]",
-                    timeout=5
-                )
+                valider_xpath = "//button[contains(normalize-space(.), 'Valider')]"
+                mark_stale(driver)
+                valider_clicked = click_if_exists(driver, [valider_xpath], "Valider button", waits)
                 if valider_clicked:
                     print("✓ Clicked 'Valider' button", flush=True)
-                    time.sleep(3)
+                    steps.begin('success_check')
+                    return check_outcome(driver, "post-Valider page", waits)
                 else:
                     print("✗ Could not find 'Valider' button", flush=True)
             else:
@@ -280,44 +266,373 @@ def main():
             print("✗ Invalid OTP code. Must be 6 digits.", flush=True)
     else:
         print(f"✗ OTP page not detected. Found {len(otp_inputs)} OTP fields (expected 6)", flush=True)
+    return None
 
-    # Final check: successful login indicator
-    print("\n=== Final Check: Login Status ===", flush=True)
-    success_indicators = [
-        "//a[contains(., 'Logout') or contains(., 'Déconnexion') or contains(., 'Se déconnecter')]",
-        "//div[contains(@class,'dashboard')]", 
-        "//h1[contains(.,'Bienvenue')]", 
-        "//a[contains(@href,'/private/')]"
-    ]
-    logged_in = False
-    for sel in success_indicators:
+class PrefixedStdout:
+    """
+    Stdout for concurrent logins: each thread can set a prefix (its account)
+    that starts every line it prints, and lines are written whole so
+    accounts never interleave mid-line.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def set_prefix(self, prefix):
+        self._local.prefix = prefix
+        self._local.buffer = ''
+
+    def write(self, text):
+        prefix = getattr(self._local, 'prefix', None)
+        if not prefix:
+            with self._lock:
+                return self.stream.write(text)
+        self._local.buffer += text
+        *lines, self._local.buffer = self._local.buffer.split('\n')
+        if lines:
+            with self._lock:
+                self.stream.write(''.join(f"{prefix} {line}\n" for line in lines))
+        return len(text)
+
+    def flush(self):
+        prefix = getattr(self._local, 'prefix', None)
+        if prefix and self._local.buffer:
+            with self._lock:
+                self.stream.write(f"{prefix} {self._local.buffer}")
+            self._local.buffer = ''
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def say(message):
+    print(message, flush=True)
+
+def start_driver(log=say):
+    """
+    Chrome with the anti-detection options and the blocking profile
+    log: where progress messages go (kept aside when starting in the background)
+    """
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    
+    # Headless mode - currently disabled as site blocks headless browsers
+    if HEADLESS:
+        options.add_argument("--headless=new")
+        log("✓ Headless mode enabled")
+    else:
+        log("✓ Running in visible mode (headless disabled)")
+    
+    if timeline.ENABLED:
+        timeline.enable_performance_log(options)
+    
+    # Required options for Replit/containerized environments
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    
+    # Anti-detection
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36")
+    
+    log("✓ Chrome options configured")
+    
+    # Use regular Selenium with anti-detection options
+    log("✓ Starting Chrome browser...")
+    driver = webdriver.Chrome(options=options)
+    
+    # Hide webdriver flag
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': '''
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            })
+        '''
+    })
+    
+    driver.implicitly_wait(IMPLICIT_WAIT)
+    driver.set_page_load_timeout(45)
+    log("✓ Chrome browser started successfully!")
+    
+    try:
+        blocker = attach_blocking(driver, BLOCK_PROFILE)
+        log(f"✓ Request blocking profile: {blocker.profile}")
+    except Exception as e:
+        log(f"⚠️  Request blocking unavailable: {e}")
+    return driver
+
+def take_driver(prestarted):
+    """The browser started in the background, or a fresh one if that launch failed"""
+    try:
+        driver = prestarted.take()
+    except Exception as e:
+        for note in prestarted.notes:
+            say(note)
+        say(f"⚠️  Background browser start failed ({e}) - starting it again")
+        return start_driver()
+    for note in prestarted.notes:
+        say(note)
+    say("✓ Browser was started in the background while you typed")
+    return driver
+
+def login_account(email, password, ask_otp=ask_otp_console, inspect_seconds=10,
+                  screenshot="damancom_debug.png", prestarted=None, otp_source=None):
+    """
+    Log one account in, from browser start to quit.
+    prestarted: a Prestart already launching the browser (see damancom/prestart.py)
+    otp_source: mailbox the OTP is read from before asking for it
+    Returns {'account', 'status', 'reason', 'duration', 'url'}; status is one of
+    'restored', 'logged in', 'failed', 'unclear' or 'error'.
+    """
+    result = {'account': email, 'status': 'error', 'reason': None, 'duration': 0.0, 'url': ''}
+    started = time.perf_counter()
+    steps = StepTimer()
+    driver = None
+    # DAMANCOM_TRACE_DIR: record this login as a trace file (see damancom/timeline.py)
+    trace = timeline.Timeline(email) if timeline.ENABLED else None
+    with trace.activate() if trace else contextlib.nullcontext():
         try:
-            if driver.find_elements(By.XPATH, sel):
-                logged_in = True
-                break
-        except Exception:
-            pass
-
-    if logged_in:
-        print("✅ Login successful!", flush=True)
+            steps.begin('driver_create')
+            driver = take_driver(prestarted) if prestarted else start_driver()
+            if trace:
+                trace.attach(driver)
+            waits = WaitLog()
+
+            session_store = shared_session_store()
+            restored = False
+            if session_store:
+                steps.begin('session_restore')
+                print("\n♻️  Trying the saved session for this account...", flush=True)
+                restored = session_store.restore(driver, email, password, SUCCESS_INDICATORS) == 'hit'
+                if restored:
+                    print("✓ Saved session is still valid - skipping the OTP login", flush=True)
+                else:
+                    print("✗ No valid saved session - running the full login", flush=True)
+
+            outcome = None
+            if not restored:
+                outcome = login_with_otp(driver, email, password, waits, steps, ask_otp, otp_source)
+
+            # Final check: success and error signals together
+            print("\n=== Final Check: Login Status ===", flush=True)
+            if outcome is None:
+                steps.begin('success_check')
+                outcome = check_outcome(driver, "login status", waits, timeout=5 if restored else 2)
+
+            steps.end()
+            result['duration'] = time.perf_counter() - started
+            result['url'] = outcome['url'] or driver.current_url
+            result['reason'] = outcome['reason']
+
+            if outcome['logged_in']:
+                result['status'] = 'restored' if restored else 'logged in'
+                print("✅ Login successful!", flush=True)
+                if session_store and not restored:
+                    try:
+                        session_store.save(driver, email, session_store.verifier(password))
+                        print("💾 Session saved for next time", flush=True)
+                    except Exception as e:
+                        print(f"⚠️  Could not save the session: {e}", flush=True)
+            elif outcome['status'] == 'failure':
+                result['status'] = 'failed'
+                print(f"❌ Login failed: {describe(outcome)}", flush=True)
+                driver.save_screenshot(screenshot)
+                print(f"📸 Saved screenshot: {screenshot}", flush=True)
+            else:
+                result['status'] = 'unclear'
+                print("⚠️  Login status unclear. Check the browser window.", flush=True)
+                print(f"Current URL: {driver.current_url}", flush=True)
+                print(f"Page title: {driver.title}", flush=True)
+                driver.save_screenshot(screenshot)
+                print(f"📸 Saved screenshot: {screenshot}", flush=True)
+
+            print("\n⏱  Time spent waiting on the page:", flush=True)
+            for line in waits.report():
+                print(line, flush=True)
+
+            print("\n⏱  Time per step:", flush=True)
+            for line in steps.report():
+                print(line, flush=True)
+
+            if inspect_seconds:
+                # Keep browser open for inspection
+                print("\n" + "="*60, flush=True)
+                print(f"⏳ Browser will remain open for {inspect_seconds} seconds for inspection", flush=True)
+                print("="*60, flush=True)
+                timeline.sleep(inspect_seconds, 'inspection')
+        except Exception as e:
+            result['status'] = f"error: {e}"
+            result['duration'] = time.perf_counter() - started
+            print(f"\n❌ ERROR: {e}", flush=True)
+        finally:
+            if otp_source:
+                otp_source.leave_stage()
+            if driver:
+                if trace:
+                    trace.detach(driver)
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+    if trace:
+        print(f"🧭 Performance trace: {trace.save()} (open it in ui.perfetto.dev)", flush=True)
+    return result
+
+def print_run_stats(otp_source=None):
+    for path, stats in input_stats().items():
+        if stats['fields']:
+            print(f"\n⌨️  Form entry ({path}): {stats['fields']} fields in {stats['round_trips']} "
+                  f"WebDriver round-trips", flush=True)
+
+    for profile, stats in profile_stats().items():
+        print(f"\n🚫 Blocking profile '{profile}': {stats['blocked']} of {stats['requests']} requests blocked, "
+              f"{stats['bytes_transferred'] / 1024:.0f} KB downloaded, "
+              f"~{stats['bytes_saved_estimate'] / 1024:.0f} KB saved (estimated)", flush=True)
+
+    session_store = shared_session_store()
+    if session_store:
+        stats = session_store.status()
+        print(f"\n♻️  Saved sessions: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['expired']} expired (hit rate {stats['hit_rate']})", flush=True)
+
+    if otp_source:
+        stats = otp_source.stats
+        waited = stats['found'] + stats['timeouts'] + stats['cancelled']
+        if waited:
+            print(f"\n📬 OTP mailbox: {stats['found']} of {waited} codes read automatically, "
+                  f"{stats['seconds'] / waited:.1f}s average wait", flush=True)
+
+def main():
+    print("\n" + "="*60, flush=True)
+    print("🚀 DAMANCOM LOGIN AUTOMATION", flush=True)
+    print("="*60, flush=True)
+    
+    # Chrome starts while the credentials are typed
+    prestarted = prestart.Prestart(start_driver) if prestart.ENABLED else None
+    
+    # Ask for credentials
+    print("\nPlease enter your Damancom credentials:", flush=True)
+    try:
+        EMAIL = input("Username: ").strip()
+        PASSWORD = input("Password: ").strip()
+    except (EOFError, KeyboardInterrupt):
+        if prestarted:
+            prestarted.discard()
+        raise
+    
+    if not EMAIL or not PASSWORD:
+        if prestarted:
+            prestarted.discard()
+        print("\n❌ Username and password are required!", flush=True)
+        return
+    
+    print("\n" + "="*60, flush=True)
+    print("STARTING AUTOMATION", flush=True)
+    print("="*60, flush=True)
+    
+    otp_source = otp_mailbox.from_env()
+    result = login_account(EMAIL, PASSWORD, prestarted=prestarted, otp_source=otp_source)
+    if otp_source:
+        otp_source.close()
+    print_run_stats(otp_source)
+    if result['status'].startswith('error'):
+        print(f"\n❌ Login failed: {result['status']}", flush=True)
     else:
-        print("⚠️  Login status unclear. Check the browser window.", flush=True)
-        print(f"Current URL: {driver.current_url}", flush=True)
-        print(f"Page title: {driver.title}", flush=True)
-        driver.save_screenshot("damancom_debug.png")
-        print("📸 Saved screenshot: damancom_debug.png", flush=True)
+        print("\n✅ Script completed. Browser closed.", flush=True)
+
+def read_accounts(path):
+    """
+    One "username,password" per line; blank lines and # comments are skipped
+    """
+    accounts = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            username, sep, password = line.partition(',')
+            if not sep or not username.strip() or not password.strip():
+                raise ValueError(f"{path}:{number}: expected 'username,password'")
+            accounts.append((username.strip(), password.strip()))
+    return accounts
+
+def run_batch(path, parallel=BATCH_PARALLEL):
+    """
+    Log every account in the file in, at most `parallel` browsers at a time.
+    OTP prompts from all logins go to one shared desk, so codes can be typed
+    in whatever order they arrive.
+    """
+    accounts = read_accounts(path)
+    if not accounts:
+        print(f"\n❌ No accounts in {path}", flush=True)
+        return []
 
-    # Keep browser open for inspection
     print("\n" + "="*60, flush=True)
-    print("⏳ Browser will remain open for 10 seconds for inspection", flush=True)
+    print(f"🚀 DAMANCOM BATCH LOGIN: {len(accounts)} accounts, {parallel} at a time", flush=True)
     print("="*60, flush=True)
-    time.sleep(10)
-    driver.quit()
-    print("\n✅ Script completed. Browser closed.", flush=True)
+    print("📱 When an account asks for its OTP, type '<number> <code>' (or '<number> skip').", flush=True)
+    print("   With only one account waiting, the code alone is enough.", flush=True)
+
+    stdout = sys.stdout
+    sys.stdout = PrefixedStdout(stdout)
+    desk = OtpDesk()
+    # one mailbox for every account: a code goes to the account its mail names; unless
+    # DAMANCOM_OTP_MATCH=recipient, accounts take turns between password and code
+    otp_source = otp_mailbox.from_env()
+
+    def run(index, email, password):
+        sys.stdout.set_prefix(f"[{email}]")
+        try:
+            return login_account(email, password,
+                                 ask_otp=lambda: desk.request(email, timeout=OTP_TIMEOUT),
+                                 inspect_seconds=0,
+                                 screenshot=f"damancom_debug_{index}.png",
+                                 otp_source=otp_source)
+        finally:
+            sys.stdout.set_prefix(None)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix='login') as executor:
+            futures = [executor.submit(run, index, email, password)
+                       for index, (email, password) in enumerate(accounts, 1)]
+            results = [future.result() for future in futures]
+    finally:
+        sys.stdout = stdout
+        if otp_source:
+            otp_source.close()
+
+    print_run_stats(otp_source)
+    print("\n" + "="*60, flush=True)
+    print("📋 BATCH RESULTS", flush=True)
+    print("="*60, flush=True)
+    width = max(len('Account'), *(len(r['account']) for r in results))
+    statuses = [f"{r['status']}: {r['reason']}" if r['status'] == 'failed' else r['status'] for r in results]
+    status_width = max(len('Status'), *(len(status) for status in statuses))
+    print(f"{'Account':<{width}}  {'Status':<{status_width}}  {'Duration':>9}  Final URL", flush=True)
+    for r, status in zip(results, statuses):
+        print(f"{r['account']:<{width}}  {status:<{status_width}}  {r['duration']:>8.1f}s  {r['url']}",
+              flush=True)
+    ok = sum(1 for r in results if r['status'] in ('logged in', 'restored'))
+    print(f"\n{'✅' if ok == len(results) else '⚠️ '} {ok}/{len(results)} accounts logged in", flush=True)
+    return results
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Damancom login automation")
+    parser.add_argument('--batch', metavar='FILE', help='log in every "username,password" line of FILE')
+    parser.add_argument('--parallel', type=int, default=BATCH_PARALLEL,
+                        help=f"browsers open at once in batch mode (default {BATCH_PARALLEL})")
+    args = parser.parse_args()
     try:
-        main()
+        if args.batch:
+            run_batch(args.batch, args.parallel)
+        else:
+            main()
     except Exception as e:
         print(f"\n❌ ERROR: {e}", flush=True)
         import traceback
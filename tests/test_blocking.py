@@ -0,0 +1,22 @@
+from damancom import blocking
+
+
+def test_saved_bytes_estimate_follows_completed_requests(monkeypatch):
+    monkeypatch.setattr(blocking, '_type_sizes', {})
+    assert blocking.estimated_bytes('Image') == blocking.TYPICAL_BYTES['Image']
+    assert blocking.estimated_bytes('Ping') == blocking.DEFAULT_TYPICAL_BYTES
+    blocking._type_sizes['Image'] = [4, 8000]
+    assert blocking.estimated_bytes('Image') == 2000
+
+
+def test_profile_stats_report_saved_bytes_and_first_input(monkeypatch):
+    monkeypatch.setattr(blocking, '_stats', {})
+
+    class Driver:
+        request_blocker = None
+
+    blocking.record_first_input(Driver(), 1.5)
+    blocking.record_first_input(Driver(), 0.5)
+    stats = blocking.profile_stats()['none']
+    assert stats['page_loads'] == 2 and stats['first_input_avg'] == 1.0
+    assert stats['bytes_saved_estimate'] == 0
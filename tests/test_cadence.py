@@ -0,0 +1,35 @@
+from damancom.cadence import RefreshCadence, ACTIVE_INTERVAL, MAX_INTERVAL, MAX_THROTTLE
+
+
+def test_waiting_steps_use_their_interval():
+    cadence = RefreshCadence(session_budget=5)
+    assert cadence.interval('username', False, 1) == 4.0
+    assert cadence.interval('otp', False, 1) == 8.0
+    assert cadence.interval('unknown-step', False, 1) == 2.0
+
+
+def test_active_step_refreshes_fast():
+    cadence = RefreshCadence(session_budget=5)
+    assert cadence.interval('otp', True, 1) == ACTIVE_INTERVAL
+    assert cadence.interval('otp', True, 1, active_interval=0.1) == 0.1
+
+
+def test_paused_only_after_a_successful_login():
+    cadence = RefreshCadence(session_budget=5)
+    assert cadence.interval('complete', False, 1) is None
+    assert cadence.interval('complete', False, 1, logged_in=True) is None
+    assert cadence.interval('complete', False, 1, logged_in=False) == 8.0
+
+
+def test_throttle_follows_sessions_and_encode_time():
+    cadence = RefreshCadence(session_budget=5, encode_budget=0.05)
+    assert cadence.throttle(5) == 1.0
+    assert cadence.throttle(10) == 2.0
+    cadence.observe_encode(0.2)
+    assert cadence.throttle(1) == 4.0
+    assert cadence.throttle(1000) == MAX_THROTTLE
+
+
+def test_interval_is_capped():
+    cadence = RefreshCadence(session_budget=1)
+    assert cadence.interval('otp', False, 100) == MAX_INTERVAL
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from damancom.encode_pool import EncodePool, FrameDropped
+
+
+@pytest.fixture
+def blocked_pool():
+    """A one-thread pool whose thread is busy until the test releases it."""
+    pool = EncodePool(workers=1, max_pending=2)
+    started, release = threading.Event(), threading.Event()
+    busy = pool.submit('busy', lambda: started.set() or release.wait(5))
+    assert started.wait(5)
+    yield pool, release
+    release.set()
+    busy.result(5)
+    pool.shutdown()
+
+
+def test_same_key_gets_the_newest_frame(blocked_pool):
+    pool, release = blocked_pool
+    first = pool.submit(('s1', 'frame'), lambda frame: frame, 'old')
+    second = pool.submit(('s1', 'frame'), lambda frame: frame, 'new')
+    release.set()
+    assert first is second
+    assert first.result(5) == 'new'
+    assert pool.stats['superseded'] == 1
+
+
+def test_different_since_is_not_superseded(blocked_pool):
+    pool, release = blocked_pool
+    delta = lambda frame, since: (frame, since)
+    a = pool.submit(('s1', 'frame_delta', 1), delta, 'png', 1)
+    b = pool.submit(('s1', 'frame_delta', 2), delta, 'png', 2)
+    release.set()
+    assert a.result(5) == ('png', 1)
+    assert b.result(5) == ('png', 2)
+    assert pool.stats['superseded'] == 0
+
+
+def test_full_queue_drops_the_oldest(blocked_pool):
+    pool, release = blocked_pool
+    oldest = pool.submit('a', str, 1)
+    pool.submit('b', str, 2)
+    newest = pool.submit('c', str, 3)
+    with pytest.raises(FrameDropped):
+        oldest.result(5)
+    release.set()
+    assert newest.result(5) == '3'
+    assert pool.stats['dropped'] == 1
+
+
+def test_errors_reach_the_caller():
+    pool = EncodePool(workers=1)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            pool.run('k', lambda: 1 / 0, timeout=5)
+        assert pool.stats['failed'] == 1
+    finally:
+        pool.shutdown()
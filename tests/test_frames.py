@@ -0,0 +1,80 @@
+import io
+import json
+import struct
+
+import pytest
+
+from damancom.frames import FrameDelta, FrameDiffer, FrameEncoder, png_size
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def fake_png(width, height):
+    """Just the signature and IHDR chunk, enough for png_size()."""
+    return PNG_SIGNATURE + struct.pack('>I4sII', 13, b'IHDR', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def test_png_size():
+    assert png_size(fake_png(1280, 720)) == (1280, 720)
+    assert png_size(b'\xff\xd8\xff\xe0 not a png') is None
+
+
+def test_png_at_the_right_size_passes_through():
+    data = fake_png(1280, 720)
+    frame = FrameEncoder('png', size=(1280, 720)).encode(data)
+    assert frame.data is data
+    assert frame.mime == 'image/png'
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        FrameEncoder('gif')
+
+
+def test_delta_wire_format():
+    delta = FrameDelta(7, (256, 160), 'image/jpeg', [(0, 0, 128, 80, b'aaa'), (128, 0, 128, 80, b'bb')],
+                       keyframe=False)
+    packed = delta.pack()
+    (length,) = struct.unpack('>I', packed[:4])
+    header = json.loads(packed[4:4 + length])
+    assert header['frame_id'] == 7
+    assert header['tiles'] == [[0, 0, 128, 80, 3], [128, 0, 128, 80, 2]]
+    assert packed[4 + length:] == b'aaabb'
+
+
+@pytest.fixture
+def capture():
+    Image = pytest.importorskip('PIL.Image')
+
+    def png(changed_box=None):
+        img = Image.new('RGB', (256, 160), 'white')
+        if changed_box:
+            img.paste((255, 0, 0), changed_box)
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        return buffer.getvalue()
+    return png
+
+
+def test_first_frame_is_a_keyframe_then_nothing(capture):
+    differ = FrameDiffer(FrameEncoder('png', size=(256, 160)), tile=(128, 80))
+    first = differ.update(capture())
+    assert first.keyframe and len(first.tiles) == 1
+    assert differ.update(capture(), since=first.frame_id) is None
+
+
+def test_only_changed_tiles_are_sent(capture):
+    differ = FrameDiffer(FrameEncoder('png', size=(256, 160)), tile=(128, 80))
+    first = differ.update(capture())
+    delta = differ.update(capture((10, 10, 20, 20)), since=first.frame_id)
+    assert not delta.keyframe
+    assert [tile[:4] for tile in delta.tiles] == [(0, 0, 128, 80)]
+    assert delta.frame_id == first.frame_id + 1
+
+
+def test_large_change_or_stale_viewer_gets_a_keyframe(capture):
+    differ = FrameDiffer(FrameEncoder('png', size=(256, 160)), tile=(128, 80))
+    first = differ.update(capture())
+    assert differ.update(capture((0, 0, 256, 120)), since=first.frame_id).keyframe
+    # a viewer that missed frames cannot apply tiles
+    assert differ.update(capture((0, 0, 5, 5)), since=first.frame_id).keyframe
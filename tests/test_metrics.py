@@ -0,0 +1,49 @@
+from damancom.metrics import Registry, StepTimer
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram('login_step_seconds', 'Step time', labels=('step',), buckets=(1, 5))
+    histogram.observe(0.5, step='otp')
+    histogram.observe(3, step='otp')
+    histogram.observe(10, step='otp')
+    text = registry.render()
+    assert 'login_step_seconds_bucket{step="otp",le="1"} 1' in text
+    assert 'login_step_seconds_bucket{step="otp",le="5"} 2' in text
+    assert 'login_step_seconds_bucket{step="otp",le="+Inf"} 3' in text
+    assert 'login_step_seconds_sum{step="otp"} 13.5' in text
+    assert 'login_step_seconds_count{step="otp"} 3' in text
+
+
+def test_gauges_with_and_without_labels():
+    registry = Registry()
+    registry.gauge('sessions', 'Live sessions', lambda: 3)
+    registry.gauge('by_step', 'Sessions per step', lambda: {'otp': 2, 'password': 1}, labels=('step',))
+    registry.gauge('broken', 'Raises', lambda: 1 / 0)
+    text = registry.render()
+    assert 'sessions 3' in text.splitlines()
+    assert 'by_step{step="otp"} 2' in text
+    assert 'by_step{step="password"} 1' in text
+    assert '# TYPE broken gauge' in text
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.gauge('hosts', 'Hosts', lambda: {'a"b\\c': 1}, labels=('owner',))
+    assert 'hosts{owner="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_step_timer_feeds_the_histogram():
+    registry = Registry()
+    histogram = registry.histogram('steps', 'Steps', labels=('step',))
+    steps = StepTimer(histogram)
+    steps.begin('username')
+    steps.begin('password')
+    with steps.step('otp_mailbox'):
+        pass
+    steps.end()
+    steps.end()
+    assert [name for name, _ in steps.entries] == ['username', 'otp_mailbox', 'password']
+    assert steps.elapsed == 0.0
+    assert 'steps_count{step="password"} 1' in registry.render()
+    assert steps.report()[-1].split()[0] == 'total'
@@ -0,0 +1,115 @@
+import queue
+import threading
+
+from damancom import otp_desk
+from damancom.otp_desk import OtpDesk
+
+
+class Console:
+    """Operator lines fed by the test; EOF once closed."""
+
+    def __init__(self):
+        self.lines = queue.Queue()
+        self.output = []
+
+    def read_line(self):
+        line = self.lines.get(timeout=5)
+        if line is None:
+            raise EOFError
+        return line
+
+
+def ask(desk, account, results, timeout=5):
+    thread = threading.Thread(target=lambda: results.__setitem__(account, desk.request(account, timeout)))
+    thread.start()
+    return thread
+
+
+def wait_pending(desk, count):
+    for _ in range(500):
+        with desk._lock:
+            if len(desk._pending) == count:
+                return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"expected {count} pending requests")
+
+
+def test_codes_go_to_the_ticket_or_account_named():
+    console = Console()
+    desk = OtpDesk(console.read_line, console.output.append)
+    results = {}
+    threads = [ask(desk, 'alice', results)]
+    wait_pending(desk, 1)
+    threads.append(ask(desk, 'bob', results))
+    wait_pending(desk, 2)
+    console.lines.put('bob 222222')
+    console.lines.put('1 111111')
+    for thread in threads:
+        thread.join(5)
+    console.lines.put(None)
+    assert results == {'alice': '111111', 'bob': '222222'}
+
+
+def test_single_waiter_needs_only_the_code_and_bad_input_is_refused():
+    console = Console()
+    desk = OtpDesk(console.read_line, console.output.append)
+    results = {}
+    thread = ask(desk, 'alice', results)
+    wait_pending(desk, 1)
+    console.lines.put('12ab56')
+    console.lines.put('carol 123456')
+    console.lines.put('654321')
+    thread.join(5)
+    console.lines.put(None)
+    assert results == {'alice': '654321'}
+    assert any('6 digits' in line for line in console.output)
+    assert any("for one of: [1] alice" in line for line in console.output)
+
+
+def test_skip_and_timeout_return_none():
+    console = Console()
+    desk = OtpDesk(console.read_line, console.output.append)
+    results = {}
+    thread = ask(desk, 'alice', results)
+    wait_pending(desk, 1)
+    console.lines.put('1 skip')
+    thread.join(5)
+    assert results == {'alice': None}
+    assert desk.request('bob', timeout=0.05) is None
+    console.lines.put(None)
+
+
+def test_answer_racing_the_timeout_is_kept(monkeypatch):
+    console = Console()
+    desk = OtpDesk(console.read_line, console.output.append)
+
+    class Racing(otp_desk.OtpRequest):
+        def __init__(self, ticket, account):
+            super().__init__(ticket, account)
+            answered = self.answered
+
+            class Late:
+                # the code comes in just as the wait runs out
+                def wait(self, timeout):
+                    desk._answer([str(ticket), '123456'])
+                    return False
+
+                def set(self):
+                    answered.set()
+
+            self.answered = Late()
+
+    monkeypatch.setattr(otp_desk, 'OtpRequest', Racing)
+    assert desk.request('alice', timeout=0.05) == '123456'
+    assert not any('giving up' in line for line in console.output)
+    console.lines.put(None)
+
+
+def test_codes_for_a_timed_out_request_are_refused():
+    console = Console()
+    desk = OtpDesk(console.read_line, console.output.append)
+    assert desk.request('alice', timeout=0.05) is None
+    desk._answer(['1', '123456'])
+    desk._answer(['alice', '123456'])
+    assert sum('already gave up' in line for line in console.output) == 2
+    console.lines.put(None)
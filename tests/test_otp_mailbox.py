@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from damancom import otp_mailbox
+from damancom.otp_mailbox import MaildirProvider, OtpProvider, from_url
+
+
+@pytest.fixture
+def maildir(tmp_path):
+    path = tmp_path / 'Maildir'
+    for sub in ('new', 'cur', 'tmp'):
+        (path / sub).mkdir(parents=True)
+
+    def deliver(name, to, code, text=''):
+        (path / 'new' / name).write_text(
+            f"From: noreply@damancom.ma\nTo: {to}\nSubject: Votre code\n\n"
+            f"Votre code OTP est {code}. {text}\n")
+    deliver.path = str(path)
+    return deliver
+
+
+def test_codes_go_to_the_account_the_mail_names(maildir):
+    since = time.time() - 5
+    maildir('a', 'alice@example.com', '111111')
+    maildir('b', 'ops@shared.example', '222222', 'Envoyé à bo***@example.org')
+    maildir('c', 'ops@shared.example', '333333')
+    provider = MaildirProvider(maildir.path)
+    assert provider.fetch(since, 'bob@example.org') == '222222'
+    assert provider.fetch(since, 'alice@example.com') == '111111'
+    assert provider.fetch(since, 'carol@example.net') == '333333'
+    assert provider.fetch(since, 'carol@example.net') is None
+
+
+def test_recipient_match_ignores_mails_naming_nobody(maildir):
+    since = time.time() - 5
+    maildir('c', 'ops@shared.example', '333333')
+    provider = MaildirProvider(maildir.path, match='recipient')
+    assert provider.matches_accounts
+    assert provider.fetch(since, 'carol@example.net') is None
+
+
+def test_from_url_threads_match(maildir):
+    assert not from_url(f"maildir:{maildir.path}", match='any').matches_accounts
+    assert from_url(f"maildir:{maildir.path}?match=recipient").matches_accounts
+    imap = from_url("imaps://me@mail.example.com/INBOX?match=recipient")
+    assert imap.matches_accounts and imap.folder == 'INBOX'
+    with pytest.raises(ValueError):
+        from_url(f"maildir:{maildir.path}?match=anyone")
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        OtpProvider()
+
+
+def test_stats_are_counted_under_concurrency(maildir, monkeypatch):
+    monkeypatch.setattr(otp_mailbox, 'POLL', 0.01)
+    provider = MaildirProvider(maildir.path)
+    threads = [threading.Thread(target=provider.wait, args=(time.time(), 0)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert provider.stats['timeouts'] == 20
@@ -0,0 +1,44 @@
+from damancom.placement import Placement
+from damancom.session_registry import SqliteRegistry
+
+
+def registry_with(tmp_path, hosts):
+    """hosts: owner -> (role, capacity, sessions)"""
+    registry = SqliteRegistry(str(tmp_path / 'registry.db'))
+    for owner, (role, capacity, sessions) in hosts.items():
+        registry.heartbeat(owner, f"127.0.0.1:{len(owner)}", role=role, capacity=capacity)
+        for index in range(sessions):
+            registry.add(f"{owner}-{index}", owner, 'otp')
+    return registry
+
+
+def test_least_loaded_host_wins(tmp_path):
+    placement = Placement(registry_with(tmp_path, {
+        'busy': ('all', 4, 3), 'quiet': ('node', 4, 1), 'frontend': ('frontend', 0, 0),
+    }))
+    assert placement.choose()['owner'] == 'quiet'
+
+
+def test_load_is_relative_to_capacity(tmp_path):
+    placement = Placement(registry_with(tmp_path, {'small': ('node', 2, 1), 'big': ('node', 10, 3)}))
+    assert placement.choose()['owner'] == 'big'
+
+
+def test_sessions_being_started_count(tmp_path):
+    placement = Placement(registry_with(tmp_path, {'a': ('node', 4, 0), 'b': ('node', 4, 1)}))
+    with placement.starting('a'), placement.starting('a'):
+        assert placement.choose()['owner'] == 'b'
+    assert placement.choose()['owner'] == 'a'
+
+
+def test_all_full_picks_the_least_loaded(tmp_path):
+    placement = Placement(registry_with(tmp_path, {'a': ('node', 2, 3), 'b': ('node', 2, 2)}))
+    hosts = {host['owner']: host for host in placement.hosts()}
+    assert hosts['a']['full'] and hosts['b']['full']
+    assert placement.choose()['owner'] == 'b'
+
+
+def test_no_host(tmp_path):
+    placement = Placement(registry_with(tmp_path, {'frontend': ('frontend', 0, 0)}))
+    assert placement.choose() is None
+    assert placement.status()['no_host'] == 1
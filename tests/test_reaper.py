@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from damancom import procs
+from damancom.reaper import BudgetFull, SessionReaper
+
+
+@pytest.fixture
+def fake_procs(monkeypatch):
+    """Each session's driver is its RSS in bytes; no real process is looked at."""
+    monkeypatch.setattr(procs, 'available', lambda: True)
+    monkeypatch.setattr(procs, 'driver_rss', lambda driver: driver)
+    monkeypatch.setattr(procs, 'driver_pid', lambda driver: None)
+    monkeypatch.setattr(procs, 'process_tree', lambda pid: [])
+    monkeypatch.setattr(procs, 'kill_tree', lambda pids: 0)
+
+
+def session(idle, rss=100):
+    now = time.monotonic()
+    return {'driver': rss, 'created_at': now - idle, 'last_seen': now - idle}
+
+
+def reaper(sessions, **kwargs):
+    return SessionReaper(sessions, lambda s: None, idle_ttl=600, max_lifetime=1800,
+                         evict_idle=60, **kwargs)
+
+
+def test_make_room_evicts_only_idle_sessions(fake_procs):
+    sessions = {'idle': session(120), 'active': session(1)}
+    r = reaper(sessions, max_browsers=2)
+    r.make_room()
+    assert list(sessions) == ['active']
+    with pytest.raises(BudgetFull):
+        reaper({'a': session(1), 'b': session(2)}, max_browsers=2).make_room()
+
+
+def test_pool_drivers_count_against_the_cap(fake_procs):
+    sessions = {'idle': session(120)}
+    reaper(sessions, max_browsers=2, others=lambda: 1).make_room()
+    assert sessions == {}
+
+
+def test_memory_budget_never_evicts_active_sessions(fake_procs):
+    sessions = {'idle': session(120, rss=100), 'busy': session(5, rss=300), 'typing': session(1, rss=300)}
+    r = reaper(sessions, max_browsers=10, max_memory=500)
+    r.sweep()
+    assert set(sessions) == {'busy', 'typing'}
+    assert r.stats['evicted_memory'] == 1
+    assert r.stats['over_memory'] == 1
+    assert r.stats['last_memory_bytes'] == 600
+
+
+def test_idle_and_lifetime_limits(fake_procs):
+    old = session(0)
+    old['created_at'] -= 2000
+    sessions = {'gone': session(700), 'old': old, 'fresh': session(1)}
+    r = reaper(sessions)
+    r.sweep()
+    assert list(sessions) == ['fresh']
+    assert r.stats['evicted_idle'] == 1 and r.stats['evicted_lifetime'] == 1
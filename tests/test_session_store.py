@@ -0,0 +1,27 @@
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('cryptography')
+
+from damancom.session_store import SessionStore
+
+
+def test_stats_from_two_stores_on_one_directory_add_up(tmp_path):
+    # two stores stand in for two processes sharing the directory
+    stores = [SessionStore(str(tmp_path), 'passphrase'), SessionStore(str(tmp_path), 'passphrase')]
+
+    def count(store):
+        for _ in range(50):
+            store._count('misses')
+
+    threads = [threading.Thread(target=count, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(tmp_path / 'stats.json') as f:
+        assert json.load(f)['misses'] == 100
+    assert not list(tmp_path.glob('*.tmp'))